@@ -0,0 +1,350 @@
+import gzip
+import mmap
+import re
+import struct
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+PRIMITIVE_FORMATS = {
+    "char": "B", "uchar": "B", "int8_t": "b", "uint8_t": "B", "bool": "B",
+    "short": "h", "ushort": "H", "int16_t": "h", "uint16_t": "H",
+    "int": "i", "uint": "I", "int32_t": "i", "uint32_t": "I",
+    "float": "f", "double": "d",
+    "int64_t": "q", "uint64_t": "Q",
+}
+
+# ImageFormatData.imtype -> идентификатор RNA file_format
+IMAGE_TYPES = {
+    0: "TARGA", 1: "IRIS", 4: "JPEG", 14: "TARGA_RAW", 15: "AVI_RAW", 16: "AVI_JPEG", 17: "PNG",
+    20: "BMP", 21: "HDR", 22: "TIFF", 23: "OPEN_EXR", 24: "FFMPEG", 26: "CINEON", 27: "DPX",
+    28: "OPEN_EXR_MULTILAYER", 29: "DDS", 30: "JPEG2000", 35: "WEBP",
+}
+
+IDP_INT, IDP_FLOAT, IDP_GROUP, IDP_DOUBLE, IDP_BOOLEAN = 1, 2, 6, 8, 13
+
+# Ошибки разбора поврежденного файла: битые указатели, обрезанные блоки, неверные индексы SDNA
+READ_ERRORS = (struct.error, IndexError, KeyError, ValueError, TypeError)
+
+
+class BlendFileError(Exception):
+    pass
+
+
+class BlockHeader:
+    __slots__ = ("code", "size", "old_ptr", "sdna_index", "count", "offset")
+
+    def __init__(self, code, size, old_ptr, sdna_index, count, offset):
+        self.code = code
+        self.size = size
+        self.old_ptr = old_ptr
+        self.sdna_index = sdna_index
+        self.count = count
+        self.offset = offset
+
+
+class Field:
+    __slots__ = ("name", "type_name", "offset", "size", "is_pointer", "array_len")
+
+    def __init__(self, name, type_name, offset, size, is_pointer, array_len):
+        self.name = name
+        self.type_name = type_name
+        self.offset = offset
+        self.size = size
+        self.is_pointer = is_pointer
+        self.array_len = array_len
+
+
+class SDNA:
+    """Описание структур DNA, сохраненное в блоке DNA1."""
+
+    def __init__(self, data, endian, pointer_size):
+        self.pointer_size = pointer_size
+        names, pos = self._read_strings(data, 4, b"NAME", endian)
+        types, pos = self._read_strings(data, pos, b"TYPE", endian)
+        if data[pos:pos + 4] != b"TLEN":
+            raise BlendFileError("Invalid SDNA: TLEN missing")
+        lengths = struct.unpack_from(f"{endian}{len(types)}h", data, pos + 4)
+        pos = self._align(pos + 4 + 2 * len(types))
+        if data[pos:pos + 4] != b"STRC":
+            raise BlendFileError("Invalid SDNA: STRC missing")
+        struct_count, = struct.unpack_from(f"{endian}i", data, pos + 4)
+        pos += 8
+        self.types = types
+        self.lengths = lengths
+        self.structs = []
+        self.struct_by_name = {}
+        for _ in range(struct_count):
+            type_index, field_count = struct.unpack_from(f"{endian}hh", data, pos)
+            pairs = struct.unpack_from(f"{endian}{field_count * 2}h", data, pos + 4)
+            pos += 4 + field_count * 4
+            fields = {}
+            offset = 0
+            for field_type, field_name in zip(pairs[0::2], pairs[1::2]):
+                field = self._make_field(names[field_name], types[field_type], lengths[field_type], offset)
+                fields[field.name] = field
+                offset += field.size
+            self.struct_by_name[types[type_index]] = len(self.structs)
+            self.structs.append((types[type_index], fields))
+
+    @staticmethod
+    def _align(pos):
+        return (pos + 3) & ~3
+
+    def _read_strings(self, data, pos, marker, endian):
+        if data[pos:pos + 4] != marker:
+            raise BlendFileError(f"Invalid SDNA: {marker.decode()} missing")
+        count, = struct.unpack_from(f"{endian}i", data, pos + 4)
+        pos += 8
+        strings = []
+        for _ in range(count):
+            end = data.index(b"\0", pos)
+            strings.append(bytes(data[pos:end]).decode("latin-1"))
+            pos = end + 1
+        return strings, self._align(pos)
+
+    def _make_field(self, raw_name, type_name, type_length, offset):
+        is_pointer = raw_name.startswith("*") or raw_name.startswith("(*")
+        array_len = 1
+        for dim in re.findall(r"\[(\d+)\]", raw_name):
+            array_len *= int(dim)
+        name = re.sub(r"\[.*|[*()]", "", raw_name.split(")(")[0])
+        size = (self.pointer_size if is_pointer else type_length) * array_len
+        return Field(name, type_name, offset, size, is_pointer, array_len)
+
+    def struct_fields(self, name_or_index):
+        if isinstance(name_or_index, str):
+            name_or_index = self.struct_by_name[name_or_index]
+        return self.structs[name_or_index][1]
+
+
+class BlendFile:
+    """Чтение .blend файла без Blender: заголовок, заголовки блоков и SDNA.
+
+    Несжатые файлы отображаются в память через mmap, так что читаются
+    только нужные страницы; gzip/zstd файлы распаковываются в память.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(self.path, "rb")
+        self._mmap = None
+        try:
+            magic = self._file.read(4)
+            self._file.seek(0)
+            if magic[:2] == GZIP_MAGIC:
+                with gzip.GzipFile(fileobj=self._file) as gz:
+                    self.data = memoryview(gz.read())
+            elif magic == ZSTD_MAGIC:
+                self.data = memoryview(self._decompress_zstd())
+            else:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.data = memoryview(self._mmap)
+            self._read_header()
+            self._scan_blocks()
+        except READ_ERRORS + (OSError, EOFError) as e:
+            self.close()
+            raise BlendFileError(f"Cannot read {self.path}: {str(e)}")
+        except BlendFileError:
+            self.close()
+            raise
+
+    def _decompress_zstd(self):
+        if zstd is None:
+            raise BlendFileError("zstd-compressed .blend requires Python 3.14 or the 'zstandard' package")
+        if hasattr(zstd, "ZstdDecompressor") and hasattr(zstd.ZstdDecompressor, "stream_reader"):
+            with zstd.ZstdDecompressor().stream_reader(self._file, read_across_frames=True) as reader:
+                return reader.read()
+        return zstd.decompress(self._file.read())
+
+    def _read_header(self):
+        header = bytes(self.data[:17])
+        if not header.startswith(b"BLENDER"):
+            raise BlendFileError(f"Not a .blend file: {self.path}")
+        if header[7:9].isdigit():
+            # Формат Blender 5.0+: BLENDER17-01v0500
+            header_size = int(header[7:9])
+            self.pointer_size = 8
+            self.endian = "<" if header[12:13] == b"v" else ">"
+            self.version = int(header[13:17])
+            self.large_bhead = True
+        else:
+            header_size = 12
+            self.pointer_size = 8 if header[7:8] == b"-" else 4
+            self.endian = "<" if header[8:9] == b"v" else ">"
+            self.version = int(header[9:12])
+            self.large_bhead = False
+        self._header_size = header_size
+
+    def _scan_blocks(self):
+        endian, pointer = self.endian, "Q" if self.pointer_size == 8 else "I"
+        if self.large_bhead:
+            fmt = struct.Struct(f"{endian}4siQqq")
+        else:
+            fmt = struct.Struct(f"{endian}4si{pointer}ii")
+        self.blocks = []
+        self.blocks_by_ptr = {}
+        data = self.data
+        pos = self._header_size
+        end = len(data)
+        while pos + fmt.size <= end:
+            if self.large_bhead:
+                code, sdna_index, old_ptr, size, count = fmt.unpack_from(data, pos)
+            else:
+                code, size, old_ptr, sdna_index, count = fmt.unpack_from(data, pos)
+            pos += fmt.size
+            if code == b"ENDB":
+                break
+            block = BlockHeader(code, size, old_ptr, sdna_index, count, pos)
+            self.blocks.append(block)
+            if old_ptr:
+                self.blocks_by_ptr[old_ptr] = block
+            pos += size
+        dna = self.find_block(b"DNA1")
+        if dna is None:
+            raise BlendFileError(f"SDNA block not found in {self.path}")
+        self.sdna = SDNA(bytes(data[dna.offset:dna.offset + dna.size]), endian, self.pointer_size)
+
+    def find_block(self, code):
+        return next((block for block in self.blocks if block.code == code), None)
+
+    def find_blocks(self, code):
+        return [block for block in self.blocks if block.code == code]
+
+    def resolve(self, block, path):
+        """Возвращает (offset, field) для пути вида 'r.im_format.imtype' в структуре блока."""
+        try:
+            return self._resolve(block, path)
+        except READ_ERRORS as e:
+            raise BlendFileError(f"Corrupt block {block.code!r} in {self.path}: {str(e)}")
+
+    def _resolve(self, block, path):
+        fields = self.sdna.struct_fields(block.sdna_index)
+        offset = block.offset
+        parts = path.split(".")
+        for i, part in enumerate(parts):
+            field = fields.get(part)
+            if field is None:
+                return None, None
+            offset += field.offset
+            if i < len(parts) - 1:
+                if field.is_pointer or field.type_name not in self.sdna.struct_by_name:
+                    return None, None
+                fields = self.sdna.struct_fields(field.type_name)
+        return offset, field
+
+    def get(self, block, path, default=None):
+        """Значение поля; default, если поля нет в SDNA. Поврежденные данные - BlendFileError."""
+        offset, field = self.resolve(block, path)
+        if field is None:
+            return default
+        try:
+            return self._read_field(offset, field, default)
+        except READ_ERRORS as e:
+            raise BlendFileError(f"Cannot read {path} of block {block.code!r} in {self.path}: {str(e)}")
+
+    def _read_field(self, offset, field, default):
+        if offset + field.size > len(self.data):
+            raise BlendFileError(f"Field {field.name} runs past the end of {self.path}")
+        if field.is_pointer:
+            fmt = "Q" if self.pointer_size == 8 else "I"
+            return struct.unpack_from(f"{self.endian}{fmt}", self.data, offset)[0]
+        if field.type_name == "char" and field.array_len > 1:
+            raw = bytes(self.data[offset:offset + field.size])
+            return raw.split(b"\0", 1)[0].decode("utf-8", errors="replace")
+        fmt = PRIMITIVE_FORMATS.get(field.type_name)
+        if fmt is None:
+            return default
+        return struct.unpack_from(f"{self.endian}{fmt}", self.data, offset)[0]
+
+    def id_properties(self, block, path="id.properties"):
+        """Читает группу пользовательских свойств ID в словарь (только числа и группы)."""
+        pointer = self.get(block, path, 0)
+        group = self.blocks_by_ptr.get(pointer)
+        return self._read_idp_group(group) if group else {}
+
+    def _read_idp_group(self, group_block):
+        result = {}
+        child = self.blocks_by_ptr.get(self.get(group_block, "data.group.first", 0))
+        visited = set()
+        while child is not None and child.old_ptr not in visited:
+            visited.add(child.old_ptr)
+            name = self.get(child, "name", "")
+            prop_type = self.get(child, "type")
+            if prop_type in (IDP_INT, IDP_BOOLEAN):
+                result[name] = self.get(child, "data.val", 0)
+            elif prop_type == IDP_FLOAT:
+                value = self.get(child, "data.val", 0)
+                try:
+                    result[name] = struct.unpack(f"{self.endian}f", struct.pack(f"{self.endian}i", value))[0]
+                except struct.error as e:
+                    raise BlendFileError(f"Corrupt float property {name} in {self.path}: {str(e)}")
+            elif prop_type == IDP_GROUP:
+                result[name] = self._read_idp_group(child)
+            child = self.blocks_by_ptr.get(self.get(child, "next", 0))
+        return result
+
+    def close(self):
+        self.data = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # на отображение еще ссылается traceback, его закроет сборщик мусора
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_scene_settings(file_path):
+    """Те же поля, что probe_script.read_scene_settings, но без запуска Blender.
+
+    Поля, которых нет в SDNA файла, получают значения по умолчанию Blender.
+    """
+    with BlendFile(file_path) as blend:
+        scenes = blend.find_blocks(b"SC\0\0")
+        if not scenes:
+            raise BlendFileError(f"No scenes in {file_path}")
+        scene = scenes[0]
+        glob = blend.find_block(b"GLOB")
+        if glob is not None:
+            scene = blend.blocks_by_ptr.get(blend.get(glob, "curscene", 0), scene)
+
+        properties = blend.id_properties(scene, "id.system_properties") or blend.id_properties(scene)
+        cycles = properties.get("cycles", {})
+        modern = blend.version >= 300
+        engine = blend.get(scene, "r.engine", "")
+        file_format = IMAGE_TYPES.get(blend.get(scene, "r.im_format.imtype", 17), "PNG")
+        return {
+            "resolution_x": blend.get(scene, "r.xsch", 1920),
+            "resolution_y": blend.get(scene, "r.ysch", 1080),
+            "resolution_scale": blend.get(scene, "r.size", 100),
+            "fps": blend.get(scene, "r.frs_sec", 24),
+            "fps_base": blend.get(scene, "r.frs_sec_base", 1.0),
+            "frame_start": blend.get(scene, "r.sfra", 1),
+            "frame_end": blend.get(scene, "r.efra", 250),
+            "frame_step": blend.get(scene, "r.frame_step", 1),
+            "frame_current": blend.get(scene, "r.cfra", 1),
+            "render_engine": "EEVEE" if engine in ["BLENDER_EEVEE", "BLENDER_EEVEE_NEXT"] else "CYCLES",
+            "render_type": "Image" if file_format in ["PNG", "JPEG", "EXR"] else "Animation",
+            "cycles_samples": cycles.get("samples", 4096 if modern else 128),
+            "cycles_denoising": bool(cycles.get("use_denoising", modern)),
+            "cycles_device": "GPU" if cycles.get("device", 0) == 1 else "CPU",
+            "threads": blend.get(scene, "r.threads", 0),
+            "eevee_samples": blend.get(scene, "eevee.taa_render_samples", 64),
+            "file_format": file_format,
+            "output_path": blend.get(scene, "r.pic", ""),
+        }
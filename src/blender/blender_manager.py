@@ -1,30 +1,127 @@
+import logging
 import subprocess
 import sys
 import threading
 import os
-import bpy
+import json
 import shutil
 import re
-import base64
+import tempfile
+import time
+import uuid
+from collections import deque
 
-import psutil
-from PyQt6.QtCore import QObject, pyqtSignal
 from pathlib import Path
+from src.blender import blend_reader
+from src.events import Signal
+from src.blender.frame_scan import output_location, remove_broken, remove_placeholders, scan_frames
+from src.blender.frame_sharding import ShardedRender
+from src.blender.render_history import RenderRecorder
+from src.blender.render_progress import ProgressParser
+from src.blender.telemetry import ResourceSampler, format_bytes
+from src.blender.memory_admission import MemoryAdmission, MemoryEstimator
+from src.blender.job_control import JobCancelled, JobControl, RENDER_CANCELLED
+from src.blender.watchdog import HangWatchdog, PREVIEW_TIMEOUT, RenderStalled, RetryPolicy
+from src.blender.worker_pool import WorkerBusy, WorkerPool, WorkerError
+from src.models.project import FILE_FORMATS_IMAGE, FILE_FORMATS_MOVIE, logical_cpu_count
 from src.logger_config import setup_logger
 
 logger = setup_logger('BlenderManager')
 
-class BlenderManager(QObject):
-    thumbnail_ready = pyqtSignal(str, bytes)
-    render_complete = pyqtSignal(str, bool, str)  # unique_id, success, message
+OUTPUT_TAIL_LINES = 50
+PROGRESS_INTERVAL = 0.25  # секунды между событиями прогресса
 
-    def __init__(self, parent=None, blender_paths=None):
-        super().__init__(parent)
+
+class PreviewJob:
+    """Отмена прогрессивного превью: через прогретый процесс или завершением процесса."""
+
+    def __init__(self):
+        self.job_id = uuid.uuid4().hex
+        self.cancelled = False
+        self.completed = False
+        self._worker = None
+        self._process = None
+
+    def attach_worker(self, worker):
+        self._worker = worker
+
+    def detach(self):
+        self._worker = None
+        self._process = None
+
+    def attach_process(self, process):
+        self._process = process
+        if self.cancelled:
+            process.terminate()
+
+    def cancel(self):
+        self.cancelled = True
+        if self._worker is not None:
+            try:
+                self._worker.send({"type": "cancel", "job_id": self.job_id})
+            except WorkerError:
+                pass
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+class BlenderManager:
+    """Запуск Blender без зависимости от Qt.
+
+    parent - владелец с необязательными атрибутами db_manager, thumbnail_cache
+    и методом log(message, level); события вызываются в рабочих потоках.
+    """
+    thumbnail_ready = Signal(str, bytes)
+    render_complete = Signal(str, bool, str)  # unique_id, success, message
+    chunk_complete = Signal(str, int, int, bool)  # unique_id, done, total, success
+    settings_ready = Signal(str, object)  # file_path, settings dict or None
+    blender_info_ready = Signal(str, object)  # path, info dict
+    preview_pass_ready = Signal(str, bytes, int, int)  # unique_id, image, pass index, total passes
+    render_progress = Signal(str, object)  # unique_id, RenderProgress
+    blender_discovered = Signal(object)  # path or None
+    process_started = Signal(str, object)  # unique_id, subprocess.Popen рендера (обработчик вызывается в потоке рендера)
+    preview_started = Signal(str, str)  # unique_id, id задания превью
+    preview_finished = Signal(str, str)  # unique_id, id задания превью
+
+    def __init__(self, parent=None, blender_paths=None, use_warm_workers=True, discover=True):
         self.parent = parent
         self.blender_paths = blender_paths or {}
-        self.blender_executable = self.find_blender_executable()
-        if parent:
-            self.thumbnail_ready.connect(parent.save_thumbnail)
+        self.use_warm_workers = use_warm_workers
+        self.worker_pool = WorkerPool()
+        # Превью не ждут рендеров, занявших процессы worker_pool
+        self.preview_pool = WorkerPool(max_workers=1)
+        self.preview_size = (512, 288)
+        self.preview_dir = Path(tempfile.mkdtemp(prefix="blender_render_tool_"))
+        self._preview_jobs = {}
+        self._preview_lock = threading.Lock()
+        db_manager = getattr(parent, 'db_manager', None)
+        self.blender_infos = db_manager.get_blender_infos() if db_manager else {}
+        self._probing = set()
+        self._probe_lock = threading.Lock()
+        self._scene_stats_locks = {}  # file_path -> Lock пробы статистики сцены
+        # Замеры CPU, памяти и ввода-вывода каждого процесса рендера
+        self.telemetry = ResourceSampler()
+        self.process_started.connect(self.telemetry.track)
+        # Задание запускается, только если свободной памяти хватает на его оценку
+        self.admission = MemoryAdmission(MemoryEstimator(db_manager, self.get_scene_stats), self.telemetry)
+        # Процессы каждого рендера: отмена, пауза и завершение при выходе
+        self.jobs = JobControl()
+        # Зависшие процессы завершаются, упавшие рендеры повторяются с паузой
+        self.watchdog = HangWatchdog()
+        self.retry_policy = RetryPolicy()
+        if discover:
+            self.blender_executable = self.find_blender_executable()
+        else:
+            # Быстрый старт: только известные пути из базы, полный поиск - discover_async()
+            self.blender_executable = next((path for path in self.blender_paths if os.path.exists(path)), None)
+
+    def discover_async(self):
+        def run_discovery():
+            path = self.find_blender_executable()
+            if path:
+                self.blender_executable = path
+            self.blender_discovered.emit(path)
+        threading.Thread(target=run_discovery, daemon=True).start()
 
     def find_blender_executable(self):
         if os.name == 'nt':
@@ -38,9 +135,7 @@ class BlenderManager(QObject):
             for path in mac_paths:
                 if os.path.exists(path):
                     logger.info(f"Найден исполняемый файл Blender: {path}")
-                    if self.parent and hasattr(self.parent, 'db_manager'):
-                        version = self.get_blender_version(path)
-                        self.parent.db_manager.add_blender_path(path, version)
+                    self.register_blender_path(path)
                     return path
         else:
             blender_exec = "blender"
@@ -48,9 +143,7 @@ class BlenderManager(QObject):
         path = shutil.which(blender_exec)
         if path:
             logger.info(f"Найден исполняемый файл Blender в PATH: {path}")
-            if self.parent and hasattr(self.parent, 'db_manager'):
-                version = self.get_blender_version(path)
-                self.parent.db_manager.add_blender_path(path, version)
+            self.register_blender_path(path)
             return path
 
         for path in self.blender_paths.keys():
@@ -61,6 +154,116 @@ class BlenderManager(QObject):
         logger.error("Исполняемый файл Blender не найден")
         return None
 
+    def register_blender_path(self, path):
+        """Добавляет путь в базу без запуска Blender; версия определяется в фоне."""
+        db_manager = getattr(self.parent, 'db_manager', None)
+        if db_manager and path not in self.blender_paths:
+            db_manager.add_blender_path(path, "Unknown")
+            self.blender_paths[path] = "Unknown"
+        self.get_blender_info(path)
+
+    def _executable_stat(self, blender_path):
+        try:
+            stat = os.stat(blender_path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def get_blender_info(self, blender_path=None):
+        """Возвращает кэшированную информацию о Blender, не запуская процесс.
+
+        Если кэша нет или исполняемый файл изменился, запускается фоновая
+        проверка, результат которой придет через blender_info_ready.
+        """
+        blender_path = blender_path or self.blender_executable
+        if not blender_path:
+            return None
+        stat = self._executable_stat(blender_path)
+        if stat is None:
+            return None
+        info = self.blender_infos.get(blender_path)
+        if info is None or (info.get("mtime"), info.get("size")) != stat:
+            self.refresh_blender_info(blender_path)
+        return info
+
+    def refresh_blender_info(self, blender_path):
+        with self._probe_lock:
+            if blender_path in self._probing:
+                return
+            self._probing.add(blender_path)
+        threading.Thread(target=self._probe_blender_info, args=(blender_path,), daemon=True).start()
+
+    def _probe_blender_info(self, blender_path):
+        try:
+            stat = self._executable_stat(blender_path)
+            if stat is None:
+                return
+            capabilities = self.probe_blender_capabilities(blender_path)
+            if capabilities is None:
+                # Запоминаем неудачу в памяти, чтобы не запускать Blender повторно до изменения файла
+                self.blender_infos[blender_path] = {"version": "Unknown", "engines": [], "gpu_backends": [],
+                                                    "mtime": stat[0], "size": stat[1]}
+                return
+            info = dict(capabilities, mtime=stat[0], size=stat[1])
+            self.blender_infos[blender_path] = info
+            self.blender_paths[blender_path] = info["version"]
+            db_manager = getattr(self.parent, 'db_manager', None)
+            if db_manager:
+                db_manager.save_blender_info(blender_path, info)
+            logger.info(f"Blender {blender_path}: {info['version']}, engines {info['engines']}, "
+                        f"GPU {info['gpu_backends']}")
+            self.blender_info_ready.emit(blender_path, info)
+        finally:
+            with self._probe_lock:
+                self._probing.discard(blender_path)
+
+    def probe_blender_capabilities(self, blender_path):
+        script_path = Path(__file__).parent / "capabilities_script.py"
+        try:
+            result = subprocess.run(
+                [blender_path, "--background", "--factory-startup", "--python", str(script_path)],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=60
+            )
+            for line in result.stdout.splitlines():
+                if line.startswith("capabilities:"):
+                    return json.loads(line.split(":", 1)[1])
+            logger.error(f"No capabilities in Blender output: {blender_path}")
+        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired, OSError) as e:
+            logger.error(f"Failed to get Blender version: {str(e)}")
+        try:
+            result = subprocess.run(
+                [blender_path, "--version"],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=5
+            )
+        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired, OSError) as e:
+            logger.error(f"Failed to get Blender version: {str(e)}")
+            return None
+        version = re.search(r"Blender (\d+\.\d+\.\d+)", result.stdout)
+        return {
+            "version": version.group(1) if version else "Unknown",
+            "engines": [],
+            "gpu_backends": []
+        }
+
+    def shutdown(self):
+        """Завершает рендеры, превью и прогретые процессы, чтобы после выхода не осталось Blender."""
+        cancelled = self.jobs.cancel_all(wait=True)
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} running render jobs on shutdown")
+        with self._preview_lock:
+            previews = list(self._preview_jobs.values())
+        for job in previews:
+            job.cancel()
+        self.worker_pool.shutdown()
+        self.preview_pool.shutdown()
+        shutil.rmtree(self.preview_dir, ignore_errors=True)
+
     def set_blender_path(self, path):
         if os.path.exists(path):
             self.blender_executable = path
@@ -68,79 +271,191 @@ class BlenderManager(QObject):
         else:
             logger.error(f"Invalid Blender path: {path}")
             if self.parent:
-                self.parent.log(f"Invalid Blender path: {path}")
+                self.parent.log(f"Invalid Blender path: {path}", logging.ERROR)
 
     def get_blender_version(self, blender_path=None):
         blender_path = blender_path or self.blender_executable
         if not blender_path or not os.path.exists(blender_path):
             return "Unknown"
-        if blender_path in self.blender_paths:
-            return self.blender_paths[blender_path]
+        info = self.get_blender_info(blender_path)
+        if info:
+            return info["version"]
+        return self.blender_paths.get(blender_path, "Unknown")
+
+    def describe_blender(self, blender_path=None):
+        info = self.get_blender_info(blender_path)
+        if not info:
+            return self.get_blender_version(blender_path)
+        details = [engine.replace("BLENDER_", "") for engine in info["engines"] if "EEVEE" in engine]
+        details += info["gpu_backends"]
+        return f"{info['version']} ({', '.join(details)})" if details else info["version"]
+
+    def get_settings_from_project(self, file_path: str) -> dict:
+        if not os.path.exists(file_path):
+            logger.error(f"Файл проекта не найден: {file_path}")
+            return None
+        file_path = str(Path(file_path).resolve())
+        stat = os.stat(file_path)
+        db_manager = getattr(self.parent, 'db_manager', None)
+        scene_settings = db_manager.get_cached_probe(file_path, stat.st_mtime, stat.st_size) if db_manager else None
+        if scene_settings is None:
+            try:
+                scene_settings = blend_reader.read_scene_settings(file_path)
+            except blend_reader.BlendFileError as e:
+                logger.warning(f"Не удалось прочитать .blend напрямую, используется Blender: {str(e)}")
+                scene_settings = self.probe_scene_settings(file_path)
+            if scene_settings is None:
+                return None
+            if db_manager:
+                db_manager.save_probe(file_path, stat.st_mtime, stat.st_size, scene_settings)
+        else:
+            logger.info(f"Настройки проекта взяты из кэша: {file_path}")
+
+        max_threads = logical_cpu_count()
+        settings = dict(scene_settings)
+        settings.update({
+            "threads": min(scene_settings.get("threads") or 0, max_threads) or max_threads,
+            "file_formats_image": FILE_FORMATS_IMAGE,
+            "file_formats_movie": FILE_FORMATS_MOVIE,
+            "output_path": scene_settings.get("output_path") or str(Path(file_path).parent / "output"),
+            "output_filename": Path(file_path).stem,  # Устанавливаем имя файла по умолчанию
+            "blender_path": self.blender_executable or ""
+        })
+        logger.info(f"Получены настройки для проекта: {file_path}")
+        return settings
+
+    def get_settings_from_project_async(self, file_path: str):
+        self.get_settings_from_projects_async([file_path])
+
+    def get_settings_from_projects_async(self, file_paths):
+        def run_probe():
+            for file_path in file_paths:
+                # Один поврежденный файл не должен прерывать импорт всей папки
+                try:
+                    settings = self.get_settings_from_project(file_path)
+                except Exception as e:
+                    logger.error(f"Не удалось прочитать настройки проекта {file_path}: {str(e)}")
+                    settings = None
+                self.settings_ready.emit(file_path, settings)
+
+        threading.Thread(target=run_probe, daemon=True).start()
+
+    def probe_scene_settings(self, file_path: str) -> dict:
+        blender_path = self.blender_executable
+        if not blender_path or not os.path.exists(blender_path):
+            logger.error("Исполняемый файл Blender не найден, настройки проекта не прочитаны")
+            return None
+        if self.use_warm_workers:
+            try:
+                reply = self.worker_pool.submit(blender_path, {"type": "probe", "file_path": file_path},
+                                                wait=False)
+                if reply.get("ok"):
+                    return reply["settings"]
+                logger.error(f"Ошибка получения настроек: {reply.get('error')}")
+                return None
+            except WorkerBusy as e:
+                logger.info(f"{str(e)}, using a new process")
+            except WorkerError as e:
+                logger.warning(f"Warm worker unavailable, falling back to a new process: {str(e)}")
+
+        script_path = Path(__file__).parent / "probe_script.py"
         try:
-            result = subprocess.run(
-                [blender_path, "--version"],
+            process = subprocess.run(
+                [str(blender_path), "--background", "--factory-startup", "--python", str(script_path), "--", file_path],
                 capture_output=True,
                 text=True,
                 check=True,
-                timeout=5
+                timeout=300
             )
-            version = re.search(r"Blender (\d+\.\d+\.\d+)", result.stdout)
-            return version.group(1) if version else "Unknown"
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-            logger.error(f"Failed to get Blender version: {str(e)}")
-            return "Unknown"
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            logger.error(f"Ошибка получения настроек: {str(e)}")
+            return None
+        for line in process.stdout.splitlines():
+            if line.startswith("probe_settings:"):
+                return json.loads(line.split(":", 1)[1])
+        logger.error(f"Настройки не найдены в выводе Blender: {file_path}")
+        return None
 
-    def get_settings_from_project(self, file_path: str) -> dict:
+    def get_scene_stats(self, file_path: str, blender_path: str = None) -> dict:
+        """Полигоны, память текстур и число проходов сцены для оценки памяти рендера (кэш по mtime/size)."""
         if not os.path.exists(file_path):
-            logger.error(f"Файл проекта не найден: {file_path}")
             return None
+        file_path = str(Path(file_path).resolve())
+        with self._probe_lock:
+            file_lock = self._scene_stats_locks.setdefault(file_path, threading.Lock())
+        # Задания одного файла, поставленные вместе, ждут одну пробу и берут ее результат из кэша
+        with file_lock:
+            stat = os.stat(file_path)
+            db_manager = getattr(self.parent, 'db_manager', None)
+            stats = db_manager.get_cached_scene_stats(file_path, stat.st_mtime, stat.st_size) if db_manager else None
+            if stats is not None:
+                return stats
+            stats = self.probe_scene_stats(file_path, blender_path)
+            if stats is not None and db_manager:
+                db_manager.save_scene_stats(file_path, stat.st_mtime, stat.st_size, stats)
+            return stats
+
+    def probe_scene_stats(self, file_path: str, blender_path: str = None) -> dict:
+        blender_path = blender_path or self.blender_executable
+        if not blender_path or not os.path.exists(blender_path):
+            return None
+        if self.use_warm_workers:
+            try:
+                reply = self.worker_pool.submit(blender_path, {"type": "scene_stats", "file_path": file_path},
+                                                wait=False)
+                if reply.get("ok"):
+                    return reply["stats"]
+                logger.error(f"Ошибка получения статистики сцены: {reply.get('error')}")
+                return None
+            except WorkerBusy as e:
+                logger.info(f"{str(e)}, using a new process")
+            except WorkerError as e:
+                logger.warning(f"Warm worker unavailable, falling back to a new process: {str(e)}")
+
+        script_path = Path(__file__).parent / "probe_script.py"
         try:
-            bpy.ops.wm.open_mainfile(filepath=file_path)
-            scene = bpy.context.scene
-            max_threads = psutil.cpu_count(logical=True) or 1
-            settings = {
-                "resolution_x": scene.render.resolution_x,
-                "resolution_y": scene.render.resolution_y,
-                "resolution_scale": scene.render.resolution_percentage,
-                "fps": scene.render.fps,
-                "fps_base": scene.render.fps_base,
-                "frame_start": scene.frame_start,
-                "frame_end": scene.frame_end,
-                "frame_step": scene.frame_step,
-                "frame_current": scene.frame_current,
-                "render_engine": "EEVEE" if scene.render.engine in ["BLENDER_EEVEE", "BLENDER_EEVEE_NEXT"] else "CYCLES",
-                "render_type": "Image" if scene.render.image_settings.file_format in ["PNG", "JPEG", "EXR"] else "Animation",
-                "cycles_samples": scene.cycles.samples if hasattr(scene, 'cycles') else 128,
-                "cycles_denoising": scene.cycles.use_denoising if hasattr(scene, 'cycles') else False,
-                "cycles_device": scene.cycles.device if hasattr(scene, 'cycles') else "CPU",
-                "threads": min(scene.render.threads, max_threads) if hasattr(scene.render, 'threads') else max_threads,
-                "eevee_samples": scene.eevee.taa_render_samples if hasattr(scene, 'eevee') else 64,
-                "file_format": scene.render.image_settings.file_format,
-                "file_formats_image": ["PNG", "JPEG", "EXR"],
-                "file_formats_movie": ["AVI_JPEG", "AVI_RAW", "FFMPEG"],
-                "output_path": scene.render.filepath or str(Path(file_path).parent / "output"),
-                "output_filename": Path(file_path).stem,  # Устанавливаем имя файла по умолчанию
-                "blender_path": self.blender_executable or ""
-            }
-            logger.info(f"Получены настройки для проекта: {file_path}")
-            return settings
-        except Exception as e:
-            logger.error(f"Ошибка получения настроек: {str(e)}")
+            process = subprocess.run(
+                [str(blender_path), "--background", "--factory-startup", "--python", str(script_path),
+                 "--", file_path, "--stats"],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=300
+            )
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            logger.error(f"Ошибка получения статистики сцены: {str(e)}")
+            return None
+        for line in process.stdout.splitlines():
+            if line.startswith("scene_stats:"):
+                return json.loads(line.split(":", 1)[1])
+        logger.error(f"Статистика сцены не найдена в выводе Blender: {file_path}")
+        return None
+
+    @staticmethod
+    def _take_preview_file(path):
+        """Забирает отрендеренное превью из временного файла и удаляет его."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.remove(path)
+        except OSError as e:
+            logger.error(f"Failed to read preview file {path}: {str(e)}")
             return None
+        return data or None
 
-    def render_project_thumbnail(self, project, callback):
+    def render_project_thumbnail(self, project, callback=None, progressive=False):
+        callback = callback or (lambda unique_id, thumbnail_data: None)
         if not project:
             logger.error("Invalid project")
             if self.parent:
-                self.parent.log("Error: Invalid project")
-            callback(project.unique_id, None)
+                self.parent.log("Error: Invalid project", logging.ERROR)
             return
 
         blender_path = project.settings.blender_path or self.blender_executable
         if not blender_path or not os.path.exists(blender_path):
             logger.error(f"Blender executable not found for project: {project.file_path}")
             if self.parent:
-                self.parent.log("Error: Blender not found for project")
+                self.parent.log("Error: Blender not found for project", logging.ERROR)
             callback(project.unique_id, None)
             return
 
@@ -152,11 +467,13 @@ class BlenderManager(QObject):
         if not os.path.exists(script_path):
             logger.error(f"Render script not found: {script_path}")
             if self.parent:
-                self.parent.log("Render script not found")
+                self.parent.log("Render script not found", logging.ERROR)
             callback(project.unique_id, None)
             return
 
         settings = project.settings.to_dict()
+        output_path = self.preview_dir / f"{project.unique_id}_{uuid.uuid4().hex}.bmp"
+        resolution_x, resolution_y = self.preview_size
         command = [
             str(blender_path),
             "--background",
@@ -167,67 +484,178 @@ class BlenderManager(QObject):
             settings["render_engine"],
             str(int(settings["cycles_denoising"])),
             settings["cycles_device"],
-            str(settings["threads"])
+            str(settings["threads"]),
+            str(output_path),
+            str(resolution_x),
+            str(resolution_y),
+            "progressive" if progressive else "single"
         ]
 
+        thumbnail_cache = getattr(self.parent, 'thumbnail_cache', None)
+        cache_key = None
+        job = PreviewJob()
+        with self._preview_lock:
+            previous = self._preview_jobs.get(project.unique_id)
+            self._preview_jobs[project.unique_id] = job
+        if previous:
+            previous.cancel()
+
+        def deliver_pass(index, total, path):
+            thumbnail_data = self._take_preview_file(path)
+            if not thumbnail_data:
+                logger.error(f"No thumbnail written to: {path}")
+                return
+            if index < total - 1:
+                self.preview_pass_ready.emit(project.unique_id, thumbnail_data, index, total)
+                return
+            logger.info(f"Successfully processed thumbnail for: {project.unique_id}")
+            job.completed = True
+            if cache_key:
+                thumbnail_cache.put(cache_key, thumbnail_data, project.unique_id)
+            self.thumbnail_ready.emit(project.unique_id, thumbnail_data)
+            callback(project.unique_id, thumbnail_data)
+
+        def finish():
+            job.detach()
+            if started:
+                self.preview_finished.emit(project.unique_id, job.job_id)
+            with self._preview_lock:
+                if self._preview_jobs.get(project.unique_id) is job:
+                    del self._preview_jobs[project.unique_id]
+            if job.cancelled:
+                logger.info(f"Thumbnail render cancelled for: {project.unique_id}")
+            elif not job.completed:
+                callback(project.unique_id, None)
+
+        started = False
+
+        def begin():
+            # Превью интерактивное: планировщик может приостановить фоновый рендер на время его работы.
+            # Сигнал идет только когда у превью есть процесс, иначе приостановленный рендер держал бы его
+            nonlocal started
+            if not started:
+                started = True
+                self.preview_started.emit(project.unique_id, job.job_id)
+
         def run_render():
+            nonlocal cache_key
+            if thumbnail_cache:
+                try:
+                    cache_key = thumbnail_cache.key_for(project, self.preview_size)
+                    thumbnail_data = thumbnail_cache.get(cache_key)
+                except OSError as e:
+                    logger.error(f"Thumbnail cache lookup failed: {str(e)}")
+                    cache_key, thumbnail_data = None, None
+                if thumbnail_data:
+                    logger.info(f"Thumbnail cache hit for: {project.unique_id}")
+                    thumbnail_cache.link(project.unique_id, cache_key)
+                    job.completed = True
+                    self.thumbnail_ready.emit(project.unique_id, thumbnail_data)
+                    callback(project.unique_id, thumbnail_data)
+                    finish()
+                    return
+            if self.use_warm_workers and not job.cancelled:
+                watches = []
+
+                def on_acquire(worker):
+                    job.attach_worker(worker)
+                    watches.append(self.watchdog.watch(project.unique_id, worker.process, timeout=PREVIEW_TIMEOUT))
+                    begin()
+
+                def on_event(event):
+                    watches[-1].touch()
+                    deliver_pass(event["index"], event["total"], event["path"])
+
+                try:
+                    reply = self.preview_pool.submit(blender_path, {
+                        "type": "thumbnail",
+                        "job_id": job.job_id,
+                        "file_path": str(project.file_path),
+                        "render_engine": settings["render_engine"],
+                        "cycles_denoising": int(settings["cycles_denoising"]),
+                        "cycles_device": settings["cycles_device"],
+                        "threads": settings["threads"],
+                        "output_path": str(output_path),
+                        "resolution_x": resolution_x,
+                        "resolution_y": resolution_y,
+                        "progressive": progressive
+                    }, on_event=on_event, on_acquire=on_acquire)
+                except WorkerError as e:
+                    if any(watch.stalled for watch in watches):
+                        logger.error(f"Thumbnail render stopped: {watches[-1].reason}")
+                        finish()
+                        return
+                    logger.warning(f"Warm worker unavailable, falling back to a new process: {str(e)}")
+                else:
+                    if not reply.get("ok"):
+                        logger.error(f"Thumbnail render failed: {reply.get('error')}")
+                        if self.parent:
+                            self.parent.log(f"Thumbnail render failed: {reply.get('error')}", logging.ERROR)
+                    finish()
+                    return
+                finally:
+                    for watch in watches:
+                        self.watchdog.unwatch(watch)
+            watch = None
             try:
-                process = subprocess.run(
+                begin()
+                process = subprocess.Popen(
                     command,
-                    capture_output=True,
-                    text=True,
-                    check=True
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True
                 )
-                logger.info(f"Thumbnail render completed for: {project.file_path}")
-                output = process.stdout.strip()
-
-                data_line = None
-                for line in output.splitlines():
-                    if line.startswith("data:image/png;base64,"):
-                        data_line = line
-                        break
-
-                if data_line:
-                    thumbnail_data = base64.b64decode(data_line.split(",", 1)[1])
-                    logger.info(f"Successfully processed thumbnail for: {project.unique_id}")
-                    self.thumbnail_ready.emit(project.unique_id, thumbnail_data)
-                    callback(project.unique_id, thumbnail_data)
+                job.attach_process(process)
+                watch = self.watchdog.watch(project.unique_id, process, timeout=PREVIEW_TIMEOUT)
+                tail = deque(maxlen=20)
+                for line in process.stdout:
+                    watch.touch()
+                    if line.startswith("preview_pass:"):
+                        _, index, total, path = line.rstrip("\n").split(":", 3)
+                        deliver_pass(int(index), int(total), path)
+                    else:
+                        tail.append(line)
+                stderr = "".join(tail)
+                if watch.stalled:
+                    logger.error(f"Thumbnail render stopped: {watch.reason}")
+                    if self.parent:
+                        self.parent.log(f"Thumbnail render stopped: {watch.reason}", logging.ERROR)
+                elif process.wait() != 0 and not job.cancelled:
+                    logger.error(f"Thumbnail render failed with code {process.returncode}: {stderr}")
+                    if self.parent:
+                        self.parent.log(f"Thumbnail render failed: {stderr}", logging.ERROR)
                 else:
-                    logger.error(f"No valid thumbnail data found in output: {output}")
-                    callback(project.unique_id, None)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Thumbnail render failed with code {e.returncode}: {e.stderr}")
-                if self.parent:
-                    self.parent.log(f"Thumbnail render failed: {e.stderr}")
-                callback(project.unique_id, None)
+                    logger.info(f"Thumbnail render completed for: {project.file_path}")
             except Exception as e:
                 logger.error(f"Unexpected error in thumbnail render: {str(e)}")
                 if self.parent:
-                    self.parent.log(f"Thumbnail render error: {str(e)}")
-                callback(project.unique_id, None)
+                    self.parent.log(f"Thumbnail render error: {str(e)}", logging.ERROR)
+            finally:
+                if watch is not None:
+                    self.watchdog.unwatch(watch)
+            finish()
 
-        threading.Thread(target=run_render).start()
+        threading.Thread(target=run_render, daemon=True).start()
 
-    def render_project(self, project, log_callback):
-        if not project.settings.blender_path or not os.path.exists(project.settings.blender_path):
-            log_callback("Путь к исполняемому файлу Blender не указан или недоступен")
-            return
-        script_path = Path(__file__).parent / "render_script.py"
-        if not script_path.exists():
-            log_callback(f"Скрипт рендеринга не найден: {script_path}")
-            return
+    def cancel_thumbnail(self, unique_id):
+        with self._preview_lock:
+            job = self._preview_jobs.get(unique_id)
+        if job:
+            job.cancel()
+        return job is not None
 
-        blender_path = project.settings.blender_path
+    def build_render_command(self, project, threads=None, frame_range=None, output_dir=None, file_format=None):
+        script_path = Path(__file__).parent / "render_script.py"
         settings = project.settings.to_dict()
-        settings["project_path"] = str(project.file_path)
-        settings["unique_id"] = project.unique_id
+        file_format = file_format or project.settings.file_format
+        frame_start, frame_end = frame_range or (project.settings.frame_start, project.settings.frame_end)
 
-        output_path = Path(settings["output_path"])
+        output_path = Path(output_dir or settings["output_path"])
         if settings["output_filename"]:
             output_path = output_path / settings["output_filename"]
 
         command = [
-            str(blender_path),
+            str(project.settings.blender_path),
             "--background",
             "--python", str(script_path),
             "--"
@@ -237,23 +665,25 @@ class BlenderManager(QObject):
                 "--type", "image",
                 "--frame", str(project.settings.frame_current),
                 "--output", str(output_path),
-                "--format", project.settings.file_format
+                "--format", file_format
             ])
         else:
             command.extend([
                 "--type", "animation",
-                "--start", str(project.settings.frame_start),
-                "--end", str(project.settings.frame_end),
+                "--start", str(frame_start),
+                "--end", str(frame_end),
                 "--step", str(project.settings.frame_step),
                 "--output", str(output_path),
-                "--format", project.settings.file_format
+                "--format", file_format
             ])
+        if project.settings.skip_existing and file_format not in project.settings.file_formats_movie:
+            command.append("--skip_existing")
         command.extend([
             "--engine", project.settings.render_engine,
             "--samples", str(project.settings.cycles_samples if project.settings.render_engine == "CYCLES" else project.settings.eevee_samples),
             "--denoising", str(int(project.settings.cycles_denoising)),
             "--device", project.settings.cycles_device,
-            "--threads", str(project.settings.threads),
+            "--threads", str(threads or project.settings.threads),
             "--resolution_x", str(project.settings.resolution_x),
             "--resolution_y", str(project.settings.resolution_y),
             "--resolution_scale", str(project.settings.resolution_scale),
@@ -262,25 +692,327 @@ class BlenderManager(QObject):
             "--filename", settings["output_filename"],
             str(project.file_path)
         ])
+        return command
 
-        def run_render():
-            try:
-                process = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
+    def scan_output(self, project, output_dir=None, file_format=None):
+        """Все кадры проекта и результат проверки папки вывода (None, если дорендер не применим).
+
+        Видеофайл целиком не дорендеривается, поэтому для него проверки нет.
+        """
+        settings = project.settings
+        if settings.render_type == "Image":
+            frames = [settings.frame_current]
+        else:
+            frames = list(range(settings.frame_start, settings.frame_end + 1, max(1, settings.frame_step)))
+        file_format = file_format or settings.file_format
+        if not settings.skip_existing or file_format in settings.file_formats_movie:
+            return frames, None
+        directory, filename = output_location(output_dir or settings.output_path, settings.output_filename)
+        return frames, scan_frames(directory, filename, file_format, frames, still=settings.render_type == "Image")
+
+    def pending_frames(self, project, log_callback, output_dir=None, file_format=None, exclude=()):
+        """Кадры, которые нужно отрендерить.
+
+        В режиме дорендера (settings.skip_existing) уже готовые кадры и свежие заглушки
+        параллельных процессов исключаются, а недописанные файлы удаляются.
+        exclude - кадры, сохраненные прошлыми попытками того же задания.
+        """
+        frames, scan = self.scan_output(project, output_dir, file_format)
+        if exclude:
+            frames = [frame for frame in frames if frame not in exclude]
+        if scan is None:
+            return frames
+        remove_broken(scan)
+        missing = [frame for frame in scan.missing if frame not in exclude]
+        if len(missing) < len(frames):
+            message = (f"Дорендер {project.name}: готово кадров {len(scan.complete)} из {len(frames)}, "
+                       f"осталось {len(missing)}")
+            if scan.claimed:
+                message += f", рендерится другим процессом: {len(scan.claimed)}"
+            log_callback(message)
+        return missing
+
+    def release_placeholders(self, project, frame_range, since, output_dir=None, file_format=None):
+        """Убирает заглушки, оставленные прерванным процессом Blender в его диапазоне кадров."""
+        settings = project.settings
+        file_format = file_format or settings.file_format
+        if not settings.skip_existing or settings.render_type == "Image" or file_format in settings.file_formats_movie:
+            return
+        directory, filename = output_location(output_dir or settings.output_path, settings.output_filename)
+        start, end = frame_range
+        remove_placeholders(directory, filename, file_format, range(start, end + 1, max(1, settings.frame_step)), since)
+
+    def unfinished_frames(self, project, output_dir=None, file_format=None):
+        """Кадры без готового файла после дорендера, например заглушки упавшего параллельного процесса."""
+        frames, scan = self.scan_output(project, output_dir, file_format)
+        return [] if scan is None else [frame for frame in frames if frame not in scan.complete]
+
+    def build_assemble_command(self, project, frames_dir):
+        script_path = Path(__file__).parent / "render_script.py"
+        output_path = Path(project.settings.output_path)
+        if project.settings.output_filename:
+            output_path = output_path / project.settings.output_filename
+        return [
+            str(project.settings.blender_path),
+            "--background",
+            "--factory-startup",
+            "--python", str(script_path),
+            "--",
+            "--type", "assemble",
+            "--frames_dir", str(frames_dir),
+            "--output", str(output_path),
+            "--format", project.settings.file_format,
+            "--engine", project.settings.render_engine,
+            "--samples", "1",
+            "--denoising", "0",
+            "--device", "CPU",
+            "--threads", str(project.settings.threads),
+            "--resolution_x", str(project.settings.resolution_x),
+            "--resolution_y", str(project.settings.resolution_y),
+            "--resolution_scale", str(project.settings.resolution_scale),
+            "--fps", str(project.settings.fps),
+            "--fps_base", str(project.settings.fps_base),
+            "--filename", project.settings.output_filename
+        ]
+
+    def run_render(self, project, log_callback, threads=None, attempts=None):
+        """Синхронный рендер проекта. Возвращает (success, message).
+
+        Время кадров и пиковая память записываются в историю рендеров для оценки ETA.
+        attempts (RenderAttempts) накапливает сохраненные кадры между повторами: повтор
+        продолжает с первого несохраненного кадра. Видео одним процессом продолжить
+        нельзя, оно рендерится заново.
+        """
+        recorder = RenderRecorder(project, threads or project.settings.threads,
+                                  self.get_blender_version(project.settings.blender_path))
+        owned = self.jobs.get(project.unique_id) is None
+        handle = self.jobs.open(project.unique_id)
+        launched = handle.launched
+        exclude = ()
+        if attempts is not None:
+            attempts.count += 1
+            settings = project.settings
+            if settings.render_type == "Animation" and (settings.shard_workers > 1
+                                                        or settings.file_format not in settings.file_formats_movie):
+                exclude = frozenset(attempts.done_frames)
+
+        def on_progress(progress):
+            recorder.on_progress(progress)
+            if attempts is not None and progress.saved_path:
+                attempts.done_frames.add(progress.frame)
+
+        self.telemetry.start_job(project.unique_id)
+        try:
+            success, message = self._run_render(project, log_callback, threads, on_progress, exclude)
+        finally:
+            telemetry = self.telemetry.finish_job(project.unique_id)
+            self.admission.release(project.unique_id)
+            if owned:
+                self.jobs.close(handle)
+        if handle.cancelled:
+            success, message = False, RENDER_CANCELLED
+        if attempts is not None:
+            # Без запущенного процесса Blender ошибка в настройках, повтор ее не исправит
+            attempts.retryable = not handle.cancelled and handle.launched > launched
+        summary = telemetry.summary() if telemetry else {}
+        if summary:
+            log_callback(f"Ресурсы {project.name}: пик RSS {format_bytes(summary['peak_rss'])}, "
+                         f"CPU в среднем {summary['avg_cpu']:.0f}% (пик {summary['peak_cpu']:.0f}%), "
+                         f"потоков до {summary['max_threads']}, чтение {format_bytes(summary['io_read'])}, "
+                         f"запись {format_bytes(summary['io_write'])}")
+        self._save_render_history(recorder, success, telemetry)
+        return success, message
+
+    def _save_render_history(self, recorder, success, telemetry=None):
+        db_manager = getattr(self.parent, "db_manager", None)
+        if db_manager is None:
+            return
+        try:
+            record, frames = recorder.record(success)
+            series = []
+            if telemetry:
+                record.update(telemetry.summary())
+                series = telemetry.series()
+            db_manager.add_render_history(record, frames, series)
+        except Exception as e:
+            logger.warning(f"Failed to save render history: {str(e)}")
+
+    def _run_render(self, project, log_callback, threads, on_progress, exclude=()):
+        if not project.settings.blender_path or not os.path.exists(project.settings.blender_path):
+            message = "Путь к исполняемому файлу Blender не указан или недоступен"
+            log_callback(message, logging.ERROR)
+            self.render_complete.emit(project.unique_id, False, message)
+            return False, message
+        script_path = Path(__file__).parent / "render_script.py"
+        if not script_path.exists():
+            message = f"Скрипт рендеринга не найден: {script_path}"
+            log_callback(message, logging.ERROR)
+            self.render_complete.emit(project.unique_id, False, message)
+            return False, message
+
+        if project.settings.render_type == "Animation" and project.settings.shard_workers > 1:
+            sharded = ShardedRender(self, project, log_callback, threads or project.settings.threads,
+                                    project.settings.shard_workers, on_progress, exclude)
+            success, message = sharded.run()
+            if self.jobs.is_cancelled(project.unique_id):
+                success, message = False, RENDER_CANCELLED
+                log_callback(f"{project.name}: {message.lower()}", logging.WARNING)
+            elif success:
                 logger.info(f"Render completed for project: {project.name}")
                 log_callback(f"Рендеринг завершен для проекта: {project.name}")
-                self.render_complete.emit(project.unique_id, True, "Рендеринг успешно завершен")
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Render failed with code {e.returncode}: {e.stderr}")
-                log_callback(f"Ошибка рендеринга проекта {project.name}: {e.stderr}")
-                self.render_complete.emit(project.unique_id, False, f"Ошибка: {e.stderr}")
-            except Exception as e:
-                logger.error(f"Unexpected error in render: {str(e)}")
-                log_callback(f"Ошибка рендеринга проекта {project.name}: {str(e)}")
-                self.render_complete.emit(project.unique_id, False, f"Ошибка: {str(e)}")
+            else:
+                log_callback(f"Ошибка рендеринга проекта {project.name}: {message}", logging.ERROR)
+            self.render_complete.emit(project.unique_id, success, message)
+            return success, message
+
+        frames = self.pending_frames(project, log_callback, exclude=exclude)
+        if not frames:
+            message = "Все кадры уже отрендерены"
+            log_callback(f"{project.name}: {message.lower()}")
+            self.render_complete.emit(project.unique_id, True, message)
+            return True, message
+        # Готовые кадры внутри диапазона Blender пропускает сам (use_overwrite = False)
+        if exclude and frames[0] != project.settings.frame_start:
+            log_callback(f"{project.name}: продолжение с кадра {frames[0]}")
+        command = self.build_render_command(project, threads, frame_range=(frames[0], frames[-1]))
+        if self.use_warm_workers and project.settings.render_type == "Image":
+            handle = self.jobs.get(project.unique_id)
+            workers = []
+            watches = []
+
+            def on_acquire(worker):
+                workers.append(worker)
+                if handle:
+                    handle.attach(worker.process)
+                # Прогретый процесс не выводит строк: зависание видно только по простою CPU
+                watches.append(self.watchdog.watch(project.unique_id, worker.process, handle))
+                # Телеметрия и закрепление за ядрами планировщика, как у отдельного процесса
+                self.process_started.emit(project.unique_id, worker.process)
+
+            try:
+                reply = self.worker_pool.submit(str(project.settings.blender_path), {
+                    "type": "render",
+                    "args": command[command.index("--") + 1:]
+                }, on_acquire=on_acquire, cancelled=lambda: handle is not None and handle.cancelled, wait=False)
+            except WorkerBusy as e:
+                # Рендеров больше, чем процессов в пуле: лишний рендер идет отдельным процессом, а не ждет
+                logger.info(f"{str(e)}, rendering {project.name} in a new process")
+            except WorkerError as e:
+                if handle is not None and handle.cancelled:
+                    message = RENDER_CANCELLED
+                    log_callback(f"{project.name}: {message.lower()}", logging.WARNING)
+                    self.render_complete.emit(project.unique_id, False, message)
+                    return False, message
+                stalled = next((watch for watch in watches if watch.stalled), None)
+                if stalled is not None:
+                    message = f"Ошибка: Blender завершен сторожем: {stalled.reason}"
+                    log_callback(f"Ошибка рендеринга проекта {project.name}: {message}", logging.ERROR)
+                    self.render_complete.emit(project.unique_id, False, message)
+                    return False, message
+                logger.warning(f"Warm worker unavailable, falling back to a new process: {str(e)}")
+            else:
+                if reply.get("ok"):
+                    logger.info(f"Render completed for project: {project.name}")
+                    log_callback(f"Рендеринг завершен для проекта: {project.name}")
+                    message = "Рендеринг успешно завершен"
+                    self.render_complete.emit(project.unique_id, True, message)
+                    return True, message
+                logger.error(f"Render failed: {reply.get('error')}")
+                log_callback(f"Ошибка рендеринга проекта {project.name}: {reply.get('error')}", logging.ERROR)
+                message = f"Ошибка: {reply.get('error')}"
+                self.render_complete.emit(project.unique_id, False, message)
+                return False, message
+            finally:
+                for worker in workers:
+                    if handle:
+                        handle.detach(worker.process)
+                for watch in watches:
+                    self.watchdog.unwatch(watch)
+        started = time.time()
+        try:
+            try:
+                self.run_blender_process(command, project.unique_id, on_progress)
+            finally:
+                self.release_placeholders(project, (frames[0], frames[-1]), started)
+            unfinished = self.unfinished_frames(project)
+            if unfinished:
+                message = f"Ошибка: нет готовых файлов для кадров: {len(unfinished)} (первый: {unfinished[0]})"
+                log_callback(f"Ошибка рендеринга проекта {project.name}: {message}", logging.ERROR)
+                self.render_complete.emit(project.unique_id, False, message)
+                return False, message
+            logger.info(f"Render completed for project: {project.name}")
+            log_callback(f"Рендеринг завершен для проекта: {project.name}")
+            message = "Рендеринг успешно завершен"
+            self.render_complete.emit(project.unique_id, True, message)
+            return True, message
+        except JobCancelled:
+            message = RENDER_CANCELLED
+            log_callback(f"{project.name}: {message.lower()}", logging.WARNING)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Render failed with code {e.returncode}: {e.stderr}")
+            log_callback(f"Ошибка рендеринга проекта {project.name}: {e.stderr}", logging.ERROR)
+            message = f"Ошибка: {e.stderr}"
+        except Exception as e:
+            logger.error(f"Unexpected error in render: {str(e)}")
+            log_callback(f"Ошибка рендеринга проекта {project.name}: {str(e)}", logging.ERROR)
+            message = f"Ошибка: {str(e)}"
+        self.render_complete.emit(project.unique_id, False, message)
+        return False, message
 
-        threading.Thread(target=run_render).start()
+    def run_blender_process(self, command, unique_id, on_progress=None, on_process=None):
+        """Запускает Blender и читает вывод построчно, отправляя события прогресса.
+
+        on_progress получает каждое событие без прореживания (для истории рендеров).
+        on_process получает запущенный процесс, чтобы вызывающий код мог его завершить.
+        В памяти держатся только последние строки вывода для сообщения об ошибке.
+        При ненулевом коде возврата выбрасывается CalledProcessError, если задание
+        отменено через jobs - JobCancelled, если процесс завершил сторож (watchdog) -
+        RenderStalled.
+        """
+        handle = self.jobs.get(unique_id)
+        if handle is not None and handle.cancelled:
+            raise JobCancelled(unique_id)
+        parser = ProgressParser()
+        tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        last_emit = 0.0
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            bufsize=1
+        )
+        if handle is not None:
+            handle.attach(process)
+        watch = self.watchdog.watch(unique_id, process, handle)
+        self.process_started.emit(unique_id, process)
+        if on_process:
+            on_process(process)
+        try:
+            with process:
+                for line in process.stdout:
+                    watch.touch()
+                    tail.append(line)
+                    progress = parser.feed(line)
+                    if progress is None:
+                        continue
+                    if on_progress:
+                        on_progress(progress)
+                    now = time.monotonic()
+                    if progress.saved_path or now - last_emit >= PROGRESS_INTERVAL:
+                        last_emit = now
+                        self.render_progress.emit(unique_id, progress)
+        finally:
+            self.watchdog.unwatch(watch)
+            if handle is not None:
+                handle.detach(process)
+        if handle is not None and handle.cancelled:
+            raise JobCancelled(unique_id)
+        if watch.stalled:
+            raise RenderStalled(process.returncode, command, f"Blender завершен сторожем: {watch.reason}",
+                                "".join(tail))
+        if process.returncode != 0:
+            output = "".join(tail)
+            raise subprocess.CalledProcessError(process.returncode, command, output=output, stderr=output)
+        return parser.state
@@ -0,0 +1,33 @@
+import bpy
+import sys
+import json
+import logging
+
+logger = logging.getLogger('CapabilitiesScript')
+
+CAPABILITIES_PREFIX = "capabilities:"
+
+
+def read_capabilities():
+    engines = [item.identifier for item in bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items]
+    gpu_backends = []
+    try:
+        cycles_prefs = bpy.context.preferences.addons['cycles'].preferences
+        gpu_backends = [device_type[0] for device_type in cycles_prefs.get_device_types(bpy.context)
+                        if device_type[0] != 'NONE']
+    except (KeyError, AttributeError) as e:
+        logger.warning(f"Cycles preferences unavailable: {str(e)}")
+    return {
+        "version": bpy.app.version_string.split(" ")[0],
+        "engines": engines,
+        "gpu_backends": gpu_backends,
+    }
+
+
+if __name__ == "__main__":
+    try:
+        print(CAPABILITIES_PREFIX + json.dumps(read_capabilities()), flush=True)
+    except Exception as e:
+        logger.error(f"Capabilities probe failed: {str(e)}")
+        print(f"Error: {str(e)}", flush=True)
+        sys.exit(1)
@@ -0,0 +1,232 @@
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.models.project import logical_cpu_count
+from src.logger_config import setup_logger
+
+logger = setup_logger('CpuAllocator')
+
+SYSFS_CPU = Path("/sys/devices/system/cpu")
+SYSFS_NODE = Path("/sys/devices/system/node")
+PROC_ROOT = Path("/proc")
+BACKGROUND_NICE = 10
+BACKGROUND_IO_LEVEL = 7  # самый низкий уровень в классе best-effort
+
+
+def load_psutil():
+    # psutil импортируется только при первом закреплении процесса: его импорт заметно замедляет старт
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil
+
+
+def parse_cpu_list(text):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+@dataclass(frozen=True, slots=True)
+class PhysicalCore:
+    node: int
+    package: int
+    cpus: tuple  # логические CPU ядра (SMT-соседи)
+
+
+@dataclass(frozen=True, slots=True)
+class Allocation:
+    cpus: tuple
+    threads: int
+    nodes: tuple
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(logical_cpu_count()))
+
+
+def detect_topology():
+    """Физические ядра доступных процессу CPU в порядке NUMA-узел, сокет, номер CPU.
+
+    На Linux топология читается из sysfs. На других системах SMT-соседи считаются
+    соседними номерами CPU, если psutil сообщает, что физических ядер меньше логических.
+    """
+    cpus = available_cpus()
+    allowed = set(cpus)
+    node_of = {}
+    for node_dir in SYSFS_NODE.glob("node[0-9]*"):
+        try:
+            for cpu in parse_cpu_list((node_dir / "cpulist").read_text()):
+                node_of[cpu] = int(node_dir.name[4:])
+        except (OSError, ValueError):
+            continue
+
+    cores = {}
+    if (SYSFS_CPU / f"cpu{cpus[0]}" / "topology").is_dir():
+        for cpu in cpus:
+            topology = SYSFS_CPU / f"cpu{cpu}" / "topology"
+            try:
+                package = int((topology / "physical_package_id").read_text())
+                siblings = tuple(c for c in parse_cpu_list((topology / "thread_siblings_list").read_text())
+                                 if c in allowed)
+            except (OSError, ValueError):
+                package, siblings = 0, ()
+            siblings = siblings or (cpu,)
+            cores[siblings] = PhysicalCore(node_of.get(siblings[0], 0), max(package, 0), siblings)
+    else:
+        psutil = load_psutil()
+        physical = psutil.cpu_count(logical=False) if psutil else None
+        smt = len(cpus) // physical if physical and len(cpus) % physical == 0 else 1
+        for index in range(0, len(cpus), smt):
+            siblings = tuple(cpus[index:index + smt])
+            cores[siblings] = PhysicalCore(0, 0, siblings)
+    return sorted(cores.values(), key=lambda core: (core.node, core.package, core.cpus))
+
+
+class CpuAllocator:
+    """Делит физические ядра машины на слоты для одновременно работающих процессов Blender.
+
+    Слот - непрерывный блок физических ядер вместе с их SMT-соседями, поэтому при
+    числе слотов, кратном числу NUMA-узлов, задание не выходит за пределы своего узла.
+    Задание занимает свободный слот при запуске и освобождает его при завершении;
+    при изменении числа слотов или бюджета ядер занятые слоты пересчитываются.
+    """
+
+    def __init__(self, slots=1, core_budget=None, topology=None):
+        self._topology = topology
+        self._slots = max(1, int(slots))
+        self._core_budget = core_budget
+        self._layout = None
+        self._owners = {}  # job_id -> индекс слота
+        self._lock = threading.Lock()
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def topology(self):
+        if self._topology is None:
+            self._topology = detect_topology()
+        return self._topology
+
+    def configure(self, slots=None, core_budget=None):
+        """Меняет число слотов или бюджет; возвращает новые выделения занятых слотов {job_id: Allocation}."""
+        with self._lock:
+            if slots is not None:
+                self._slots = max(1, int(slots))
+            if core_budget is not None:
+                self._core_budget = max(1, int(core_budget))
+            self._layout = None
+            # Задания сохраняют номер слота, если он остался; остальные переезжают в свободные
+            owners = self._owners
+            self._owners = {job_id: index for job_id, index in owners.items() if index < self._slots}
+            for job_id in owners:
+                if job_id not in self._owners:
+                    self._owners[job_id] = self._free_slot()
+            return {job_id: self._allocation(index) for job_id, index in self._owners.items()}
+
+    def acquire(self, job_id, share_with=None):
+        """share_with - задание, чей слот занять (вытесненное задание отдает свои ядра)."""
+        with self._lock:
+            if job_id not in self._owners:
+                shared = self._owners.get(share_with)
+                self._owners[job_id] = self._free_slot() if shared is None else shared
+            return self._allocation(self._owners[job_id])
+
+    def release(self, job_id):
+        with self._lock:
+            self._owners.pop(job_id, None)
+
+    def allocation(self, job_id):
+        with self._lock:
+            index = self._owners.get(job_id)
+            return None if index is None else self._allocation(index)
+
+    def _free_slot(self):
+        layout = self._slot_layout()
+        used = list(self._owners.values())
+        # Свободный слот, а если заданий больше слотов - наименее занятый
+        return min(range(len(layout)), key=lambda index: (used.count(index), index))
+
+    def _slot_layout(self):
+        if self._layout is not None:
+            return self._layout
+        cores, cpu_count = [], 0
+        budget = self._core_budget or sum(len(core.cpus) for core in self.topology)
+        for core in self.topology:
+            if cpu_count >= budget:
+                break
+            cores.append(core)
+            cpu_count += len(core.cpus)
+        if len(cores) >= self._slots:
+            size, extra = divmod(len(cores), self._slots)
+            layout, start = [], 0
+            for index in range(self._slots):
+                count = size + (1 if index < extra else 0)
+                layout.append(cores[start:start + count])
+                start += count
+        else:
+            # Слотов больше, чем ядер: слоты делят ядра по кругу
+            layout = [[cores[index % len(cores)]] for index in range(self._slots)]
+        self._layout = layout
+        return layout
+
+    def _allocation(self, index):
+        cores = self._slot_layout()[index]
+        cpus = tuple(cpu for core in cores for cpu in core.cpus)
+        return Allocation(cpus, len(cpus), tuple(sorted({core.node for core in cores})))
+
+
+def _thread_ids(pid):
+    try:
+        return [int(tid) for tid in os.listdir(PROC_ROOT / str(pid) / "task")]
+    except OSError:
+        return [pid]
+
+
+def pin_process(pid, cpus):
+    """Закрепляет процесс за CPU. На Linux маска ставится каждому потоку: уже запущенные
+    потоки Blender не наследуют новую маску процесса."""
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            for tid in _thread_ids(pid):
+                os.sched_setaffinity(tid, cpus)
+            return True
+        psutil = load_psutil()
+        if psutil and hasattr(psutil.Process, "cpu_affinity"):
+            psutil.Process(pid).cpu_affinity(list(cpus))
+            return True
+    except Exception as e:
+        logger.warning(f"Failed to pin process {pid} to CPUs {list(cpus)}: {str(e)}")
+    return False
+
+
+def lower_priority(pid):
+    """Понижает приоритет CPU и ввода-вывода фонового рендера."""
+    psutil = load_psutil()
+    try:
+        if psutil:
+            process = psutil.Process(pid)
+            if sys.platform == "win32":
+                process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+                process.ionice(psutil.IOPRIO_LOW)
+            else:
+                process.nice(BACKGROUND_NICE)
+                if hasattr(process, "ionice"):
+                    process.ionice(psutil.IOPRIO_CLASS_BE, BACKGROUND_IO_LEVEL)
+        elif hasattr(os, "setpriority"):
+            os.setpriority(os.PRIO_PROCESS, pid, BACKGROUND_NICE)
+    except Exception as e:
+        logger.warning(f"Failed to lower priority of process {pid}: {str(e)}")
@@ -0,0 +1,173 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.logger_config import setup_logger
+
+logger = setup_logger('FrameScan')
+
+FORMAT_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "EXR": ".exr"}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_TRAILER = b"IEND\xaeB`\x82"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+JPEG_TRAILER = b"\xff\xd9"
+EXR_SIGNATURE = b"\x76\x2f\x31\x01"
+MIN_FRAME_BYTES = 32
+PLACEHOLDER_TIMEOUT = 15 * 60  # секунды; более старые заглушки считаются брошенными
+SCAN_THREADS = 8
+MTIME_SLACK = 2.0  # грубое время изменения файлов на некоторых ФС
+HASH_RUN_RE = re.compile(r"#+")
+
+
+def frame_name_template(filename, file_format, still=False):
+    """Шаблон str.format имени кадра по правилам Blender.
+
+    Последняя группа '#' заменяется номером кадра той же ширины, без '#' добавляются
+    4 цифры в конце; для одиночного изображения (write_still) номер не добавляется.
+    """
+    escaped = filename.replace("{", "{{").replace("}", "}}")
+    runs = list(HASH_RUN_RE.finditer(escaped))
+    if still:
+        template, tail = escaped, filename
+    elif runs:
+        run = runs[-1]
+        template = f"{escaped[:run.start()]}{{:0{len(run.group())}d}}{escaped[run.end():]}"
+        tail = escaped[run.end():]
+    else:
+        template, tail = escaped + "{:04d}", ""
+    # Расширение добавляется, если имя после номера кадра им не заканчивается ("render.png0001.png")
+    extension = FORMAT_EXTENSIONS.get(file_format, "")
+    if extension and not tail.lower().endswith(extension):
+        template += extension
+    return template
+
+
+def frame_file_name(filename, frame, file_format, still=False):
+    return frame_name_template(filename, file_format, still).format(frame)
+
+
+def read_frame_state(path, file_format):
+    """(готов ли файл, os.stat_result) за одно открытие; (False, None), если файла нет.
+
+    Готовый файл начинается с сигнатуры формата и, где он есть, заканчивается
+    завершающим маркером, поэтому оборванная запись не считается кадром.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return False, None
+    try:
+        stat = os.fstat(fd)
+        if stat.st_size < MIN_FRAME_BYTES:
+            return False, stat
+        head = os.pread(fd, 16, 0) if hasattr(os, "pread") else os.read(fd, 16)
+        if file_format == "PNG":
+            complete = head.startswith(PNG_SIGNATURE) and _read_tail(fd, stat, PNG_TRAILER) == PNG_TRAILER
+        elif file_format == "JPEG":
+            complete = head.startswith(JPEG_SIGNATURE) and _read_tail(fd, stat, JPEG_TRAILER) == JPEG_TRAILER
+        elif file_format == "EXR":
+            complete = head.startswith(EXR_SIGNATURE)
+        else:
+            complete = True
+        return complete, stat
+    except OSError:
+        return False, None
+    finally:
+        os.close(fd)
+
+
+def _read_tail(fd, stat, trailer):
+    offset = stat.st_size - len(trailer)
+    if hasattr(os, "pread"):
+        return os.pread(fd, len(trailer), offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, len(trailer))
+
+
+@dataclass(slots=True)
+class FrameScan:
+    """Состояние кадров диапазона в папке вывода."""
+    complete: set = field(default_factory=set)
+    claimed: set = field(default_factory=set)  # свежие заглушки: кадр рендерит другой процесс
+    broken: dict = field(default_factory=dict)  # frame -> путь недописанного файла или брошенной заглушки
+    missing: list = field(default_factory=list)  # кадры для рендера, по возрастанию
+
+
+def scan_frames(output_dir, filename, file_format, frames, still=False, placeholder_timeout=PLACEHOLDER_TIMEOUT):
+    """Проверяет, какие кадры уже отрендерены.
+
+    Папка читается одним os.scandir, поэтому сотни тысяч посторонних файлов не
+    замедляют поиск; содержимое проверяется только у ожидаемых кадров, чтение
+    заголовков идет в нескольких потоках (полезно на сетевых дисках).
+    Пустые файлы моложе placeholder_timeout считаются заглушками параллельного
+    рендера (use_placeholder в Blender); недописанные файлы попадают в broken.
+    """
+    result = FrameScan()
+    frames = list(frames)
+    template = frame_name_template(filename, file_format, still)
+    expected = {template.format(frame): frame for frame in frames}
+    paths = {}
+    try:
+        with os.scandir(output_dir) as it:
+            for entry in it:
+                if entry.name in expected:
+                    paths[expected[entry.name]] = entry.path
+    except FileNotFoundError:
+        pass
+
+    def check(batch):
+        return [(frame, *read_frame_state(paths[frame], file_format)) for frame in batch]
+
+    # Пачки вместо отдельной задачи на файл: накладные расходы пула больше, чем чтение заголовка
+    found = list(paths)
+    batches = [found[i::SCAN_THREADS] for i in range(min(SCAN_THREADS, len(found)))]
+    now = time.time()
+    with ThreadPoolExecutor(max_workers=SCAN_THREADS) as executor:
+        for batch in executor.map(check, batches):
+            for frame, complete, stat in batch:
+                if complete:
+                    result.complete.add(frame)
+                elif stat is not None and stat.st_size == 0 and now - stat.st_mtime < placeholder_timeout:
+                    result.claimed.add(frame)
+                elif stat is not None:
+                    result.broken[frame] = paths[frame]
+    result.missing = [frame for frame in frames
+                      if frame not in result.complete and frame not in result.claimed]
+    return result
+
+
+def remove_broken(scan):
+    """Удаляет недописанные файлы и брошенные заглушки, чтобы Blender перерендерил эти кадры."""
+    for frame, path in scan.broken.items():
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Cannot remove incomplete frame {path}: {str(e)}")
+
+
+def remove_placeholders(output_dir, filename, file_format, frames, since):
+    """Удаляет пустые заглушки, созданные не раньше since (время запуска своего процесса Blender).
+
+    Blender не убирает заглушку, если рендер кадра прервался, и без этого повторный
+    запуск считал бы кадр занятым другим процессом до истечения PLACEHOLDER_TIMEOUT.
+    """
+    template = frame_name_template(filename, file_format)
+    for frame in frames:
+        path = os.path.join(output_dir, template.format(frame))
+        try:
+            stat = os.stat(path)
+            if stat.st_size == 0 and stat.st_mtime >= since - MTIME_SLACK:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def output_location(output_path, output_filename):
+    """Папка и шаблон имени так же, как их собирает render_script.py."""
+    path = Path(output_path)
+    if output_filename:
+        path = path / output_filename
+    return path.parent, path.name
@@ -0,0 +1,156 @@
+import logging
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.blender.job_control import JobCancelled, RENDER_CANCELLED
+from src.logger_config import setup_logger
+
+logger = setup_logger('FrameSharding')
+
+CHUNKS_PER_WORKER = 2
+
+
+def split_frames(frames, chunks):
+    """Разбивает отсортированный список кадров на куски (start, end) примерно поровну.
+
+    Кусок может перекрывать уже готовые кадры: при дорендере Blender их пропускает.
+    """
+    if not frames:
+        return []
+    chunks = max(1, min(chunks, len(frames)))
+    size, extra = divmod(len(frames), chunks)
+    ranges = []
+    index = 0
+    for i in range(chunks):
+        count = size + (1 if i < extra else 0)
+        part = frames[index:index + count]
+        ranges.append((part[0], part[-1]))
+        index += count
+    return ranges
+
+
+class FrameChunk:
+    def __init__(self, index, start, end):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.status = "pending"  # pending, running, done, failed
+        self.message = ""
+
+
+class ShardedRender:
+    """Рендер анимации несколькими параллельными процессами Blender по кускам кадров."""
+
+    def __init__(self, blender_manager, project, log_callback, threads, workers, on_progress=None, exclude=()):
+        self.blender_manager = blender_manager
+        self.project = project
+        self.log_callback = log_callback
+        self.on_progress = on_progress
+        self.workers = max(1, workers)
+        self.threads = max(1, threads // self.workers)
+        settings = project.settings
+        self.is_movie = settings.file_format in settings.file_formats_movie
+        self.output_dir = Path(settings.output_path)
+        self.chunk_dir = self.output_dir / f".chunks_{project.unique_id}"
+        self.exclude = exclude  # кадры, сохраненные прошлыми попытками
+        frames = blender_manager.pending_frames(project, log_callback, *self._frames_location(), exclude=exclude)
+        ranges = split_frames(frames, self.workers * CHUNKS_PER_WORKER)
+        self.chunks = [FrameChunk(i, start, end) for i, (start, end) in enumerate(ranges)]
+        self._lock = threading.Lock()
+
+    def completed_count(self):
+        with self._lock:
+            return sum(1 for chunk in self.chunks if chunk.status == "done")
+
+    def run(self):
+        if not self.chunks and not self.exclude and not (self.project.settings.skip_existing
+                                                         and self.project.settings.frame_count()):
+            return False, "Пустой диапазон кадров"
+        if self.chunks:
+            logger.info(f"Sharded render of {self.project.name}: {len(self.chunks)} chunks, "
+                        f"{self.workers} workers x {self.threads} threads")
+            self.log_callback(f"Рендеринг {self.project.name} в {self.workers} процессах, кусков: {len(self.chunks)}")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self._render_chunk, self.chunks))
+            if not all(results):
+                failed = [chunk for chunk in self.chunks if chunk.status == "failed"]
+                return False, f"Ошибка: не отрендерено кусков: {len(failed)}. {failed[0].message}"
+        unfinished = self.blender_manager.unfinished_frames(self.project, *self._frames_location())
+        if unfinished:
+            return False, f"Ошибка: нет готовых файлов для кадров: {len(unfinished)} (первый: {unfinished[0]})"
+        if self.is_movie:
+            return self._assemble_movie()
+        if not self.chunks:
+            return True, "Все кадры уже отрендерены"
+        return True, "Рендеринг успешно завершен"
+
+    def _frames_location(self):
+        # Видео собирается из PNG во временной папке, дорендер проверяет ее
+        return (self.chunk_dir, "PNG") if self.is_movie else ()
+
+    def _chunk_command(self, chunk):
+        if self.is_movie:
+            return self.blender_manager.build_render_command(
+                self.project, self.threads, frame_range=(chunk.start, chunk.end),
+                output_dir=self.chunk_dir, file_format="PNG")
+        return self.blender_manager.build_render_command(
+            self.project, self.threads, frame_range=(chunk.start, chunk.end))
+
+    def _render_chunk(self, chunk):
+        if self.blender_manager.jobs.is_cancelled(self.project.unique_id):
+            with self._lock:
+                chunk.status = "failed"
+            return False
+        with self._lock:
+            chunk.status = "running"
+        started = time.time()
+        try:
+            self.blender_manager.run_blender_process(self._chunk_command(chunk), self.project.unique_id,
+                                                     self.on_progress)
+            status, chunk.message = "done", ""
+        except JobCancelled:
+            # Отмену сообщает run_render, куски просто останавливаются
+            self.blender_manager.release_placeholders(self.project, (chunk.start, chunk.end), started,
+                                                      *self._frames_location())
+            with self._lock:
+                chunk.status = "failed"
+            return False
+        except subprocess.CalledProcessError as e:
+            status, chunk.message = "failed", e.stderr
+        except Exception as e:
+            status, chunk.message = "failed", str(e)
+        self.blender_manager.release_placeholders(self.project, (chunk.start, chunk.end), started,
+                                                  *self._frames_location())
+        with self._lock:
+            chunk.status = status
+        done = self.completed_count()
+        success = status == "done"
+        if not success:
+            logger.error(f"Chunk {chunk.start}-{chunk.end} of {self.project.name} failed: {chunk.message}")
+        self.blender_manager.chunk_complete.emit(self.project.unique_id, done, len(self.chunks), success)
+        self.log_callback(f"{self.project.name}: кадры {chunk.start}-{chunk.end} "
+                          f"{'готовы' if success else 'не отрендерены'} ({done}/{len(self.chunks)})",
+                          logging.INFO if success else logging.ERROR)
+        return success
+
+    def _assemble_movie(self):
+        settings = self.project.settings
+        self.log_callback(f"Сборка видео для проекта: {self.project.name}")
+        command = self.blender_manager.build_assemble_command(self.project, self.chunk_dir)
+        try:
+            self.blender_manager.run_blender_process(command, self.project.unique_id)
+        except JobCancelled:
+            return False, RENDER_CANCELLED
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Movie assembly failed for {self.project.name}: {e.stderr}")
+            return False, f"Ошибка сборки видео: {e.stderr}"
+        except OSError as e:
+            logger.error(f"Movie assembly failed for {self.project.name}: {str(e)}")
+            return False, f"Ошибка сборки видео: {str(e)}"
+        shutil.rmtree(self.chunk_dir, ignore_errors=True)
+        logger.info(f"Assembled {settings.file_format} movie for {self.project.name}")
+        return True, "Рендеринг успешно завершен"
@@ -0,0 +1,227 @@
+import os
+import signal
+import subprocess
+import threading
+
+from src.blender.cpu_allocator import load_psutil
+from src.events import Signal
+from src.logger_config import setup_logger
+
+logger = setup_logger('JobControl')
+
+TERMINATE_TIMEOUT = 5.0  # секунды между SIGTERM и SIGKILL
+RENDER_CANCELLED = "Рендеринг отменен"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _descendants(pid):
+    psutil = load_psutil()
+    if psutil is None:
+        return []
+    try:
+        return psutil.Process(pid).children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def _signal_tree(process, method, fallback_signal):
+    """Вызывает method (suspend/resume) у процесса и всех его потомков; без psutil - только сигнал процессу."""
+    psutil = load_psutil()
+    if psutil is None:
+        if fallback_signal is not None and process.poll() is None:
+            os.kill(process.pid, fallback_signal)
+        return
+    try:
+        targets = [psutil.Process(process.pid)] + _descendants(process.pid)
+    except psutil.Error:
+        return
+    for target in targets:
+        try:
+            getattr(target, method)()
+        except psutil.Error:
+            continue
+
+
+def suspend_process_tree(process):
+    _signal_tree(process, "suspend", getattr(signal, "SIGSTOP", None))
+
+
+def resume_process_tree(process):
+    _signal_tree(process, "resume", getattr(signal, "SIGCONT", None))
+
+
+def terminate_process_tree(process, timeout=TERMINATE_TIMEOUT):
+    """Завершает процесс и его потомков: SIGTERM, затем SIGKILL тем, кто не вышел за timeout.
+
+    Сам процесс ожидается через Popen, а не через psutil: иначе psutil забрал бы
+    его код возврата, и Popen посчитал бы рендер успешным.
+    """
+    if process.poll() is not None:
+        return
+    psutil = load_psutil()
+    children = _descendants(process.pid)
+    for child in children:
+        try:
+            child.terminate()
+            child.resume()  # остановленный процесс обработает SIGTERM только после SIGCONT
+        except psutil.Error:
+            continue
+    try:
+        process.terminate()
+        resume_process_tree(process)
+    except OSError:
+        return
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Process {process.pid} ignored SIGTERM, killing it")
+        process.kill()
+    if children:
+        _, alive = psutil.wait_procs(children, timeout=timeout)
+        for child in alive:
+            try:
+                child.kill()
+            except psutil.Error:
+                continue
+
+
+class JobHandle:
+    """Процессы Blender одного задания: отмена, пауза и продолжение всех сразу.
+
+    Процесс, присоединенный к уже отмененному или приостановленному заданию,
+    сразу завершается или останавливается.
+    """
+
+    def __init__(self, unique_id):
+        self.unique_id = unique_id
+        self.cancelled = False
+        self.paused = False
+        self.launched = 0  # сколько процессов было присоединено за все время
+        self._processes = []
+        self._lock = threading.Lock()
+
+    def processes(self):
+        with self._lock:
+            self._processes = [process for process in self._processes if process.poll() is None]
+            return list(self._processes)
+
+    def attach(self, process):
+        with self._lock:
+            self._processes.append(process)
+            self.launched += 1
+            cancelled, paused = self.cancelled, self.paused
+        if cancelled:
+            self._terminate(process)
+        elif paused:
+            suspend_process_tree(process)
+
+    def detach(self, process):
+        with self._lock:
+            if process in self._processes:
+                self._processes.remove(process)
+
+    def cancel(self, wait=False):
+        """wait=True завершает процессы в текущем потоке (при выходе из программы)."""
+        with self._lock:
+            self.cancelled = True
+            self.paused = False
+        for process in self.processes():
+            if wait:
+                terminate_process_tree(process)
+            else:
+                self._terminate(process)
+
+    @staticmethod
+    def _terminate(process):
+        # Ожидание SIGTERM не должно блокировать поток интерфейса
+        threading.Thread(target=terminate_process_tree, args=(process,), daemon=True).start()
+
+    def pause(self):
+        with self._lock:
+            if self.cancelled or self.paused:
+                return False
+            self.paused = True
+        for process in self.processes():
+            suspend_process_tree(process)
+        return True
+
+    def resume(self):
+        with self._lock:
+            if not self.paused:
+                return False
+            self.paused = False
+        for process in self.processes():
+            resume_process_tree(process)
+        return True
+
+
+class JobControl:
+    """Реестр запущенных заданий рендера по unique_id."""
+    job_paused = Signal(str, bool)  # unique_id, paused
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def open(self, unique_id):
+        """Handle задания; если он уже открыт (планировщиком до запуска рендера), возвращается он же."""
+        with self._lock:
+            handle = self._jobs.get(unique_id)
+            if handle is None:
+                handle = self._jobs[unique_id] = JobHandle(unique_id)
+            return handle
+
+    def close(self, handle):
+        with self._lock:
+            if self._jobs.get(handle.unique_id) is handle:
+                del self._jobs[handle.unique_id]
+
+    def get(self, unique_id):
+        with self._lock:
+            return self._jobs.get(unique_id)
+
+    def running_ids(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def cancel(self, unique_id):
+        handle = self.get(unique_id)
+        if handle is None:
+            return False
+        logger.info(f"Cancelling render job {unique_id}")
+        handle.cancel()
+        return True
+
+    def pause(self, unique_id):
+        handle = self.get(unique_id)
+        if handle is None or not handle.pause():
+            return False
+        logger.info(f"Paused render job {unique_id}")
+        self.job_paused.emit(unique_id, True)
+        return True
+
+    def resume(self, unique_id):
+        handle = self.get(unique_id)
+        if handle is None or not handle.resume():
+            return False
+        logger.info(f"Resumed render job {unique_id}")
+        self.job_paused.emit(unique_id, False)
+        return True
+
+    def is_cancelled(self, unique_id):
+        handle = self.get(unique_id)
+        return handle is not None and handle.cancelled
+
+    def is_paused(self, unique_id):
+        handle = self.get(unique_id)
+        return handle is not None and handle.paused
+
+    def cancel_all(self, wait=False):
+        with self._lock:
+            handles = list(self._jobs.values())
+        for handle in handles:
+            handle.cancel(wait)
+        return len(handles)
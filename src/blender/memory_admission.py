@@ -0,0 +1,175 @@
+import threading
+from dataclasses import dataclass
+
+from src.blender.cpu_allocator import load_psutil
+from src.blender.render_history import HISTORY_SAMPLE_SIZE
+from src.logger_config import setup_logger
+
+logger = setup_logger('MemoryAdmission')
+
+MB = 1024 * 1024
+GB = 1024 * MB
+BLENDER_BASE_MEMORY = 300 * MB  # пустой Blender с загруженными аддонами
+BYTES_PER_POLYGON = 300  # геометрия и BVH Cycles на полигон
+BYTES_PER_PASS_PIXEL = 16  # RGBA float на пиксель прохода
+DENOISING_PASSES = 3  # albedo, normal и результат денойзера
+DEFAULT_PASSES = 4  # если число проходов сцены неизвестно
+HISTORY_MARGIN = 1.1  # запас к пику прошлых запусков
+MIN_HEADROOM = 2 * GB
+HEADROOM_FRACTION = 0.1  # доля всей памяти, которая остается свободной
+ADMISSION_RETRY = 5.0  # секунды между проверками свободной памяти
+
+
+@dataclass(frozen=True, slots=True)
+class MemoryEstimate:
+    bytes: int
+    source: str  # "history" или "scene"
+
+
+def system_memory():
+    """(доступно, всего) байт или None без psutil."""
+    psutil = load_psutil()
+    if psutil is None:
+        return None
+    memory = psutil.virtual_memory()
+    return memory.available, memory.total
+
+
+def _pixels(settings_or_row):
+    if isinstance(settings_or_row, dict):
+        x, y, scale = (settings_or_row["resolution_x"], settings_or_row["resolution_y"],
+                       settings_or_row["resolution_scale"])
+    else:
+        x, y, scale = settings_or_row.resolution_x, settings_or_row.resolution_y, settings_or_row.resolution_scale
+    return int(x * y * (scale / 100.0) ** 2)
+
+
+def _row_peak(row):
+    """Пик памяти запуска в байтах: RSS процесса из телеметрии, иначе пик из вывода Blender (MB)."""
+    if row.get("peak_rss"):
+        return row["peak_rss"]
+    if row.get("peak_memory"):
+        return int(row["peak_memory"] * MB)
+    return None
+
+
+class MemoryEstimator:
+    """Оценка пиковой памяти задания.
+
+    Сначала берется максимум пиков прошлых запусков того же файла с теми же
+    настройками (render_history пополняется после каждого рендера, поэтому оценка
+    уточняется сама). Для того же файла с другими настройками пик пересчитывается
+    на разницу буферов кадра. Без истории используется статистика сцены из
+    scene_stats(file_path, blender_path): полигоны, текстуры и разрешение x проходы.
+    """
+
+    def __init__(self, db_manager=None, scene_stats=None):
+        self.db_manager = db_manager
+        self.scene_stats = scene_stats
+
+    def estimate(self, project):
+        estimate = self.from_history(project) if self.db_manager else None
+        if estimate is None and self.scene_stats:
+            estimate = self.from_scene(project)
+        return estimate
+
+    def from_history(self, project):
+        settings = project.settings
+        rows = self.db_manager.get_render_history(project.file_path, settings.render_key(),
+                                                  limit=HISTORY_SAMPLE_SIZE)
+        peaks = [peak for peak in map(_row_peak, rows) if peak]
+        if peaks:
+            return MemoryEstimate(int(max(peaks) * HISTORY_MARGIN), "history")
+        pixels = _pixels(settings)
+        peaks = []
+        for row in self.db_manager.get_render_history(project.file_path, limit=HISTORY_SAMPLE_SIZE):
+            peak = _row_peak(row)
+            if peak:
+                peaks.append(peak + max(0, pixels - _pixels(row)) * DEFAULT_PASSES * BYTES_PER_PASS_PIXEL)
+        if peaks:
+            return MemoryEstimate(int(max(peaks) * HISTORY_MARGIN), "history")
+        return None
+
+    def from_scene(self, project):
+        settings = project.settings
+        stats = self.scene_stats(project.file_path, settings.blender_path)
+        if not stats:
+            return None
+        passes = stats.get("passes") or DEFAULT_PASSES
+        if settings.render_engine == "CYCLES" and settings.cycles_denoising:
+            passes += DENOISING_PASSES
+        framebuffer = _pixels(settings) * passes * max(1, stats.get("view_layers", 1)) * BYTES_PER_PASS_PIXEL
+        per_process = (BLENDER_BASE_MEMORY + stats.get("polygons", 0) * BYTES_PER_POLYGON
+                       + stats.get("texture_bytes", 0) + framebuffer)
+        # Каждый процесс разбитой на части анимации загружает сцену целиком
+        processes = settings.shard_workers if settings.render_type == "Animation" else 1
+        return MemoryEstimate(int(per_process * max(1, processes)), "scene")
+
+
+class MemoryAdmission:
+    """Допуск заданий к запуску по свободной памяти.
+
+    Задание запускается, если доступная память покрывает его оценку, запас
+    (headroom) и еще не набранную память уже допущенных заданий: оценка минус
+    пик RSS, который успела замерить телеметрия. Задание, которое не поместится
+    даже в пустую машину, запускается, когда своих заданий не осталось, иначе
+    оно ждало бы вечно. Без psutil или без оценки задания допускаются сразу.
+    """
+
+    def __init__(self, estimator, telemetry=None, headroom=None, enabled=True):
+        self.estimator = estimator
+        self.telemetry = telemetry
+        self.headroom = headroom
+        self.enabled = enabled
+        self._admitted = {}  # unique_id -> MemoryEstimate или None
+        self._lock = threading.Lock()
+
+    def headroom_for(self, total):
+        if self.headroom is not None:
+            return self.headroom
+        return max(MIN_HEADROOM, int(total * HEADROOM_FRACTION))
+
+    def estimate(self, project):
+        if not self.enabled:
+            return None
+        try:
+            return self.estimator.estimate(project)
+        except Exception as e:
+            logger.warning(f"Failed to estimate memory for {project.name}: {str(e)}")
+            return None
+
+    def _outstanding(self):
+        outstanding = 0
+        for unique_id, estimate in self._admitted.items():
+            if estimate is None:
+                continue
+            telemetry = self.telemetry.telemetry(unique_id) if self.telemetry else None
+            outstanding += max(0, estimate.bytes - (telemetry.peak_rss if telemetry else 0))
+        return outstanding
+
+    def check(self, unique_id, estimate):
+        """Пытается допустить задание; (допущено, байт доступно или None)."""
+        memory = system_memory() if self.enabled and estimate is not None else None
+        with self._lock:
+            if memory is None:
+                self._admitted[unique_id] = estimate
+                return True, None
+            available, total = memory
+            headroom = self.headroom_for(total)
+            if estimate.bytes + headroom + self._outstanding() <= available:
+                self._admitted[unique_id] = estimate
+                return True, available
+            if estimate.bytes + headroom > total and not self._admitted:
+                logger.warning(f"Job {unique_id} needs ~{estimate.bytes // MB} MB, more than this machine has; "
+                               f"starting it alone")
+                self._admitted[unique_id] = estimate
+                return True, available
+            return False, available
+
+    def release(self, unique_id):
+        with self._lock:
+            self._admitted.pop(unique_id, None)
+
+    def admitted_count(self):
+        with self._lock:
+            return len(self._admitted)
@@ -0,0 +1,78 @@
+import bpy
+import sys
+import os
+import json
+import logging
+
+logger = logging.getLogger('ProbeScript')
+
+PROBE_PREFIX = "probe_settings:"
+STATS_PREFIX = "scene_stats:"
+
+
+def read_scene_settings(file_path):
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File '{file_path}' not found")
+    bpy.ops.wm.open_mainfile(filepath=file_path, load_ui=False)
+    scene = bpy.context.scene
+    return {
+        "resolution_x": scene.render.resolution_x,
+        "resolution_y": scene.render.resolution_y,
+        "resolution_scale": scene.render.resolution_percentage,
+        "fps": scene.render.fps,
+        "fps_base": scene.render.fps_base,
+        "frame_start": scene.frame_start,
+        "frame_end": scene.frame_end,
+        "frame_step": scene.frame_step,
+        "frame_current": scene.frame_current,
+        "render_engine": "EEVEE" if scene.render.engine in ["BLENDER_EEVEE", "BLENDER_EEVEE_NEXT"] else "CYCLES",
+        "render_type": "Image" if scene.render.image_settings.file_format in ["PNG", "JPEG", "EXR"] else "Animation",
+        "cycles_samples": scene.cycles.samples if hasattr(scene, 'cycles') else 128,
+        "cycles_denoising": scene.cycles.use_denoising if hasattr(scene, 'cycles') else False,
+        "cycles_device": scene.cycles.device if hasattr(scene, 'cycles') else "CPU",
+        "threads": scene.render.threads if hasattr(scene.render, 'threads') else 0,
+        "eevee_samples": scene.eevee.taa_render_samples if hasattr(scene, 'eevee') else 64,
+        "file_format": scene.render.image_settings.file_format,
+        "output_path": scene.render.filepath,
+    }
+
+
+def read_scene_stats(file_path):
+    """Данные для оценки памяти рендера: полигоны с модификаторами и инстансами,
+    память загруженных изображений, число проходов рендера."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File '{file_path}' not found")
+    bpy.ops.wm.open_mainfile(filepath=file_path, load_ui=False)
+    scene = bpy.context.scene
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    polygons = 0
+    for instance in depsgraph.object_instances:
+        if instance.object.type == 'MESH':
+            polygons += len(instance.object.data.polygons)
+    texture_bytes = 0
+    for image in bpy.data.images:
+        if image.users and image.size[0]:
+            texture_bytes += image.size[0] * image.size[1] * max(image.channels, 1) * (4 if image.is_float else 1)
+    view_layers = [layer for layer in scene.view_layers if layer.use] or list(scene.view_layers)
+    passes = max(1 + sum(1 for name in dir(layer) if name.startswith("use_pass_") and getattr(layer, name) is True)
+                 for layer in view_layers)
+    return {
+        "polygons": polygons,
+        "texture_bytes": texture_bytes,
+        "view_layers": len(view_layers),
+        "passes": passes,
+    }
+
+
+if __name__ == "__main__":
+    try:
+        args = sys.argv[sys.argv.index("--") + 1:]
+        file_path = args[0]
+        if "--stats" in args:
+            print(STATS_PREFIX + json.dumps(read_scene_stats(file_path)), flush=True)
+        else:
+            print(PROBE_PREFIX + json.dumps(read_scene_settings(file_path)), flush=True)
+    except Exception as e:
+        logger.error(f"Probe failed: {str(e)}")
+        print(f"Error: {str(e)}", flush=True)
+        sys.exit(1)
@@ -0,0 +1,153 @@
+import statistics
+import threading
+import time
+
+from src.logger_config import setup_logger
+
+logger = setup_logger('RenderHistory')
+
+HISTORY_SAMPLE_SIZE = 10
+
+
+class RenderRecorder:
+    """Собирает время кадров и пиковую память одного задания для таблицы render_history."""
+
+    def __init__(self, project, threads, blender_version):
+        self.project = project
+        self.threads = threads
+        self.blender_version = blender_version
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self._last_saved = {}  # поток -> время последнего сохраненного кадра
+        self.frames = []  # (frame, render_time, peak_memory)
+        self.peak_memory = 0.0
+        self._lock = threading.Lock()
+
+    def on_progress(self, progress):
+        with self._lock:
+            self.peak_memory = max(self.peak_memory, progress.memory_peak)
+            if progress.saved_path:
+                # Куски параллельного рендера читаются каждый в своем потоке и пишут строки
+                # вперемешку, поэтому время кадра считается от прошлого кадра того же потока
+                stream = threading.get_ident()
+                now = time.monotonic()
+                self.frames.append((progress.frame, now - self._last_saved.get(stream, self._start),
+                                    progress.memory_peak))
+                self._last_saved[stream] = now
+
+    def record(self, success):
+        settings = self.project.settings
+        wall_time = time.monotonic() - self._start
+        with self._lock:
+            frames = list(self.frames)
+            peak_memory = self.peak_memory
+        if success and not frames:
+            # Прогретый процесс не сообщает о кадрах: одно изображение за все время
+            frames = [(settings.frame_current, wall_time, peak_memory or None)]
+        return {
+            "unique_id": self.project.unique_id,
+            "file_path": self.project.file_path,
+            "settings_key": settings.render_key(),
+            "blender_version": self.blender_version,
+            "engine": settings.render_engine,
+            "samples": settings.render_samples(),
+            "resolution_x": settings.resolution_x,
+            "resolution_y": settings.resolution_y,
+            "resolution_scale": settings.resolution_scale,
+            "device": settings.cycles_device,
+            "threads": self.threads,
+            "frame_count": len(frames),
+            "started_at": self.started_at,
+            "wall_time": wall_time,
+            "peak_memory": peak_memory or None,
+            "success": int(success),
+        }, frames
+
+
+def _render_cost(row_or_settings):
+    """Условная стоимость кадра: пиксели x сэмплы."""
+    if isinstance(row_or_settings, dict):
+        x, y, scale, samples = (row_or_settings["resolution_x"], row_or_settings["resolution_y"],
+                                row_or_settings["resolution_scale"], row_or_settings["samples"])
+    else:
+        x, y, scale = row_or_settings.resolution_x, row_or_settings.resolution_y, row_or_settings.resolution_scale
+        samples = row_or_settings.render_samples()
+    return max(1.0, x * y * (scale / 100.0) ** 2 * samples)
+
+
+class ETAEstimator:
+    """Оценка времени рендера по похожим прошлым запускам из render_history."""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def frame_time(self, project, threads=None):
+        """Ожидаемое время одного кадра в секундах или None, если похожих запусков нет."""
+        settings = project.settings
+        threads = threads or settings.threads
+        cost = _render_cost(settings)
+
+        exact = self.db_manager.get_render_history(project.file_path, settings.render_key(), limit=HISTORY_SAMPLE_SIZE)
+        if exact:
+            return statistics.median(self._scaled_frame_time(row, cost, threads, settings) for row in exact)
+        same_file = self.db_manager.get_render_history(project.file_path, limit=HISTORY_SAMPLE_SIZE)
+        if same_file:
+            return statistics.median(self._scaled_frame_time(row, cost, threads, settings) for row in same_file)
+        similar = self.db_manager.get_render_history(engine=settings.render_engine, device=settings.cycles_device,
+                                                     limit=HISTORY_SAMPLE_SIZE)
+        if similar:
+            return statistics.median(self._scaled_frame_time(row, cost, threads, settings) for row in similar)
+        return None
+
+    @staticmethod
+    def _scaled_frame_time(row, cost, threads, settings):
+        frame_time = row["wall_time"] / row["frame_count"] * cost / _render_cost(row)
+        if settings.cycles_device == "CPU" and row["threads"] and threads:
+            frame_time *= row["threads"] / threads
+        return frame_time
+
+    def estimate_job(self, project, threads=None):
+        frame_time = self.frame_time(project, threads)
+        return frame_time * project.settings.frame_count() if frame_time is not None else None
+
+    def estimate_queue(self, projects, max_concurrency=1, threads=None):
+        """Возвращает (секунды, число заданий без оценки).
+
+        threads - потоков на задание у планировщика; задания считаются поровну разделенными по слотам.
+        """
+        total, unknown = 0.0, 0
+        for project in projects:
+            job_threads = min(project.settings.threads, threads) if threads else None
+            estimate = self.estimate_job(project, job_threads)
+            if estimate is None:
+                unknown += 1
+            else:
+                total += estimate
+        return total / max(1, max_concurrency), unknown
+
+    @staticmethod
+    def live_remaining(project, frames_done, elapsed, frame_time=None):
+        """Оставшееся время задания с учетом уже отрендеренных кадров.
+
+        frame_time - оценка из истории, вычисленная при старте задания.
+        """
+        total_frames = project.settings.frame_count()
+        if not frames_done:
+            if frame_time is None:
+                return None
+            return max(0.0, frame_time * total_frames - elapsed)
+        observed = elapsed / frames_done
+        # Чем больше кадров готово, тем больше доверия наблюдаемому времени
+        weight = min(1.0, frames_done / 5)
+        if frame_time is not None:
+            observed = weight * observed + (1 - weight) * frame_time
+        return observed * max(0, total_frames - frames_done)
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "неизвестно"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
@@ -1,9 +1,6 @@
 import bpy
 import sys
 import os
-import base64
-from io import BytesIO
-import tempfile
 from pathlib import Path
 import logging
 
@@ -19,69 +16,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger('RenderPreviewScript')
 
-if __name__ == "__main__":
-    try:
-        file_path = sys.argv[5]
-        unique_id = sys.argv[6]
-        render_engine = sys.argv[7]
-        cycles_denoising = int(sys.argv[8])
-        cycles_device = sys.argv[9]
-        threads = int(sys.argv[10])
-
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File '{file_path}' not found")
-
-        logger.info(f"Opening file: {file_path}")
-        bpy.ops.wm.open_mainfile(filepath=file_path)
-        scene = bpy.context.scene
-
-        logger.info("Setting render settings")
-        scene.render.image_settings.file_format = 'PNG'
-        scene.render.resolution_x = 512  # 512
-        scene.render.resolution_y = 288  # 288
-        scene.render.resolution_percentage = 100
-        scene.render.threads = threads
-
-        logger.info(f"Using render engine: {render_engine}")
+def eevee_engine_id():
+    # Blender 4.2-4.4 называет EEVEE "BLENDER_EEVEE_NEXT"
+    engines = {item.identifier for item in bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items}
+    return "BLENDER_EEVEE_NEXT" if "BLENDER_EEVEE_NEXT" in engines else "BLENDER_EEVEE"
+
+
+# (процент разрешения, сэмплы) для прогрессивного превью: от грубого к точному
+PROGRESSIVE_PASSES = [(25, 1), (50, 4), (100, 16)]
+SINGLE_PASS = [(100, 16)]
+
+
+def render_thumbnail(file_path, render_engine, cycles_denoising, cycles_device, threads, output_path,
+                     resolution_x=512, resolution_y=288, passes=None, on_pass=None, should_cancel=None):
+    """Рендерит превью в несжатые BMP, по файлу на проход. Возвращает пути готовых проходов."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File '{file_path}' not found")
+    passes = passes or SINGLE_PASS
+
+    logger.info(f"Opening file: {file_path}")
+    bpy.ops.wm.open_mainfile(filepath=file_path)
+    scene = bpy.context.scene
+
+    logger.info("Setting render settings")
+    scene.render.image_settings.file_format = 'BMP'
+    scene.render.image_settings.color_mode = 'RGB'
+    scene.render.resolution_x = resolution_x
+    scene.render.resolution_y = resolution_y
+    scene.render.threads_mode = 'FIXED'
+    scene.render.threads = threads
+    scene.render.use_file_extension = False
+
+    logger.info(f"Using render engine: {render_engine}")
+    if render_engine == 'CYCLES':
+        scene.render.engine = 'CYCLES'
+        scene.cycles.device = cycles_device
+    elif render_engine == 'EEVEE':
+        scene.render.engine = eevee_engine_id()
+    else:
+        raise ValueError(f"Unsupported render engine: {render_engine}")
+
+    output_path = Path(output_path)
+    paths = []
+    for index, (percentage, samples) in enumerate(passes):
+        if should_cancel and should_cancel():
+            logger.info(f"Preview cancelled after {index} passes")
+            break
+        is_final = index == len(passes) - 1
+        scene.render.resolution_percentage = percentage
         if render_engine == 'CYCLES':
-            scene.render.engine = 'CYCLES'
-            scene.cycles.samples = 16
-            scene.cycles.use_denoising = bool(cycles_denoising)
-            scene.cycles.device = cycles_device
-        elif render_engine == 'EEVEE':
-            scene.render.engine = 'BLENDER_EEVEE'
-            scene.eevee.taa_render_samples = 16
+            scene.cycles.samples = samples
+            # Шумоподавление на грубых проходах только увеличивает время до первого кадра
+            scene.cycles.use_denoising = bool(cycles_denoising) and is_final
         else:
-            raise ValueError(f"Unsupported render engine: {render_engine}")
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir) / "render.png"
-            logger.info(f"Rendering to temporary file: {temp_path}")
-            scene.render.filepath = str(temp_path)
-            bpy.ops.render.render(write_still=True)
-            logger.info("Render operation completed")
-
-            if temp_path.exists():
-                logger.info(f"Reading rendered file: {temp_path}")
-                with open(temp_path, "rb") as f:
-                    buffer = BytesIO(f.read())
-                    buffer.seek(0)
-                    thumbnail_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                    logger.info("Encoding thumbnail data as base64")
-                    print(f"data:image/png;base64,{thumbnail_data}", flush=True)
-            else:
-                raise FileNotFoundError(f"Rendered file not found at: {temp_path}")
-
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                logger.info(f"Cleaned up temporary file: {temp_path}")
-        except Exception as e:
-            logger.error(f"Failed to clean up temporary file: {str(e)}")
+            scene.eevee.taa_render_samples = samples
+
+        pass_path = output_path.with_name(f"{output_path.stem}_pass{index}{output_path.suffix}")
+        logger.info(f"Rendering pass {index + 1}/{len(passes)} ({percentage}%, {samples} samples) to: {pass_path}")
+        scene.render.filepath = str(pass_path)
+        bpy.ops.render.render(write_still=True)
+        if not pass_path.exists():
+            raise FileNotFoundError(f"Rendered file not found at: {pass_path}")
+        paths.append(str(pass_path))
+        if on_pass:
+            on_pass(index, len(passes), str(pass_path))
+    logger.info("Render operation completed")
+    return paths
+
+
+if __name__ == "__main__":
+    try:
+        argv = sys.argv[sys.argv.index("--") + 1:]
+        file_path, unique_id, render_engine = argv[0], argv[1], argv[2]
+        cycles_denoising = int(argv[3])
+        cycles_device = argv[4]
+        threads = int(argv[5])
+        output_path = argv[6]
+        resolution_x, resolution_y = int(argv[7]), int(argv[8])
+        passes = PROGRESSIVE_PASSES if len(argv) > 9 and argv[9] == "progressive" else SINGLE_PASS
+
+        def print_pass(index, total, path):
+            print(f"preview_pass:{index}:{total}:{path}", flush=True)
+
+        render_thumbnail(file_path, render_engine, cycles_denoising, cycles_device, threads,
+                         output_path, resolution_x, resolution_y, passes, on_pass=print_pass)
 
         logger.info("=============================================")
 
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
-        print(f"Error: {str(e)}", flush=True)
+        print(f"Error: {str(e)}", file=sys.stderr, flush=True)
         sys.exit(1)
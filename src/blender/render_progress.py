@@ -0,0 +1,64 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+FRAME_RE = re.compile(r"^Fra:(\d+)\b")
+TIME_RE = re.compile(r"Time:\s*(\d+(?::\d+)+(?:\.\d+)?)")
+PEAK_RE = re.compile(r"\(Peak\s+([\d.]+)M\)|Peak[: ]\s*([\d.]+)M")
+SAMPLE_RE = re.compile(r"Sample (\d+)/(\d+)|Rendering (\d+) / (\d+) samples")
+SAVED_RE = re.compile(r"^Saved: '(.+)'")
+
+
+def parse_elapsed(value):
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+@dataclass
+class RenderProgress:
+    """Событие прогресса рендера, разобранное из вывода Blender."""
+    frame: int = 0
+    sample: int = 0
+    samples_total: int = 0
+    elapsed: float = 0.0  # секунды с начала текущего кадра
+    memory_peak: float = 0.0  # MB
+    saved_path: str = ""
+    frames_done: int = 0
+
+
+class ProgressParser:
+    """Разбирает строки Fra:/Sample/Saved: по мере поступления, сохраняя состояние между строками."""
+
+    def __init__(self):
+        self.state = RenderProgress()
+
+    def feed(self, line) -> Optional[RenderProgress]:
+        line = line.strip()
+        saved = SAVED_RE.match(line)
+        if saved:
+            self.state.saved_path = saved.group(1)
+            self.state.frames_done += 1
+            return self._snapshot()
+        frame = FRAME_RE.match(line)
+        if not frame:
+            return None
+        if int(frame.group(1)) != self.state.frame:
+            self.state.frame = int(frame.group(1))
+            self.state.sample = 0
+        self.state.saved_path = ""
+        elapsed = TIME_RE.search(line)
+        if elapsed:
+            self.state.elapsed = parse_elapsed(elapsed.group(1))
+        for peak in PEAK_RE.findall(line):
+            value = float(peak[0] or peak[1])
+            self.state.memory_peak = max(self.state.memory_peak, value)
+        sample = SAMPLE_RE.search(line)
+        if sample:
+            current, total = (sample.group(1), sample.group(2)) if sample.group(1) else (sample.group(3), sample.group(4))
+            self.state.sample, self.state.samples_total = int(current), int(total)
+        return self._snapshot()
+
+    def _snapshot(self):
+        return RenderProgress(**vars(self.state))
@@ -0,0 +1,442 @@
+import itertools
+import logging
+import threading
+from collections import deque
+
+from src.blender.cpu_allocator import CpuAllocator, lower_priority, pin_process
+from src.blender.job_control import RENDER_CANCELLED
+from src.blender.memory_admission import ADMISSION_RETRY, MB
+from src.blender.watchdog import RenderAttempts
+from src.events import Signal
+from src.models.project import PRIORITY_URGENT, logical_cpu_count
+from src.logger_config import setup_logger
+
+logger = setup_logger('RenderScheduler')
+
+
+_job_sequence = itertools.count()
+
+
+class RenderJob:
+    def __init__(self, project, log_callback, priority=None):
+        self.project = project
+        self.log_callback = log_callback
+        self.priority = project.settings.priority if priority is None else priority
+        self.sequence = next(_job_sequence)
+        self.threads = 0
+        self.allocation = None
+        self.processes = []
+        self.memory_estimate = None
+        self.estimated = False
+        self.handle = None
+        self.preempted_by = None  # id срочного задания или превью, которое приостановило это задание
+        self.preempting = None  # задание, приостановленное ради этого
+        self.attempts = RenderAttempts()
+
+    @property
+    def unique_id(self):
+        return self.project.unique_id
+
+
+class RenderScheduler:
+    """Очередь рендера с ограничением числа одновременно запущенных процессов Blender.
+
+    Если передан db_manager, статус проекта в базе обновляется при запуске и завершении задания.
+    Каждое задание получает свой блок физических ядер (CpuAllocator): число потоков Blender
+    равно размеру блока, процессы задания закрепляются за ним, если pin_cpus включен.
+    background понижает приоритет CPU и ввода-вывода процессов Blender.
+
+    Перед запуском задание проходит допуск по памяти (blender_manager.admission):
+    оценка пиковой памяти считается в фоне при постановке в очередь (пока она
+    считается, задание пропускает вперед следующие), и первое задание с готовой
+    оценкой ждет, пока свободной памяти не станет достаточно.
+
+    Очередь упорядочена по приоритету, внутри приоритета - по времени постановки.
+    Задание с приоритетом PRIORITY_URGENT и выше, если свободных слотов нет,
+    приостанавливает (SIGSTOP) работающее задание с меньшим приоритетом и занимает
+    его ядра; интерактивное превью так же приостанавливает задание ниже срочного.
+    Приостановленное задание продолжается, когда вытеснившее его завершится.
+
+    Упавшее или зависшее (blender_manager.watchdog) задание возвращается в очередь
+    через паузу blender_manager.retry_policy и продолжается с первого несохраненного
+    кадра; пока идет пауза, слот занимают другие задания. После последней неудачной
+    попытки проект получает статус quarantined и больше не берется из очереди.
+    """
+    job_queued = Signal(str)  # unique_id
+    job_held = Signal(str, int, int)  # unique_id, оценка памяти и доступно байт
+    job_started = Signal(str, int)  # unique_id, threads
+    job_finished = Signal(str, bool, str)  # unique_id, success, message
+    job_retrying = Signal(str, int, float, str)  # unique_id, номер следующей попытки, пауза в секундах, ошибка
+    queue_finished = Signal()
+
+    def __init__(self, blender_manager, max_concurrency=1, core_budget=None, db_manager=None,
+                 pin_cpus=True, background=False):
+        self.blender_manager = blender_manager
+        self.db_manager = db_manager
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.core_budget = core_budget or logical_cpu_count()
+        self.pin_cpus = pin_cpus
+        self.background = background
+        self.allocator = CpuAllocator(self.max_concurrency, self.core_budget)
+        self._pending = deque()
+        self._running = {}
+        self._retrying = {}  # id(job) -> (RenderJob, Timer) до повторной постановки в очередь
+        self._held = None  # задание, которое ждет свободной памяти
+        self._retry = None
+        self._lock = threading.Lock()
+        self.blender_manager.process_started.connect(self._on_process_started)
+        self.blender_manager.preview_started.connect(self._on_preview_started)
+        self.blender_manager.preview_finished.connect(self._on_preview_finished)
+
+    def set_max_concurrency(self, value):
+        with self._lock:
+            self.max_concurrency = max(1, int(value))
+        self._rebalance(self.allocator.configure(slots=self.max_concurrency))
+        self._dispatch()
+
+    def set_core_budget(self, value):
+        with self._lock:
+            self.core_budget = max(1, int(value))
+        self._rebalance(self.allocator.configure(core_budget=self.core_budget))
+
+    def _rebalance(self, allocations):
+        """Перезакрепляет запущенные процессы за пересчитанными блоками ядер.
+
+        Число потоков уже запущенного Blender не меняется, новый размер блока
+        получат следующие задания.
+        """
+        with self._lock:
+            jobs = dict(self._running)
+        for job_key, allocation in allocations.items():
+            job = jobs.get(job_key)
+            if job is None or job.allocation == allocation:
+                continue
+            job.allocation = allocation
+            logger.info(f"Rebalanced {job.project.name} to CPUs {list(allocation.cpus)}")
+            for process in self._live_processes(job):
+                if self.pin_cpus:
+                    pin_process(process.pid, allocation.cpus)
+
+    @staticmethod
+    def _live_processes(job):
+        job.processes = [process for process in job.processes if process.poll() is None]
+        return list(job.processes)
+
+    def _on_process_started(self, unique_id, process):
+        with self._lock:
+            job = next((job for job in self._running.values() if job.unique_id == unique_id), None)
+            if job is not None:
+                job.processes.append(process)
+        if job is None:
+            return
+        if self.pin_cpus and job.allocation:
+            pin_process(process.pid, job.allocation.cpus)
+        if self.background:
+            lower_priority(process.pid)
+
+    def threads_per_job(self):
+        return max(1, self.core_budget // self.max_concurrency)
+
+    def submit(self, project, log_callback, priority=None):
+        """priority - вместо settings.priority проекта."""
+        job = RenderJob(project, log_callback, priority)
+        with self._lock:
+            self._enqueue(job)
+        logger.info(f"Queued render job: {project.name} (priority {job.priority})")
+        self.job_queued.emit(project.unique_id)
+        if self.blender_manager.admission.enabled:
+            threading.Thread(target=self._estimate_memory, args=(job,), daemon=True).start()
+        else:
+            job.estimated = True
+            self._dispatch()
+        return job
+
+    def _estimate_memory(self, job):
+        estimate = self.blender_manager.admission.estimate(job.project)
+        if estimate is not None:
+            logger.info(f"Memory estimate for {job.project.name}: {estimate.bytes // MB} MB ({estimate.source})")
+        job.memory_estimate = estimate
+        job.estimated = True
+        self._dispatch()
+
+    def _enqueue(self, job):
+        index = next((i for i, queued in enumerate(self._pending) if queued.priority < job.priority),
+                     len(self._pending))
+        self._pending.insert(index, job)
+
+    def _find(self, unique_id):
+        """(задание, запущено ли) или (None, False); ждущие повтора задания считаются незапущенными."""
+        for job in self._running.values():
+            if job.unique_id == unique_id:
+                return job, True
+        for job in list(self._pending) + [job for job, _ in self._retrying.values()]:
+            if job.unique_id == unique_id:
+                return job, False
+        return None, False
+
+    def has_job(self, unique_id):
+        with self._lock:
+            return self._find(unique_id)[0] is not None
+
+    def set_priority(self, unique_id, priority):
+        with self._lock:
+            job, running = self._find(unique_id)
+            if job is None:
+                return False
+            job.priority = priority
+            if job in self._pending:
+                self._pending.remove(job)
+                self._enqueue(job)
+        logger.info(f"Priority of {job.project.name} set to {priority}")
+        self._dispatch()
+        return True
+
+    def cancel(self, unique_id):
+        """Снимает задание с очереди или завершает его процессы Blender."""
+        with self._lock:
+            job, running = self._find(unique_id)
+            if job is None:
+                return False
+            if job in self._pending:
+                self._pending.remove(job)
+                if self._held is job:
+                    self._held = None
+            elif not running:
+                self._retrying.pop(id(job))[1].cancel()
+            idle = not self._pending and not self._running and not self._retrying
+        if running:
+            self.blender_manager.jobs.cancel(unique_id)
+            return True
+        logger.info(f"Removed {job.project.name} from the render queue")
+        self._set_status(unique_id, "cancelled")
+        self.job_finished.emit(unique_id, False, RENDER_CANCELLED)
+        if idle:
+            self.queue_finished.emit()
+        else:
+            self._dispatch()
+        return True
+
+    def pause(self, unique_id):
+        return self.blender_manager.jobs.pause(unique_id)
+
+    def resume(self, unique_id):
+        with self._lock:
+            job, running = self._find(unique_id)
+            if running:
+                # Продолженное вручную задание больше не ждет вытеснившее его
+                job.preempted_by = None
+        return self.blender_manager.jobs.resume(unique_id)
+
+    def _active(self):
+        """Запущенные задания, кроме вытесненных."""
+        return [job for job in self._running.values() if job.preempted_by is None]
+
+    def _occupied_slots(self):
+        """Занятые слоты. Срочное задание занимает слот вытесненного им задания; задание,
+        приостановленное ради превью, свой слот сохраняет: после превью оно продолжится."""
+        return sum(1 for job in self._running.values()
+                   if job.preempting is None or id(job.preempting) not in self._running)
+
+    def _preemption_victim(self, priority):
+        jobs = self.blender_manager.jobs
+        candidates = [job for job in self._active()
+                      if job.priority < priority and not jobs.is_paused(job.unique_id)]
+        # Наименьший приоритет, среди равных - позже запущенное задание
+        return min(candidates, key=lambda job: (job.priority, -job.sequence), default=None)
+
+    def _preempt(self, victim, reason):
+        logger.info(f"Preempting {victim.project.name} for {reason}")
+        if self.blender_manager.jobs.pause(victim.unique_id):
+            victim.log_callback(f"{victim.project.name} приостановлен: {reason}")
+
+    def _resume_preempted(self, key):
+        with self._lock:
+            victims = [job for job in self._running.values() if job.preempted_by == key]
+            for job in victims:
+                job.preempted_by = None
+        for job in victims:
+            if self.blender_manager.jobs.resume(job.unique_id):
+                job.log_callback(f"{job.project.name} продолжен")
+
+    def _on_preview_started(self, unique_id, preview_id):
+        with self._lock:
+            if self._occupied_slots() < self.max_concurrency:
+                return
+            victim = self._preemption_victim(PRIORITY_URGENT)
+            if victim is None:
+                return
+            victim.preempted_by = preview_id
+        self._preempt(victim, "интерактивное превью")
+
+    def _on_preview_finished(self, unique_id, preview_id):
+        self._resume_preempted(preview_id)
+
+    def take_pending(self):
+        """Убирает из очереди и возвращает задания, которые еще не запущены или ждут повтора."""
+        with self._lock:
+            jobs = list(self._pending)
+            self._pending.clear()
+            for job, timer in self._retrying.values():
+                timer.cancel()
+                jobs.append(job)
+            self._retrying.clear()
+        return jobs
+
+    def clear_pending(self):
+        return len(self.take_pending())
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def running_count(self):
+        with self._lock:
+            return len(self._running)
+
+    def is_busy(self):
+        with self._lock:
+            return bool(self._pending or self._running or self._retrying)
+
+    def _dispatch(self):
+        admission = self.blender_manager.admission
+        admitted, held, preempted = [], None, []
+        with self._lock:
+            for job in list(self._pending):
+                if not job.estimated:
+                    # Оценка еще считается (проба сцены в Blender): задания за ним не ждут ее
+                    continue
+                victim = None
+                if self._occupied_slots() >= self.max_concurrency:
+                    # Срочное задание не ждет окончания долгих фоновых рендеров
+                    if job.priority >= PRIORITY_URGENT:
+                        victim = self._preemption_victim(job.priority)
+                    if victim is None:
+                        break
+                ok, available = admission.check(job.unique_id, job.memory_estimate)
+                if not ok:
+                    # Очередь не обгоняет первое задание, иначе большое задание ждало бы бесконечно
+                    if self._held is not job:
+                        self._held = job
+                        held = (job, available)
+                    if self._retry is None:
+                        self._retry = threading.Timer(ADMISSION_RETRY, self._retry_dispatch)
+                        self._retry.daemon = True
+                        self._retry.start()
+                    break
+                self._pending.remove(job)
+                if self._held is job:
+                    self._held = None
+                if victim is not None:
+                    victim.preempted_by = id(job)
+                    job.preempting = victim
+                    preempted.append((victim, job))
+                job.handle = self.blender_manager.jobs.open(job.unique_id)
+                self._running[id(job)] = job
+                admitted.append(job)
+        if held:
+            job, available = held
+            logger.info(f"Holding {job.project.name}: needs ~{job.memory_estimate.bytes // MB} MB, "
+                        f"{available // MB} MB available")
+            self.job_held.emit(job.unique_id, job.memory_estimate.bytes, available)
+        for victim, job in preempted:
+            self._preempt(victim, f"срочное задание {job.project.name}")
+        if not admitted:
+            return
+        if self.allocator.slots != self.max_concurrency:
+            # Оставшиеся задания занимали освободившиеся ядра: вернуть им по одному слоту
+            self._rebalance(self.allocator.configure(slots=self.max_concurrency))
+        with self._lock:
+            for job in admitted:
+                victim = job.preempting
+                job.allocation = self.allocator.acquire(id(job), id(victim) if victim else None)
+                job.threads = min(job.project.settings.threads or self.core_budget, job.allocation.threads)
+        for job in admitted:
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _retry_dispatch(self):
+        with self._lock:
+            self._retry = None
+        self._dispatch()
+
+    def _run_job(self, job):
+        logger.info(f"Starting render job {job.project.name} with {job.threads} threads "
+                    f"on CPUs {list(job.allocation.cpus)} (NUMA {list(job.allocation.nodes)})")
+        self._set_status(job.unique_id, "running")
+        self.job_started.emit(job.unique_id, job.threads)
+        try:
+            if job.handle.cancelled:
+                success, message = False, RENDER_CANCELLED
+            else:
+                success, message = self.blender_manager.run_render(job.project, job.log_callback,
+                                                                   threads=job.threads, attempts=job.attempts)
+        except Exception as e:
+            logger.error(f"Render job {job.project.name} crashed: {str(e)}")
+            success, message = False, f"Ошибка: {str(e)}"
+        finally:
+            self.blender_manager.jobs.close(job.handle)
+            # Допуск выдан в _dispatch; отмененное до запуска задание не дошло до run_render, который его снимает
+            self.blender_manager.admission.release(job.unique_id)
+        policy = self.blender_manager.retry_policy
+        attempts = job.attempts
+        delay = None
+        if success:
+            status = "done"
+        elif message == RENDER_CANCELLED:
+            status = "cancelled"
+        elif not attempts.retryable or policy.max_attempts <= 1:
+            status = "failed"
+        elif policy.allows(attempts.count):
+            status, delay = "queued", policy.delay(attempts.count)
+        else:
+            status = "quarantined"
+            logger.error(f"Quarantined {job.project.name} after {attempts.count} failed attempts")
+            job.log_callback(f"{job.project.name}: попыток {attempts.count}, задание помещено в карантин",
+                             logging.ERROR)
+        self._set_status(job.unique_id, status)
+        with self._lock:
+            self._running.pop(id(job), None)
+            if delay is not None:
+                timer = threading.Timer(delay, self._requeue, args=(job,))
+                timer.daemon = True
+                self._retrying[id(job)] = (job, timer)
+                timer.start()
+            idle = not self._pending and not self._running and not self._retrying
+            draining = not self._pending and self._running
+            running = len(self._running)
+        self.allocator.release(id(job))
+        self._resume_preempted(id(job))
+        if draining:
+            # Новых заданий нет: ядра завершенного задания отдаются оставшимся, и их потоки
+            # перестают делить физические ядра с SMT-соседями
+            self._rebalance(self.allocator.configure(slots=running))
+        if delay is None:
+            self.job_finished.emit(job.unique_id, success, message)
+        else:
+            logger.warning(f"Render job {job.project.name} failed (attempt {attempts.count}), "
+                           f"retrying in {delay:.0f} s")
+            job.log_callback(f"{job.project.name}: повтор через {delay:.0f} с (попытка {attempts.count + 1} "
+                             f"из {policy.max_attempts})", logging.WARNING)
+            self.job_retrying.emit(job.unique_id, attempts.count + 1, delay, message)
+        if idle:
+            self.queue_finished.emit()
+        else:
+            self._dispatch()
+
+    def _requeue(self, job):
+        with self._lock:
+            if self._retrying.pop(id(job), None) is None:
+                return  # задание отменено или снято с очереди во время паузы
+            job.handle = job.allocation = job.preempting = job.preempted_by = None
+            job.processes = []
+            job.threads = 0
+            self._enqueue(job)
+        logger.info(f"Requeued render job {job.project.name} for attempt {job.attempts.count + 1}")
+        self._dispatch()
+
+    def _set_status(self, unique_id, status):
+        if self.db_manager is None:
+            return
+        try:
+            self.db_manager.set_project_status(unique_id, status)
+        except Exception as e:
+            logger.warning(f"Failed to update status of {unique_id}: {str(e)}")
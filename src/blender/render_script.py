@@ -18,6 +18,12 @@ logging.basicConfig(
 logger = logging.getLogger('RenderScript')
 
 
+def eevee_engine_id():
+    # Blender 4.2-4.4 называет EEVEE "BLENDER_EEVEE_NEXT"
+    engines = {item.identifier for item in bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items}
+    return "BLENDER_EEVEE_NEXT" if "BLENDER_EEVEE_NEXT" in engines else "BLENDER_EEVEE"
+
+
 def setup_render_settings(settings):
     scene = bpy.context.scene
     render = scene.render
@@ -34,15 +40,20 @@ def setup_render_settings(settings):
         output_path = output_path.parent / settings["filename"]
     os.makedirs(output_path.parent, exist_ok=True)
     render.filepath = str(output_path)
+    render.threads_mode = "FIXED"
+    render.threads = int(settings["threads"])
+    # Дорендер: существующие кадры пропускаются, на кадры в работе ставятся пустые заглушки,
+    # чтобы параллельные процессы с той же папкой вывода не рендерили их повторно
+    render.use_overwrite = not settings["skip_existing"]
+    render.use_placeholder = settings["skip_existing"]
 
     if settings["engine"] == "CYCLES":
         scene.render.engine = "CYCLES"
         scene.cycles.samples = int(settings["samples"])
         scene.cycles.use_denoising = bool(int(settings["denoising"]))
         scene.cycles.device = settings["device"]
-        render.threads = int(settings["threads"])
     else:
-        scene.render.engine = "BLENDER_EEVEE"
+        scene.render.engine = eevee_engine_id()
         scene.eevee.taa_render_samples = int(settings["samples"])
 
 
@@ -64,13 +75,35 @@ def render_animation(start, end, step, settings):
     bpy.ops.render.render(animation=True)
 
 
-def main():
+def assemble_movie(frames_dir, settings):
+    frames = sorted(Path(frames_dir).glob("*.png"))
+    if not frames:
+        raise FileNotFoundError(f"Кадры для сборки не найдены в {frames_dir}")
+    scene = bpy.context.scene
+    sequence_editor = scene.sequence_editor_create()
+    strip = sequence_editor.sequences.new_image(
+        name="frames", filepath=str(frames[0]), channel=1, frame_start=1
+    )
+    for frame in frames[1:]:
+        strip.elements.append(frame.name)
+    scene.frame_start = 1
+    scene.frame_end = len(frames)
+    scene.frame_step = 1
+    setup_render_settings(settings)
+    scene.render.use_sequencer = True
+    scene.render.use_compositing = False
+    logger.info(f"Сборка {len(frames)} кадров из {frames_dir} в {settings['output']}")
+    bpy.ops.render.render(animation=True)
+
+
+def run(argv):
     parser = argparse.ArgumentParser()
-    parser.add_argument("--type", required=True, choices=["image", "animation"])
+    parser.add_argument("--type", required=True, choices=["image", "animation", "assemble"])
     parser.add_argument("--frame", type=int)
     parser.add_argument("--start", type=int)
     parser.add_argument("--end", type=int)
     parser.add_argument("--step", type=int)
+    parser.add_argument("--frames_dir")
     parser.add_argument("--output", required=True)
     parser.add_argument("--format", required=True)
     parser.add_argument("--engine", required=True)
@@ -84,8 +117,9 @@ def main():
     parser.add_argument("--fps", required=True)
     parser.add_argument("--fps_base", required=True)
     parser.add_argument("--filename", required=True)
-    parser.add_argument("project_path", help="Path to .blend file")
-    args = parser.parse_args(sys.argv[sys.argv.index("--") + 1:])
+    parser.add_argument("--skip_existing", action="store_true")
+    parser.add_argument("project_path", nargs="?", help="Path to .blend file")
+    args = parser.parse_args(argv)
 
     settings = {
         "resolution_x": args.resolution_x,
@@ -100,9 +134,14 @@ def main():
         "denoising": args.denoising,
         "device": args.device,
         "threads": args.threads,
-        "filename": args.filename
+        "filename": args.filename,
+        "skip_existing": args.skip_existing
     }
 
+    if args.type == "assemble":
+        assemble_movie(args.frames_dir, settings)
+        return
+
     bpy.ops.wm.open_mainfile(filepath=args.project_path)
 
     if args.type == "image":
@@ -111,5 +150,9 @@ def main():
         render_animation(args.start, args.end, args.step, settings)
 
 
+def main():
+    run(sys.argv[sys.argv.index("--") + 1:])
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,220 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from src.blender.cpu_allocator import load_psutil
+from src.events import Signal
+from src.logger_config import setup_logger
+
+logger = setup_logger('Telemetry')
+
+DEFAULT_INTERVAL = 1.0  # секунды между замерами
+MAX_POINTS = 720  # точек ряда на задание; дальше ряд прореживается вдвое
+
+
+@dataclass(slots=True)
+class ResourceSample:
+    """Замер ресурсов всех процессов Blender одного задания."""
+    time: float  # секунды от начала задания
+    cpu: float  # проценты одного ядра, 800 = восемь ядер
+    rss: int  # байты
+    io_read: int  # байты с начала задания
+    io_write: int
+    threads: int
+
+
+def merge_samples(samples):
+    """Одна точка вместо нескольких: средняя загрузка CPU, максимум памяти и потоков."""
+    last = samples[-1]
+    return ResourceSample(
+        time=last.time,
+        cpu=sum(sample.cpu for sample in samples) / len(samples),
+        rss=max(sample.rss for sample in samples),
+        io_read=last.io_read,
+        io_write=last.io_write,
+        threads=max(sample.threads for sample in samples),
+    )
+
+
+class JobTelemetry:
+    """Ряд замеров задания и пиковые значения.
+
+    Когда ряд достигает max_points, соседние точки попарно объединяются и шаг
+    удваивается, поэтому память на задание ограничена при любой длине рендера.
+    """
+
+    def __init__(self, job_id, max_points=MAX_POINTS):
+        self.job_id = job_id
+        self.max_points = max(2, max_points)
+        self.started = time.monotonic()
+        self.samples = []
+        self.stride = 1  # исходных замеров в одной точке ряда
+        self.peak_rss = 0
+        self.peak_cpu = 0.0
+        self.max_threads = 0
+        self.io_read = 0
+        self.io_write = 0
+        self._cpu_total = 0.0
+        self._count = 0
+        self._bucket = []
+        self._lock = threading.Lock()
+
+    def add(self, sample):
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, sample.rss)
+            self.peak_cpu = max(self.peak_cpu, sample.cpu)
+            self.max_threads = max(self.max_threads, sample.threads)
+            self.io_read, self.io_write = sample.io_read, sample.io_write
+            self._cpu_total += sample.cpu
+            self._count += 1
+            self._bucket.append(sample)
+            if len(self._bucket) < self.stride:
+                return
+            self.samples.append(merge_samples(self._bucket))
+            self._bucket = []
+            if len(self.samples) >= self.max_points:
+                self.samples = [merge_samples(self.samples[i:i + 2]) for i in range(0, len(self.samples), 2)]
+                self.stride *= 2
+
+    def series(self):
+        with self._lock:
+            return self.samples + ([merge_samples(self._bucket)] if self._bucket else [])
+
+    def summary(self):
+        """Пиковые и средние значения для render_history; пустой словарь, если замеров не было."""
+        with self._lock:
+            if not self._count:
+                return {}
+            return {
+                "peak_rss": self.peak_rss,
+                "peak_cpu": round(self.peak_cpu, 1),
+                "avg_cpu": round(self._cpu_total / self._count, 1),
+                "io_read": self.io_read,
+                "io_write": self.io_write,
+                "max_threads": self.max_threads,
+            }
+
+
+class ResourceSampler:
+    """Следит за дочерними процессами Blender через psutil в одном фоновом потоке.
+
+    Задание начинается start_job(), его процессы регистрируются через track() (его
+    удобно подключить к BlenderManager.process_started); процессы без начатого
+    задания не отслеживаются, замеры всех процессов задания суммируются.
+    Поток работает, только пока есть живые процессы. Без psutil замеры отключены.
+    """
+    sample_ready = Signal(str, object)  # job_id, ResourceSample
+
+    def __init__(self, interval=DEFAULT_INTERVAL, max_points=MAX_POINTS):
+        self.interval = interval
+        self.max_points = max_points
+        self._jobs = {}
+        self._processes = {}  # pid -> (job_id, psutil.Process)
+        self._io_base = {}  # job_id -> байты ввода-вывода завершившихся процессов (read, write)
+        self._io_last = {}  # pid -> последние счетчики процесса (read, write)
+        self._io_start = {}  # pid -> счетчики на момент привязки к заданию (теплый процесс копит их между заданиями)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start_job(self, job_id):
+        with self._lock:
+            telemetry = self._jobs[job_id] = JobTelemetry(job_id, self.max_points)
+            self._io_base[job_id] = (0, 0)
+            return telemetry
+
+    def telemetry(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def finish_job(self, job_id):
+        """Прекращает замеры задания и возвращает его JobTelemetry."""
+        with self._lock:
+            for pid, (owner, _) in list(self._processes.items()):
+                if owner == job_id:
+                    self._drop_process(pid)
+            self._io_base.pop(job_id, None)
+            return self._jobs.pop(job_id, None)
+
+    def track(self, job_id, process):
+        psutil = load_psutil()
+        if psutil is None or self.interval <= 0 or self.telemetry(job_id) is None:
+            return
+        try:
+            handle = psutil.Process(process.pid)
+            handle.cpu_percent(None)  # первый вызов только запоминает точку отсчета
+            io = handle.io_counters() if hasattr(handle, "io_counters") else None
+        except psutil.Error:
+            return
+        with self._lock:
+            if job_id not in self._jobs:
+                return  # задание завершилось, пока процесс регистрировался
+            self._processes[process.pid] = (job_id, handle)
+            self._io_start[process.pid] = (io.read_bytes, io.write_bytes) if io is not None else (0, 0)
+            self._io_last.pop(process.pid, None)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _drop_process(self, pid):
+        job_id, _ = self._processes.pop(pid)
+        read, write = self._io_last.pop(pid, (0, 0))
+        self._io_start.pop(pid, None)
+        if job_id in self._io_base:
+            base_read, base_write = self._io_base[job_id]
+            self._io_base[job_id] = (base_read + read, base_write + write)
+
+    def _run(self):
+        psutil = load_psutil()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                processes = list(self._processes.items())
+                if not processes:
+                    self._thread = None
+                    return
+            totals = {}
+            for pid, (job_id, handle) in processes:
+                try:
+                    with handle.oneshot():
+                        cpu = handle.cpu_percent(None)
+                        rss = handle.memory_info().rss
+                        threads = handle.num_threads()
+                        io = handle.io_counters() if hasattr(handle, "io_counters") else None
+                except psutil.Error:
+                    with self._lock:
+                        if pid in self._processes:
+                            self._drop_process(pid)
+                    continue
+                if io is not None:
+                    with self._lock:
+                        start_read, start_write = self._io_start.get(pid, (0, 0))
+                    self._io_last[pid] = (io.read_bytes - start_read, io.write_bytes - start_write)
+                total = totals.setdefault(job_id, [0.0, 0, 0])
+                total[0] += cpu
+                total[1] += rss
+                total[2] += threads
+            for job_id, (cpu, rss, threads) in totals.items():
+                with self._lock:
+                    telemetry = self._jobs.get(job_id)
+                    if telemetry is None:
+                        continue
+                    base_read, base_write = self._io_base.get(job_id, (0, 0))
+                    live = [self._io_last.get(pid, (0, 0)) for pid, (owner, _) in self._processes.items()
+                            if owner == job_id]
+                sample = ResourceSample(
+                    time=time.monotonic() - telemetry.started,
+                    cpu=cpu,
+                    rss=rss,
+                    io_read=base_read + sum(read for read, _ in live),
+                    io_write=base_write + sum(write for _, write in live),
+                    threads=threads,
+                )
+                telemetry.add(sample)
+                self.sample_ready.emit(job_id, sample)
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
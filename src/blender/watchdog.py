@@ -0,0 +1,181 @@
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.blender.cpu_allocator import load_psutil
+from src.blender.job_control import terminate_process_tree
+from src.logger_config import setup_logger
+
+logger = setup_logger('Watchdog')
+
+STALL_TIMEOUT = 600.0  # секунды без вывода Blender, после которых проверяется загрузка CPU
+STALL_CPU = 5.0  # проценты одного ядра: ниже этого процесс считается зависшим
+CHECK_INTERVAL = 5.0  # секунды между проверками
+PREVIEW_TIMEOUT = 300.0  # превью дольше этого не ждем
+MAX_ATTEMPTS = 3  # попыток рендера до карантина
+RETRY_DELAY = 30.0  # пауза перед первым повтором, дальше удваивается
+MAX_RETRY_DELAY = 900.0
+
+
+class RenderStalled(subprocess.CalledProcessError):
+    """Процесс Blender завершен сторожем: завис или превысил лимит времени."""
+
+    def __init__(self, returncode, command, reason, output=""):
+        message = f"{reason}\n{output}" if output else reason
+        super().__init__(returncode, command, output=message, stderr=message)
+        self.reason = reason
+
+
+class Watch:
+    """Наблюдение за одним процессом; touch() вызывается на каждую строку его вывода."""
+
+    def __init__(self, unique_id, process, handle=None, timeout=None):
+        self.unique_id = unique_id
+        self.process = process
+        self.handle = handle
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.last_output = self.started
+        self.last_check = self.started
+        self.cpu_mark = None  # (время, секунды CPU дерева процессов) начала окна тишины
+        self.reason = None  # причина остановки, если процесс завершил сторож
+
+    @property
+    def stalled(self):
+        return self.reason is not None
+
+    def touch(self):
+        self.last_output = time.monotonic()
+
+
+def _tree_cpu_time(pid):
+    """Секунды CPU процесса и его потомков или None без psutil."""
+    psutil = load_psutil()
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(pid)
+        targets = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0.0
+    for target in targets:
+        try:
+            times = target.cpu_times()
+        except psutil.Error:
+            continue
+        total += times.user + times.system
+    return total
+
+
+class HangWatchdog:
+    """Находит зависшие процессы Blender и завершает их.
+
+    Процесс считается зависшим, если он ничего не выводит дольше stall_timeout и
+    за это время его дерево процессов в среднем загружало CPU меньше stall_cpu
+    процентов одного ядра. Долгий этап без вывода, но с работающим CPU (например,
+    построение BVH), зависанием не считается. Без psutil решает одна тишина.
+    Время, проведенное задачей на паузе (handle.paused), не учитывается.
+    Watch с timeout завершается по истечении времени независимо от активности.
+    Проверки идут в одном фоновом потоке, пока есть наблюдаемые процессы.
+    """
+
+    def __init__(self, stall_timeout=STALL_TIMEOUT, stall_cpu=STALL_CPU, interval=CHECK_INTERVAL):
+        self.stall_timeout = stall_timeout
+        self.stall_cpu = stall_cpu
+        self.interval = interval
+        self._watches = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def watch(self, unique_id, process, handle=None, timeout=None):
+        watch = Watch(unique_id, process, handle, timeout)
+        if self.stall_timeout <= 0 and timeout is None:
+            return watch
+        with self._lock:
+            self._watches.append(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return watch
+
+    def unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                watches = list(self._watches)
+                if not watches:
+                    self._thread = None
+                    return
+            for watch in watches:
+                reason = self._check(watch, time.monotonic())
+                if reason is None:
+                    continue
+                self.unwatch(watch)
+                watch.reason = reason
+                logger.warning(f"Killing Blender process {watch.process.pid} of {watch.unique_id}: {reason}")
+                threading.Thread(target=terminate_process_tree, args=(watch.process,), daemon=True).start()
+
+    def _check(self, watch, now):
+        elapsed, watch.last_check = now - watch.last_check, now
+        if watch.process.poll() is not None:
+            return None
+        if watch.handle is not None and watch.handle.paused:
+            # Остановленный процесс молчит и не тратит CPU: пауза не входит ни в тишину, ни в лимит времени
+            watch.started += elapsed
+            watch.touch()
+            watch.cpu_mark = None
+            return None
+        if watch.timeout is not None and now - watch.started > watch.timeout:
+            return f"превышен лимит времени {watch.timeout:.0f} с"
+        if self.stall_timeout <= 0:
+            return None
+        cpu = _tree_cpu_time(watch.process.pid)
+        if watch.cpu_mark is None or watch.last_output > watch.cpu_mark[0]:
+            watch.cpu_mark = (now, cpu)
+        silent = now - watch.last_output
+        if silent < self.stall_timeout:
+            return None
+        marked_at, marked_cpu = watch.cpu_mark
+        if cpu is not None and marked_cpu is not None:
+            if now - marked_at < self.stall_timeout:
+                return None  # окно замера CPU еще не набрано
+            if (cpu - marked_cpu) / (now - marked_at) * 100 >= self.stall_cpu:
+                # Процесс работает молча: проверяется следующее окно
+                watch.cpu_mark = (now, cpu)
+                return None
+        return f"нет вывода {silent:.0f} с при простое CPU"
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """Повторы упавшего рендера с экспоненциальной паузой; после max_attempts - карантин."""
+    max_attempts: int = MAX_ATTEMPTS
+    base_delay: float = RETRY_DELAY
+    max_delay: float = MAX_RETRY_DELAY
+
+    def allows(self, attempt):
+        """Можно ли повторить после неудачной попытки номер attempt (с 1)."""
+        return attempt < self.max_attempts
+
+    def delay(self, attempt):
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+
+@dataclass(slots=True)
+class RenderAttempts:
+    """Попытки рендера одного задания и кадры, сохраненные в предыдущих попытках.
+
+    Повтор пропускает эти кадры и продолжает с первого незавершенного.
+    retryable сбрасывается, если попытка не запустила ни одного процесса Blender
+    (ошибка настроек) или была отменена: повтор ничего не изменит.
+    """
+    count: int = 0
+    done_frames: set = field(default_factory=set)
+    retryable: bool = True
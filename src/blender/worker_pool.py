@@ -0,0 +1,188 @@
+import json
+import secrets
+import socket
+import subprocess
+import threading
+from pathlib import Path
+
+from src.blender.cpu_allocator import available_cpus, pin_process
+from src.logger_config import setup_logger
+
+logger = setup_logger('WorkerPool')
+
+STARTUP_TIMEOUT = 60
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerBusy(WorkerError):
+    """Все процессы пула заняты, а ждать освобождения вызывающий не хочет."""
+
+
+class BlenderWorker:
+    """Резидентный процесс Blender, принимающий задания по локальному сокету."""
+
+    def __init__(self, blender_path):
+        self.blender_path = blender_path
+        self.process = None
+        self.conn = None
+        self.reader = None
+        self.busy = False
+
+    def start(self):
+        script_path = Path(__file__).parent / "worker_script.py"
+        token = secrets.token_hex(16)
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        server.settimeout(STARTUP_TIMEOUT)
+        port = server.getsockname()[1]
+        try:
+            self.process = subprocess.Popen(
+                [str(self.blender_path), "--background", "--python", str(script_path), "--", str(port), token],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            conn, _ = server.accept()
+        except (OSError, socket.timeout) as e:
+            self.stop()
+            raise WorkerError(f"Worker failed to start: {str(e)}")
+        finally:
+            server.close()
+        conn.settimeout(None)
+        self.conn = conn
+        self.reader = conn.makefile("r", encoding="utf-8")
+        hello = json.loads(self.reader.readline() or "{}")
+        if hello.get("hello") != token:
+            self.stop()
+            raise WorkerError("Worker handshake failed")
+        logger.info(f"Started warm Blender worker (pid {self.process.pid}) for {self.blender_path}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None and self.conn is not None
+
+    def send(self, message):
+        try:
+            self.conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        except (OSError, AttributeError) as e:
+            raise WorkerError(f"Worker connection lost: {str(e)}")
+
+    def request(self, message, on_event=None):
+        """Отправляет задание и ждет ответа; промежуточные события передаются в on_event."""
+        self.send(message)
+        while True:
+            try:
+                line = self.reader.readline()
+            except OSError as e:
+                raise WorkerError(f"Worker connection lost: {str(e)}")
+            if not line:
+                raise WorkerError("Worker exited during job")
+            reply = json.loads(line)
+            if "event" not in reply:
+                return reply
+            if on_event:
+                on_event(reply)
+
+    def stop(self):
+        if self.conn is not None:
+            try:
+                self.conn.sendall(b'{"type": "quit"}\n')
+            except OSError:
+                pass
+            self.conn.close()
+            self.conn = None
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class WorkerPool:
+    """Небольшой пул прогретых процессов Blender на каждый исполняемый файл.
+
+    Пул не растет вместе с числом одновременных рендеров: задание, которое не ждет
+    (wait=False), при занятом пуле выполняется отдельным процессом.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max(1, max_workers)
+        self._workers = {}
+        self._condition = threading.Condition()
+
+    def _acquire(self, blender_path, wait=True):
+        with self._condition:
+            while True:
+                workers = self._workers.setdefault(blender_path, [])
+                workers[:] = [w for w in workers if w.busy or w.is_alive()]
+                idle = next((w for w in workers if not w.busy), None)
+                if idle:
+                    idle.busy = True
+                    return idle
+                if len(workers) < self.max_workers:
+                    worker = BlenderWorker(blender_path)
+                    worker.busy = True
+                    workers.append(worker)
+                    break
+                if not wait:
+                    raise WorkerBusy(f"All {self.max_workers} warm workers for {blender_path} are busy")
+                self._condition.wait()
+        try:
+            worker.start()
+        except WorkerError:
+            self._discard(worker)
+            raise
+        return worker
+
+    def _release(self, worker):
+        if worker.is_alive():
+            # Планировщик мог закрепить процесс за ядрами своего задания: в пуле ему снова доступны все
+            pin_process(worker.process.pid, available_cpus())
+        with self._condition:
+            worker.busy = False
+            self._condition.notify()
+
+    def _discard(self, worker):
+        worker.stop()
+        with self._condition:
+            workers = self._workers.get(worker.blender_path, [])
+            if worker in workers:
+                workers.remove(worker)
+            self._condition.notify()
+
+    def submit(self, blender_path, message, retries=1, on_event=None, on_acquire=None, cancelled=None, wait=True):
+        """Выполняет задание на прогретом процессе; упавший процесс перезапускается.
+
+        cancelled - функция без аргументов: если задание отменено (процесс завершен
+        отменой, а не упал), оно не повторяется на новом процессе.
+        wait=False - если все процессы пула заняты, сразу выбрасывается WorkerBusy:
+        вызывающий запускает отдельный процесс вместо ожидания чужого долгого задания.
+        """
+        for attempt in range(retries + 1):
+            worker = self._acquire(blender_path, wait)
+            if on_acquire:
+                on_acquire(worker)
+            try:
+                reply = worker.request(message, on_event)
+            except WorkerError as e:
+                self._discard(worker)
+                if cancelled is not None and cancelled():
+                    logger.info(f"Warm worker for {blender_path} stopped by cancel")
+                    raise
+                logger.error(f"Warm worker for {blender_path} crashed: {str(e)}")
+                if attempt == retries:
+                    raise
+                continue
+            self._release(worker)
+            return reply
+
+    def shutdown(self):
+        with self._condition:
+            workers = [w for group in self._workers.values() for w in group]
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
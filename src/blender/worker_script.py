@@ -0,0 +1,122 @@
+import json
+import select
+import socket
+import sys
+import logging
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import probe_script  # noqa: E402
+import render_preview_script  # noqa: E402
+import render_script  # noqa: E402
+
+logger = logging.getLogger('WorkerScript')
+
+
+def send(conn, message):
+    conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+
+class LineReader:
+    """Построчное чтение сокета с собственным буфером.
+
+    Один буфер и для заданий, и для проверки отмены: select по сокету не видит
+    строк, уже прочитанных в буфер, поэтому сначала проверяется буфер.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffer = b""
+
+    def readline(self, timeout=None):
+        """Строка без перевода строки, "" при закрытом соединении, None если за timeout ничего не пришло."""
+        while b"\n" not in self.buffer:
+            if timeout is not None and not select.select([self.conn], [], [], timeout)[0]:
+                return None
+            chunk = self.conn.recv(65536)
+            if not chunk:
+                return ""
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return line.decode("utf-8")
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+
+def handle(job, conn, reader):
+    if job["type"] == "thumbnail":
+        cancelled = []
+
+        def on_pass(index, total, path):
+            send(conn, {"event": "pass", "index": index, "total": total, "path": path})
+
+        def should_cancel():
+            # Во время задания по соединению может прийти только отмена
+            while not cancelled:
+                line = reader.readline(timeout=0)
+                if line is None:
+                    break
+                message = json.loads(line) if line else {}
+                if not line or (message.get("type") == "cancel" and message.get("job_id") == job.get("job_id")):
+                    cancelled.append(True)
+            return bool(cancelled)
+
+        passes = render_preview_script.PROGRESSIVE_PASSES if job.get("progressive") else None
+        paths = render_preview_script.render_thumbnail(
+            job["file_path"], job["render_engine"], int(job["cycles_denoising"]),
+            job["cycles_device"], int(job["threads"]), job["output_path"],
+            int(job["resolution_x"]), int(job["resolution_y"]),
+            passes, on_pass, should_cancel
+        )
+        return {"ok": True, "paths": paths, "cancelled": bool(cancelled)}
+    if job["type"] == "probe":
+        return {"ok": True, "settings": probe_script.read_scene_settings(job["file_path"])}
+    if job["type"] == "scene_stats":
+        return {"ok": True, "stats": probe_script.read_scene_stats(job["file_path"])}
+    if job["type"] == "render":
+        render_script.run(job["args"])
+        return {"ok": True}
+    raise ValueError(f"Unknown job type: {job['type']}")
+
+
+def unload_scene():
+    """Выгружает сцену задания, чтобы память и замеры следующего задания не несли ее с собой."""
+    try:
+        bpy.ops.wm.read_homefile(use_empty=True, load_ui=False)
+    except Exception as e:
+        logger.warning(f"Failed to unload scene: {str(e)}")
+
+
+def serve(port, token):
+    conn = socket.create_connection(("127.0.0.1", port))
+    send(conn, {"hello": token})
+    logger.info(f"Worker connected to 127.0.0.1:{port}")
+    reader = LineReader(conn)
+    for line in reader:
+        job = json.loads(line)
+        if job["type"] == "quit":
+            break
+        if job["type"] == "cancel":
+            continue  # отмена пришла после завершения задания
+        try:
+            reply = handle(job, conn, reader)
+        except BaseException as e:
+            logger.error(f"Job failed: {str(e)}")
+            reply = {"ok": False, "error": str(e) or e.__class__.__name__}
+        unload_scene()
+        send(conn, reply)
+    conn.close()
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:]
+    serve(int(argv[0]), argv[1])
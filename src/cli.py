@@ -0,0 +1,461 @@
+"""Консольный режим без Qt: просмотр и пополнение очереди, рендер и демон.
+
+Все события выводятся в stdout по одному JSON-объекту на строку, например:
+    {"event": "progress", "job": "...", "frame": 12, "sample": 64, ...}
+
+Примеры:
+    python -m src.cli list --status pending
+    python -m src.cli add scenes/ shot_010.blend --blender /opt/blender/blender
+    python -m src.cli render --concurrency 2
+    python -m src.cli daemon --poll 10 --stall-timeout 900 --max-attempts 3
+    python -m src.cli priority <id> 1
+    python -m src.cli cancel <id>
+    python -m src.cli coordinator --port 7821 --token secret
+    python -m src.cli worker farm-host --token secret --map /mnt/projects=/Volumes/projects
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from src.blender.blender_manager import BlenderManager
+from src.blender.render_scheduler import RenderScheduler
+from src.blender.memory_admission import GB
+from src.blender.telemetry import DEFAULT_INTERVAL
+from src.blender.watchdog import MAX_ATTEMPTS, RETRY_DELAY, STALL_TIMEOUT, RetryPolicy
+from src.database.db_manager import DatabaseManager
+from src.database.thumbnail_cache import ThumbnailCache
+from src.farm.coordinator import FarmCoordinator, LEASE_TIMEOUT, BASE_CHUNK_FRAMES
+from src.farm.protocol import DEFAULT_PORT
+from src.farm.worker import FarmWorker
+from src.models.project import PRIORITY_URGENT, Project, Settings
+from src.logger_config import setup_logger
+
+logger = setup_logger('CLI')
+
+DEFAULT_DB_PATH = "blender_render_tool.db"
+DEFAULT_POLL_INTERVAL = 5.0
+FARM_TOKEN_ENV = "BLENDER_RENDER_TOOL_FARM_TOKEN"
+
+
+class JsonEmitter:
+    """Построчный JSON в stdout; запись из нескольких потоков не перемешивается."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "time": time.time(), **fields}, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class HeadlessContext:
+    """Владелец BlenderManager без интерфейса: база, кэш превью и лог в виде JSON-событий."""
+
+    def __init__(self, db_manager, emitter):
+        self.db_manager = db_manager
+        self.emitter = emitter
+        self.thumbnail_cache = ThumbnailCache(db_manager, Path(db_manager.db_path).parent / "thumbnail_cache")
+
+    def log(self, message, level=logging.INFO, job_id=None):
+        self.emitter.emit("log", level=logging.getLevelName(level), job=job_id, message=message)
+
+    def job_logger(self, unique_id):
+        def log_callback(message, level=logging.INFO):
+            self.log(message, level, unique_id)
+        return log_callback
+
+
+class HeadlessRunner:
+    """Связывает BlenderManager и RenderScheduler с JSON-выводом."""
+
+    def __init__(self, db_manager, emitter, concurrency=1, cores=None, blender_path=None, skip_existing=False,
+                 pin_cpus=True, background=False, sample_interval=DEFAULT_INTERVAL, memory_check=True,
+                 memory_headroom=None, stall_timeout=STALL_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY):
+        self.db_manager = db_manager
+        self.emitter = emitter
+        self.context = HeadlessContext(db_manager, emitter)
+        self.blender_manager = BlenderManager(self.context, db_manager.get_blender_paths())
+        if blender_path:
+            self.blender_manager.register_blender_path(blender_path)
+            self.blender_manager.blender_executable = str(Path(blender_path))
+        self.blender_manager.telemetry.interval = sample_interval
+        self.blender_manager.admission.enabled = memory_check
+        if memory_headroom is not None:
+            self.blender_manager.admission.headroom = int(memory_headroom * GB)
+        self.blender_manager.watchdog.stall_timeout = stall_timeout
+        self.blender_manager.retry_policy = RetryPolicy(max(1, max_attempts), retry_delay)
+        self.scheduler = RenderScheduler(self.blender_manager, concurrency, cores, db_manager=db_manager,
+                                         pin_cpus=pin_cpus, background=background)
+        self.skip_existing = skip_existing
+        self.idle = threading.Event()
+        self.idle.set()
+        self.failed = 0
+        self.blender_manager.render_progress.connect(self.on_progress)
+        self.blender_manager.chunk_complete.connect(self.on_chunk)
+        self.blender_manager.telemetry.sample_ready.connect(self.on_resources)
+        self.scheduler.job_started.connect(self.on_job_started)
+        self.scheduler.job_finished.connect(self.on_job_finished)
+        self.scheduler.job_held.connect(self.on_job_held)
+        self.scheduler.job_retrying.connect(self.on_job_retrying)
+        self.blender_manager.jobs.job_paused.connect(self.on_job_paused)
+        self.scheduler.queue_finished.connect(self.on_queue_finished)
+
+    def on_progress(self, unique_id, progress):
+        self.emitter.emit("progress", job=unique_id, **asdict(progress))
+
+    def on_chunk(self, unique_id, done, total, success):
+        self.emitter.emit("chunk", job=unique_id, done=done, total=total, success=success)
+
+    def on_resources(self, unique_id, sample):
+        self.emitter.emit("resources", job=unique_id, **asdict(sample))
+
+    def on_job_started(self, unique_id, threads):
+        self.emitter.emit("job_started", job=unique_id, threads=threads)
+
+    def on_job_held(self, unique_id, estimate, available):
+        self.emitter.emit("job_held", job=unique_id, memory_estimate=estimate, memory_available=available)
+
+    def on_job_retrying(self, unique_id, attempt, delay, message):
+        self.emitter.emit("job_retrying", job=unique_id, attempt=attempt, delay=delay, message=message)
+
+    def on_job_paused(self, unique_id, paused):
+        self.emitter.emit("job_paused" if paused else "job_resumed", job=unique_id)
+
+    def on_job_finished(self, unique_id, success, message):
+        if not success:
+            self.failed += 1
+        self.emitter.emit("job_finished", job=unique_id, success=success, message=message)
+
+    def on_queue_finished(self):
+        self.emitter.emit("queue_finished", failed=self.failed)
+        self.idle.set()
+
+    def submit(self, project):
+        if not project.settings.blender_path:
+            project.settings.blender_path = self.blender_manager.blender_executable or ""
+            self.db_manager.update_project(project)
+        if not project.settings.blender_path or not project.settings.output_path:
+            self.emitter.emit("job_skipped", job=project.unique_id, name=project.name,
+                              reason="blender_path or output_path not set")
+            self.db_manager.set_project_status(project.unique_id, "failed")
+            return False
+        if self.skip_existing:
+            # Только для этого запуска, в базе настройка проекта не меняется
+            project.settings.skip_existing = True
+        self.idle.clear()
+        self.scheduler.submit(project, self.context.job_logger(project.unique_id))
+        self.emitter.emit("job_queued", job=project.unique_id, name=project.name)
+        return True
+
+    def return_pending(self):
+        """Снимает с планировщика незапущенные задания и возвращает их в pending."""
+        jobs = self.scheduler.take_pending()
+        with self.db_manager.transaction():
+            for job in jobs:
+                self.db_manager.claim_project(job.unique_id, from_status="queued", to_status="pending")
+        return len(jobs)
+
+    def apply_cancellations(self):
+        """Отменяет свои задания, которые команда cancel перевела в cancelling."""
+        for row in self.db_manager.get_queue(status="cancelling"):
+            if self.scheduler.cancel(row["unique_id"]):
+                self.emitter.emit("job_cancelling", job=row["unique_id"])
+
+    def shutdown(self):
+        self.blender_manager.shutdown()
+
+
+def iter_blend_files(paths):
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(path.glob("*.blend"))
+        else:
+            yield path
+
+
+def cmd_list(args, db_manager, emitter):
+    for row in db_manager.get_queue(status=args.status, engine=args.engine, render_type=args.render_type,
+                                    limit=args.limit, offset=args.offset):
+        emitter.emit("project", **row)
+    return 0
+
+
+def cmd_add(args, db_manager, emitter):
+    runner = HeadlessRunner(db_manager, emitter, blender_path=args.blender)
+    try:
+        default_blender = runner.blender_manager.blender_executable or next(iter(db_manager.get_blender_paths()), "")
+        added = 0
+        for file_path in iter_blend_files(args.paths):
+            if not file_path.exists():
+                emitter.emit("error", file=str(file_path), message="file not found")
+                continue
+            probed = runner.blender_manager.get_settings_from_project(str(file_path))
+            settings, message = Settings.for_blend_file(file_path, probed, default_blender)
+            if args.output:
+                settings.output_path = str(Path(args.output))
+            settings.priority = args.priority
+            project = Project(unique_id="", name="", file_path=str(file_path), settings=settings)
+            db_manager.save_project(project)
+            added += 1
+            emitter.emit("project_added", job=project.unique_id, name=project.name,
+                         file_path=project.file_path, message=message)
+        return 0 if added else 1
+    finally:
+        runner.shutdown()
+
+
+def cmd_render(args, db_manager, emitter):
+    runner = HeadlessRunner(db_manager, emitter, args.concurrency, args.cores, args.blender, args.skip_existing,
+                            args.pin_cpus, args.background, args.sample_interval, args.memory_check,
+                            args.memory_headroom, args.stall_timeout, args.max_attempts, args.retry_delay)
+    try:
+        if args.ids:
+            projects = [project for project in map(db_manager.get_project, args.ids) if project]
+        else:
+            projects = db_manager.load_projects(status=args.status)
+        submitted = 0
+        for project in projects:
+            # Без явных id берутся только задания, которые не забрал другой процесс
+            if not args.ids and not db_manager.claim_project(project.unique_id, from_status=args.status):
+                continue
+            submitted += runner.submit(project)
+        if not submitted:
+            emitter.emit("queue_finished", failed=0)
+            return 0
+        while not runner.idle.wait(0.5):
+            runner.apply_cancellations()
+        return 1 if runner.failed else 0
+    except KeyboardInterrupt:
+        runner.return_pending()
+        emitter.emit("interrupted")
+        return 130
+    finally:
+        runner.shutdown()
+
+
+def cmd_daemon(args, db_manager, emitter):
+    """Берет задания со статусом pending из общей базы, пока не получит SIGTERM/SIGINT."""
+    runner = HeadlessRunner(db_manager, emitter, args.concurrency, args.cores, args.blender, args.skip_existing,
+                            args.pin_cpus, args.background, args.sample_interval, args.memory_check,
+                            args.memory_headroom, args.stall_timeout, args.max_attempts, args.retry_delay)
+    stop = stop_on_signals()
+    if args.reset_stale:
+        emitter.emit("reset_stale", count=db_manager.reset_stale_projects())
+    emitter.emit("daemon_started", db=db_manager.db_path, concurrency=runner.scheduler.max_concurrency)
+    try:
+        while not stop.is_set():
+            runner.apply_cancellations()
+            # Новые задания берутся, только когда есть свободный слот, остальные ждут в базе;
+            # срочное задание берется и без слота - планировщик вытеснит менее приоритетное
+            free = runner.scheduler.max_concurrency - runner.scheduler.running_count() - runner.scheduler.pending_count()
+            for row in db_manager.get_queue(status="pending", limit=max(free, 1), by_priority=True):
+                if free <= 0 and row["priority"] < PRIORITY_URGENT:
+                    break
+                if db_manager.claim_project(row["unique_id"]):
+                    runner.submit(db_manager.get_project(row["unique_id"]))
+                    free -= 1
+            stop.wait(args.poll)
+        emitter.emit("daemon_stopping", returned_to_queue=runner.return_pending())
+        while runner.scheduler.running_count():
+            time.sleep(0.5)
+    finally:
+        runner.shutdown()
+        emitter.emit("daemon_stopped")
+    return 0
+
+
+def cmd_priority(args, db_manager, emitter):
+    project = db_manager.get_project(args.id)
+    if project is None:
+        emitter.emit("error", job=args.id, message="project not found")
+        return 1
+    project.settings.priority = args.priority
+    db_manager.update_project(project)
+    emitter.emit("priority_changed", job=args.id, priority=args.priority)
+    return 0
+
+
+def cmd_cancel(args, db_manager, emitter):
+    """Ожидающие задания отменяются сразу, запущенные - демоном, который их рендерит."""
+    failed = 0
+    for unique_id in args.ids:
+        if db_manager.claim_project(unique_id, from_status="pending", to_status="cancelled"):
+            emitter.emit("job_cancelled", job=unique_id)
+        elif (db_manager.claim_project(unique_id, from_status="queued", to_status="cancelling")
+              or db_manager.claim_project(unique_id, from_status="running", to_status="cancelling")):
+            emitter.emit("job_cancelling", job=unique_id)
+        else:
+            emitter.emit("error", job=unique_id, message=f"cannot cancel ({db_manager.get_project_status(unique_id)})")
+            failed += 1
+    return 1 if failed else 0
+
+
+def stop_on_signals():
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    return stop
+
+
+def cmd_coordinator(args, db_manager, emitter):
+    """Раздает кадры заданий pending агентам фермы до SIGTERM/SIGINT."""
+    coordinator = FarmCoordinator(db_manager, args.host, args.port, args.token or os.environ.get(FARM_TOKEN_ENV),
+                                  lease_timeout=args.lease_timeout, base_chunk=args.chunk)
+    coordinator.worker_joined.connect(lambda worker: emitter.emit("worker_joined", worker=worker))
+    coordinator.worker_left.connect(lambda worker: emitter.emit("worker_left", worker=worker))
+    coordinator.lease_granted.connect(
+        lambda worker, job, frames: emitter.emit("lease_granted", worker=worker, job=job, frames=frames))
+    coordinator.lease_expired.connect(
+        lambda worker, job, frames: emitter.emit("lease_returned", worker=worker, job=job, frames=frames))
+    coordinator.frame_done.connect(
+        lambda job, frame, worker: emitter.emit("frame_done", job=job, frame=frame, worker=worker))
+    coordinator.job_finished.connect(
+        lambda job, success, message: emitter.emit("job_finished", job=job, success=success, message=message))
+    stop = stop_on_signals()
+    coordinator.start()
+    emitter.emit("coordinator_started", host=args.host, port=coordinator.port,
+                 token=None if args.token or os.environ.get(FARM_TOKEN_ENV) else coordinator.token)
+    try:
+        while not stop.wait(args.status_interval):
+            emitter.emit("farm_status", **coordinator.status())
+    finally:
+        coordinator.stop()
+        emitter.emit("coordinator_stopped")
+    return 0
+
+
+def cmd_worker(args, db_manager, emitter):
+    """Рендерит аренды координатора локальным Blender до SIGTERM/SIGINT."""
+    path_map = [tuple(item.split("=", 1)) for item in args.map]
+    worker = FarmWorker(args.host, args.port, args.token or os.environ.get(FARM_TOKEN_ENV, ""),
+                        blender_path=args.blender, blender_paths=db_manager.get_blender_paths(),
+                        name=args.name, threads=args.threads, path_map=path_map, output_dir=args.output)
+    if not worker.blender_path:
+        emitter.emit("error", message="Blender not found, use --blender")
+        return 1
+    worker.connection_changed.connect(
+        lambda connected, message: emitter.emit("connection", connected=connected, message=message))
+    worker.lease_started.connect(lambda job, frames: emitter.emit("lease_started", job=job, frames=frames))
+    worker.frame_rendered.connect(lambda job, frame, path: emitter.emit("frame_done", job=job, frame=frame, path=path))
+    worker.lease_finished.connect(
+        lambda job, success, message: emitter.emit("lease_finished", job=job, success=success, message=message))
+    stop = stop_on_signals()
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    while not stop.wait(0.5) and thread.is_alive():
+        pass
+    worker.stop()
+    thread.join()
+    emitter.emit("worker_stopped")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Blender Render Tool без интерфейса")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="путь к базе SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="показать очередь")
+    list_parser.add_argument("--status")
+    list_parser.add_argument("--engine")
+    list_parser.add_argument("--render-type", dest="render_type")
+    list_parser.add_argument("--limit", type=int)
+    list_parser.add_argument("--offset", type=int, default=0)
+    list_parser.set_defaults(handler=cmd_list)
+
+    add_parser = commands.add_parser("add", help="добавить .blend файлы или папки в очередь")
+    add_parser.add_argument("paths", nargs="+")
+    add_parser.add_argument("--blender", help="исполняемый файл Blender")
+    add_parser.add_argument("--output", help="папка вывода вместо значения по умолчанию")
+    add_parser.add_argument("--priority", type=int, default=0,
+                            help=f"приоритет в очереди; {PRIORITY_URGENT} и выше вытесняет менее приоритетные задания")
+    add_parser.set_defaults(handler=cmd_add)
+
+    priority_parser = commands.add_parser("priority", help="изменить приоритет проекта в очереди")
+    priority_parser.add_argument("id")
+    priority_parser.add_argument("priority", type=int)
+    priority_parser.set_defaults(handler=cmd_priority)
+
+    cancel_parser = commands.add_parser("cancel", help="отменить ожидающие или запущенные задания")
+    cancel_parser.add_argument("ids", nargs="+")
+    cancel_parser.set_defaults(handler=cmd_cancel)
+
+    for name, handler, help_text in (("render", cmd_render, "отрендерить очередь и завершиться"),
+                                     ("daemon", cmd_daemon, "постоянно брать задания из базы")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--concurrency", type=int, default=1, help="одновременных заданий")
+        command.add_argument("--cores", type=int, help="ядер на все задания")
+        command.add_argument("--blender", help="Blender для проектов без указанного пути")
+        command.add_argument("--skip-existing", dest="skip_existing", action="store_true",
+                             help="дорендер: пропускать кадры, уже готовые в папке вывода")
+        command.add_argument("--no-pin", dest="pin_cpus", action="store_false",
+                             help="не закреплять процессы Blender за ядрами")
+        command.add_argument("--sample-interval", dest="sample_interval", type=float, default=DEFAULT_INTERVAL,
+                             help="интервал замеров CPU и памяти Blender, секунды; 0 - без замеров")
+        command.add_argument("--no-memory-check", dest="memory_check", action="store_false",
+                             help="запускать задания, не проверяя свободную память")
+        command.add_argument("--memory-headroom", dest="memory_headroom", type=float,
+                             help="сколько памяти оставлять свободной, ГБ; по умолчанию 10%% (не меньше 2 ГБ)")
+        command.add_argument("--stall-timeout", dest="stall_timeout", type=float, default=STALL_TIMEOUT,
+                             help="секунды без вывода и при простое CPU, после которых Blender завершается; 0 - не следить")
+        command.add_argument("--max-attempts", dest="max_attempts", type=int, default=MAX_ATTEMPTS,
+                             help="попыток рендера до карантина; 1 - без повторов")
+        command.add_argument("--retry-delay", dest="retry_delay", type=float, default=RETRY_DELAY,
+                             help="пауза перед первым повтором, секунды; дальше удваивается")
+        command.set_defaults(handler=handler, background=handler is cmd_daemon)
+    commands.choices["render"].add_argument("ids", nargs="*", help="id проектов; по умолчанию вся очередь")
+    commands.choices["render"].add_argument("--status", default="pending", help="какие задания брать из очереди")
+    commands.choices["daemon"].add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                                            help="интервал опроса базы, секунды")
+    commands.choices["daemon"].add_argument("--reset-stale", action="store_true",
+                                            help="вернуть в pending задания queued/running после сбоя")
+    commands.choices["daemon"].add_argument("--foreground", dest="background", action="store_false",
+                                            help="не понижать приоритет CPU и ввода-вывода Blender")
+
+    coordinator_parser = commands.add_parser("coordinator", help="раздавать кадры очереди агентам фермы")
+    coordinator_parser.add_argument("--host", default="0.0.0.0")
+    coordinator_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator_parser.add_argument("--token", help=f"общий секрет агентов; также {FARM_TOKEN_ENV}")
+    coordinator_parser.add_argument("--lease-timeout", dest="lease_timeout", type=float, default=LEASE_TIMEOUT,
+                                    help="секунды без heartbeat до передачи кадров другому агенту")
+    coordinator_parser.add_argument("--chunk", type=int, default=BASE_CHUNK_FRAMES,
+                                    help="кадров в аренде для агента средней скорости")
+    coordinator_parser.add_argument("--status-interval", dest="status_interval", type=float, default=10.0)
+    coordinator_parser.set_defaults(handler=cmd_coordinator)
+
+    worker_parser = commands.add_parser("worker", help="рендерить кадры для координатора фермы")
+    worker_parser.add_argument("host")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    worker_parser.add_argument("--token", help=f"общий секрет координатора; также {FARM_TOKEN_ENV}")
+    worker_parser.add_argument("--blender", help="локальный исполняемый файл Blender")
+    worker_parser.add_argument("--name", help="имя агента; по умолчанию имя хоста")
+    worker_parser.add_argument("--threads", type=int, help="потоков Blender на агенте")
+    worker_parser.add_argument("--output", help="локальная папка вывода вместо пути проекта")
+    worker_parser.add_argument("--map", action="append", default=[], metavar="REMOTE=LOCAL",
+                               help="замена префикса путей координатора на локальный")
+    worker_parser.set_defaults(handler=cmd_worker)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db_manager = DatabaseManager(args.db)
+    try:
+        return args.handler(args, db_manager, JsonEmitter())
+    finally:
+        db_manager.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,164 @@
 import sqlite3
 import json
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from src.models.project import Project, Settings
+from src.models.project import Project
+from src.logger_config import setup_logger
+
+logger = setup_logger('DatabaseManager')
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+CACHED_STATEMENTS = 256
+PROJECT_STATUSES = ("pending", "queued", "running", "done", "failed", "cancelling", "cancelled", "quarantined")
+
+
+def _migrate_project_columns(cursor):
+    """Версия 1: индексированные колонки очереди вместо разбора JSON настроек."""
+    for column, definition in (("position", "REAL"), ("status", "TEXT NOT NULL DEFAULT 'pending'"),
+                               ("engine", "TEXT"), ("render_type", "TEXT"),
+                               ("blender_path", "TEXT"), ("modified_at", "REAL")):
+        cursor.execute(f"ALTER TABLE projects ADD COLUMN {column} {definition}")
+    rows = cursor.execute("SELECT rowid, settings FROM projects ORDER BY rowid").fetchall()
+    now = time.time()
+    updates = []
+    for position, (rowid, settings_json) in enumerate(rows, start=1):
+        settings = json.loads(settings_json)
+        updates.append((position, settings.get("render_engine"), settings.get("render_type"),
+                        settings.get("blender_path"), now, rowid))
+    cursor.executemany("""
+        UPDATE projects SET position = ?, engine = ?, render_type = ?, blender_path = ?, modified_at = ?
+        WHERE rowid = ?
+    """, updates)
+    cursor.execute("CREATE INDEX idx_projects_position ON projects (position)")
+    cursor.execute("CREATE INDEX idx_projects_status ON projects (status, engine, position)")
+    cursor.execute("CREATE INDEX idx_projects_render_type ON projects (render_type)")
+    cursor.execute("CREATE INDEX idx_projects_blender_path ON projects (blender_path)")
+    cursor.execute("CREATE INDEX idx_projects_modified ON projects (modified_at)")
+
+
+def _migrate_render_telemetry(cursor):
+    """Версия 2: пиковые ресурсы процессов Blender и ряды замеров для истории рендеров."""
+    for column, definition in (("peak_rss", "INTEGER"), ("peak_cpu", "REAL"), ("avg_cpu", "REAL"),
+                               ("io_read", "INTEGER"), ("io_write", "INTEGER"), ("max_threads", "INTEGER")):
+        cursor.execute(f"ALTER TABLE render_history ADD COLUMN {column} {definition}")
+    cursor.execute("""
+        CREATE TABLE render_telemetry (
+            history_id INTEGER NOT NULL REFERENCES render_history (id) ON DELETE CASCADE,
+            time REAL NOT NULL,
+            cpu REAL NOT NULL,
+            rss INTEGER NOT NULL,
+            io_read INTEGER NOT NULL,
+            io_write INTEGER NOT NULL,
+            threads INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_render_telemetry ON render_telemetry (history_id, time)")
+    cursor.execute("CREATE INDEX idx_render_history_unique_id ON render_history (unique_id, started_at)")
+
+
+def _migrate_scene_stats(cursor):
+    """Версия 3: кэш статистики сцен для оценки памяти рендера."""
+    cursor.execute("""
+        CREATE TABLE scene_stats (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            stats TEXT NOT NULL
+        )
+    """)
+
+
+def _migrate_project_priority(cursor):
+    """Версия 4: приоритет проекта в очереди как индексированная колонка."""
+    cursor.execute("ALTER TABLE projects ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+    rows = cursor.execute("SELECT rowid, settings FROM projects").fetchall()
+    cursor.executemany("UPDATE projects SET priority = ? WHERE rowid = ?",
+                       [(json.loads(settings_json).get("priority", 0), rowid) for rowid, settings_json in rows])
+    cursor.execute("CREATE INDEX idx_projects_priority ON projects (status, priority DESC, position)")
+
+
+MIGRATIONS = [
+    _migrate_project_columns,
+    _migrate_render_telemetry,
+    _migrate_scene_stats,
+    _migrate_project_priority,
+]
+TELEMETRY_COLUMNS = ("peak_rss", "peak_cpu", "avg_cpu", "io_read", "io_write", "max_threads")
 
 
 class DatabaseManager:
+    """Доступ к базе через одно долгоживущее соединение на поток.
+
+    Соединения открываются в режиме WAL, подготовленные запросы кэшируются
+    модулем sqlite3. Записи внутри transaction() фиксируются одним COMMIT.
+    """
+
     def __init__(self, db_path: str):
         self.db_path = str(Path(db_path))
         # os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
         self.init_db()
 
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Автокоммит: транзакции открываются явно в transaction()
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=CACHED_STATEMENTS)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._close_dead_connections()
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    def _close_dead_connections(self):
+        for thread in [thread for thread in self._connections if not thread.is_alive()]:
+            self._connections.pop(thread).close()
+
+    @contextmanager
+    def transaction(self):
+        """Единица работы: вложенные блоки присоединяются к внешнему, COMMIT выполняется один раз."""
+        conn = self._connection()
+        if self._local.depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.execute("COMMIT")
+
+    def _execute(self, sql, params=()):
+        return self._connection().execute(sql, params)
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS projects (
                     unique_id TEXT PRIMARY KEY,
@@ -33,84 +179,401 @@ class DatabaseManager:
                     version TEXT NOT NULL
                 )
             """)
-            conn.commit()
+            cursor.execute("PRAGMA table_info(thumbnails)")
+            if "cache_key" not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE thumbnails ADD COLUMN cache_key TEXT")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS thumbnail_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_thumbnail_cache_access ON thumbnail_cache (last_access)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS render_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    unique_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    settings_key TEXT NOT NULL,
+                    blender_version TEXT,
+                    engine TEXT NOT NULL,
+                    samples INTEGER NOT NULL,
+                    resolution_x INTEGER NOT NULL,
+                    resolution_y INTEGER NOT NULL,
+                    resolution_scale INTEGER NOT NULL,
+                    device TEXT NOT NULL,
+                    threads INTEGER NOT NULL,
+                    frame_count INTEGER NOT NULL,
+                    started_at REAL NOT NULL,
+                    wall_time REAL NOT NULL,
+                    peak_memory REAL,
+                    success INTEGER NOT NULL
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_render_history_project ON render_history (file_path, settings_key)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_render_history_engine ON render_history (engine, device)"
+            )
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS render_history_frames (
+                    history_id INTEGER NOT NULL REFERENCES render_history (id) ON DELETE CASCADE,
+                    frame INTEGER NOT NULL,
+                    render_time REAL NOT NULL,
+                    peak_memory REAL
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_render_history_frames ON render_history_frames (history_id)"
+            )
+            cursor.execute("PRAGMA table_info(blender_paths)")
+            columns = {row[1] for row in cursor.fetchall()}
+            for column, definition in (("mtime", "REAL"), ("size", "INTEGER"),
+                                       ("engines", "TEXT"), ("gpu_backends", "TEXT")):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE blender_paths ADD COLUMN {column} {definition}")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS probe_cache (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    settings TEXT NOT NULL
+                )
+            """)
+            self._migrate(cursor)
+
+    def _migrate(self, cursor):
+        """Применяет миграции схемы по номеру версии в PRAGMA user_version."""
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            logger.info(f"Database schema migrated to version {target}")
+
+    @staticmethod
+    def _project_columns(project: Project) -> dict:
+        settings = project.settings
+        return {
+            "unique_id": project.unique_id,
+            "name": project.name,
+            "file_path": project.file_path,
+            "settings": project.settings_to_json(),
+            "engine": settings.render_engine,
+            "render_type": settings.render_type,
+            "blender_path": settings.blender_path,
+            "priority": settings.priority,
+            "modified_at": time.time(),
+        }
 
     def save_project(self, project: Project):
-        settings_json = json.dumps(project.settings.to_dict())
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        """Добавляет проект в конец очереди; для существующего проекта позиция и статус сохраняются."""
+        with self.transaction() as cursor:
             cursor.execute("""
-                INSERT OR REPLACE INTO projects (unique_id, name, file_path, settings)
-                VALUES (?, ?, ?, ?)
-            """, (project.unique_id, project.name, project.file_path, settings_json))
-            conn.commit()
+                INSERT INTO projects (unique_id, name, file_path, settings, position, status,
+                                      engine, render_type, blender_path, priority, modified_at)
+                VALUES (:unique_id, :name, :file_path, :settings,
+                        (SELECT COALESCE(MAX(position), 0) + 1 FROM projects), 'pending',
+                        :engine, :render_type, :blender_path, :priority, :modified_at)
+                ON CONFLICT(unique_id) DO UPDATE SET
+                    name = excluded.name, file_path = excluded.file_path, settings = excluded.settings,
+                    engine = excluded.engine, render_type = excluded.render_type,
+                    blender_path = excluded.blender_path, priority = excluded.priority,
+                    modified_at = excluded.modified_at
+            """, self._project_columns(project))
 
     def update_project(self, project: Project):
-        settings_json = json.dumps(project.settings.to_dict())
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 UPDATE projects
-                SET name = ?, file_path = ?, settings = ?
-                WHERE unique_id = ?
-            """, (project.name, project.file_path, settings_json, project.unique_id))
-            conn.commit()
+                SET name = :name, file_path = :file_path, settings = :settings, engine = :engine,
+                    render_type = :render_type, blender_path = :blender_path, priority = :priority,
+                    modified_at = :modified_at
+                WHERE unique_id = :unique_id
+            """, self._project_columns(project))
+
+    def set_project_status(self, unique_id: str, status: str):
+        """Запрошенная отмена (cancelling) не перезаписывается статусами queued и running."""
+        if status not in PROJECT_STATUSES:
+            raise ValueError(f"Unknown project status: {status}")
+        with self.transaction() as cursor:
+            cursor.execute("""
+                UPDATE projects SET status = ?, modified_at = ?
+                WHERE unique_id = ? AND NOT (status = 'cancelling' AND ? IN ('queued', 'running'))
+            """, (status, time.time(), unique_id, status))
 
-    def load_projects(self) -> list:
+    def swap_positions(self, first_id: str, second_id: str):
+        """Меняет местами два проекта в очереди, обновляя только их позиции."""
+        with self.transaction() as cursor:
+            # Позиции читаются до обновления: подзапрос в UPDATE увидел бы уже измененную первую строку
+            positions = dict(cursor.execute("SELECT unique_id, position FROM projects WHERE unique_id IN (?, ?)",
+                                            (first_id, second_id)).fetchall())
+            if len(positions) != 2:
+                return
+            cursor.executemany("UPDATE projects SET position = ? WHERE unique_id = ?",
+                               [(positions[second_id], first_id), (positions[first_id], second_id)])
+
+    @staticmethod
+    def _project_filter(status=None, engine=None, render_type=None, blender_path=None):
+        conditions, params = [], []
+        for column, value in (("status", status), ("engine", engine),
+                              ("render_type", render_type), ("blender_path", blender_path)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+    def count_projects(self, status: str = None, engine: str = None, render_type: str = None,
+                       blender_path: str = None) -> int:
+        where, params = self._project_filter(status, engine, render_type, blender_path)
+        return self._execute(f"SELECT COUNT(*) FROM projects {where}", params).fetchone()[0]
+
+    def get_queue(self, status: str = None, engine: str = None, render_type: str = None,
+                  blender_path: str = None, limit: int = None, offset: int = 0, by_priority: bool = False) -> list:
+        """Строки очереди без разбора настроек: id, имя, путь, статус и индексированные колонки.
+
+        by_priority - сначала проекты с большим приоритетом (порядок, в котором их забирает демон).
+        """
+        where, params = self._project_filter(status, engine, render_type, blender_path)
+        cursor = self._connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"""
+            SELECT unique_id, name, file_path, status, engine, render_type, blender_path, priority,
+                   position, modified_at
+            FROM projects
+            {where}
+            ORDER BY {"priority DESC, position" if by_priority else "position"}
+            LIMIT ? OFFSET ?
+        """, (*params, -1 if limit is None else limit, offset))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_project(self, unique_id: str):
+        row = self._execute("SELECT unique_id, name, file_path, settings FROM projects WHERE unique_id = ?",
+                            (unique_id,)).fetchone()
+        if row is None:
+            return None
+        return Project(unique_id=row[0], name=row[1], file_path=row[2], settings_json=row[3])
+
+    def claim_project(self, unique_id: str, from_status: str = "pending", to_status: str = "queued") -> bool:
+        """Атомарно переводит проект из одного статуса в другой; False, если его уже забрал другой процесс."""
+        with self.transaction() as cursor:
+            cursor.execute("UPDATE projects SET status = ?, modified_at = ? WHERE unique_id = ? AND status = ?",
+                           (to_status, time.time(), unique_id, from_status))
+            return cursor.rowcount == 1
+
+    def reset_stale_projects(self, statuses=("queued", "running")) -> int:
+        """Возвращает в pending задания, оставшиеся от аварийно завершенного процесса."""
+        with self.transaction() as cursor:
+            cursor.execute(f"""
+                UPDATE projects SET status = 'pending', modified_at = ?
+                WHERE status IN ({", ".join("?" for _ in statuses)})
+            """, (time.time(), *statuses))
+            return cursor.rowcount
+
+    def load_projects(self, status: str = None, engine: str = None, render_type: str = None,
+                      blender_path: str = None, limit: int = None, offset: int = 0) -> list:
+        """Проекты в порядке очереди, с необязательными фильтрами по индексированным колонкам и страницей."""
+        where, params = self._project_filter(status, engine, render_type, blender_path)
         projects = []
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT unique_id, name, file_path, settings FROM projects")
-            for row in cursor.fetchall():
-                unique_id, name, file_path, settings_json = row
-                settings_dict = json.loads(settings_json)
-                settings = Settings.from_dict(settings_dict)
-                project = Project(unique_id=unique_id, name=name, file_path=file_path, settings=settings)
-                projects.append(project)
+        cursor = self._execute(f"""
+            SELECT unique_id, name, file_path, settings FROM projects
+            {where}
+            ORDER BY position
+            LIMIT ? OFFSET ?
+        """, (*params, -1 if limit is None else limit, offset))
+        for unique_id, name, file_path, settings_json in cursor.fetchall():
+            # Настройки разбираются при первом обращении к project.settings
+            projects.append(Project(unique_id=unique_id, name=name, file_path=file_path,
+                                    settings_json=settings_json))
         return projects
 
+    def get_project_status(self, unique_id: str):
+        row = self._execute("SELECT status FROM projects WHERE unique_id = ?", (unique_id,)).fetchone()
+        return row[0] if row else None
+
     def delete_project(self, unique_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("DELETE FROM projects WHERE unique_id = ?", (unique_id,))
-            conn.commit()
 
-    def save_thumbnail(self, unique_id: str, thumbnail_data: bytes):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+    def set_thumbnail_key(self, unique_id: str, cache_key: str):
+        with self.transaction() as cursor:
             cursor.execute("""
-                INSERT OR REPLACE INTO thumbnails (unique_id, thumbnail)
-                VALUES (?, ?)
-            """, (unique_id, thumbnail_data))
-            conn.commit()
+                INSERT OR REPLACE INTO thumbnails (unique_id, thumbnail, cache_key)
+                VALUES (?, NULL, ?)
+            """, (unique_id, cache_key))
+
+    def get_thumbnail_key(self, unique_id: str) -> str:
+        result = self._execute("SELECT cache_key FROM thumbnails WHERE unique_id = ?", (unique_id,)).fetchone()
+        return result[0] if result else None
+
+    def get_legacy_thumbnails(self) -> list:
+        return self._execute("SELECT unique_id, thumbnail FROM thumbnails WHERE thumbnail IS NOT NULL").fetchall()
+
+    def vacuum(self):
+        self._execute("VACUUM")
+
+    def add_cache_entry(self, cache_key: str, file_name: str, size: int, last_access: float):
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO thumbnail_cache (cache_key, file_name, size, last_access)
+                VALUES (?, ?, ?, ?)
+            """, (cache_key, file_name, size, last_access))
+
+    def get_cache_entry(self, cache_key: str):
+        return self._execute(
+            "SELECT file_name, size FROM thumbnail_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+
+    def touch_cache_entry(self, cache_key: str, last_access: float):
+        with self.transaction() as cursor:
+            cursor.execute("UPDATE thumbnail_cache SET last_access = ? WHERE cache_key = ?", (last_access, cache_key))
+
+    def delete_cache_entry(self, cache_key: str):
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM thumbnail_cache WHERE cache_key = ?", (cache_key,))
+
+    def get_cache_total_size(self) -> int:
+        return self._execute("SELECT COALESCE(SUM(size), 0) FROM thumbnail_cache").fetchone()[0]
 
-    def get_thumbnail(self, unique_id: str) -> bytes:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT thumbnail FROM thumbnails WHERE unique_id = ?", (unique_id,))
-            result = cursor.fetchone()
-            return result[0] if result else None
+    def get_cache_entries_lru(self, limit: int) -> list:
+        return self._execute(
+            "SELECT cache_key, file_name, size FROM thumbnail_cache ORDER BY last_access LIMIT ?", (limit,)
+        ).fetchall()
 
     def delete_thumbnail(self, unique_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("DELETE FROM thumbnails WHERE unique_id = ?", (unique_id,))
-            conn.commit()
 
     def add_blender_path(self, path: str, version: str):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
-                INSERT OR REPLACE INTO blender_paths (path, version)
+                INSERT INTO blender_paths (path, version)
                 VALUES (?, ?)
+                ON CONFLICT(path) DO UPDATE SET version = excluded.version
             """, (path, version))
-            conn.commit()
+
+    def save_blender_info(self, path: str, info: dict):
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO blender_paths (path, version, mtime, size, engines, gpu_backends)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (path, info["version"], info["mtime"], info["size"],
+                  json.dumps(info["engines"]), json.dumps(info["gpu_backends"])))
+
+    def get_blender_infos(self) -> dict:
+        infos = {}
+        cursor = self._execute("SELECT path, version, mtime, size, engines, gpu_backends FROM blender_paths")
+        for path, version, mtime, size, engines, gpu_backends in cursor.fetchall():
+            infos[path] = {
+                "version": version,
+                "mtime": mtime,
+                "size": size,
+                "engines": json.loads(engines) if engines else [],
+                "gpu_backends": json.loads(gpu_backends) if gpu_backends else []
+            }
+        return infos
 
     def get_blender_paths(self) -> dict:
         paths = {}
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT path, version FROM blender_paths")
-            for row in cursor.fetchall():
-                paths[row[0]] = row[1]
+        for row in self._execute("SELECT path, version FROM blender_paths").fetchall():
+            paths[row[0]] = row[1]
         return paths
+
+    def get_cached_probe(self, path: str, mtime: float, size: int) -> dict:
+        result = self._execute(
+            "SELECT settings FROM probe_cache WHERE path = ? AND mtime = ? AND size = ?",
+            (path, mtime, size)
+        ).fetchone()
+        return json.loads(result[0]) if result else None
+
+    def save_probe(self, path: str, mtime: float, size: int, settings: dict):
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO probe_cache (path, mtime, size, settings)
+                VALUES (?, ?, ?, ?)
+            """, (path, mtime, size, json.dumps(settings)))
+
+    def get_cached_scene_stats(self, path: str, mtime: float, size: int) -> dict:
+        result = self._execute(
+            "SELECT stats FROM scene_stats WHERE path = ? AND mtime = ? AND size = ?",
+            (path, mtime, size)
+        ).fetchone()
+        return json.loads(result[0]) if result else None
+
+    def save_scene_stats(self, path: str, mtime: float, size: int, stats: dict):
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO scene_stats (path, mtime, size, stats)
+                VALUES (?, ?, ?, ?)
+            """, (path, mtime, size, json.dumps(stats)))
+
+    def add_render_history(self, record: dict, frames: list, telemetry: list = ()) -> int:
+        """Сохраняет запуск рендера; telemetry - ряд ResourceSample, пиковые значения берутся из record."""
+        record = {**dict.fromkeys(TELEMETRY_COLUMNS), **record}
+        with self.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO render_history (
+                    unique_id, file_path, settings_key, blender_version, engine, samples,
+                    resolution_x, resolution_y, resolution_scale, device, threads, frame_count,
+                    started_at, wall_time, peak_memory, success,
+                    peak_rss, peak_cpu, avg_cpu, io_read, io_write, max_threads
+                ) VALUES (
+                    :unique_id, :file_path, :settings_key, :blender_version, :engine, :samples,
+                    :resolution_x, :resolution_y, :resolution_scale, :device, :threads, :frame_count,
+                    :started_at, :wall_time, :peak_memory, :success,
+                    :peak_rss, :peak_cpu, :avg_cpu, :io_read, :io_write, :max_threads
+                )
+            """, record)
+            history_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO render_history_frames (history_id, frame, render_time, peak_memory)
+                VALUES (?, ?, ?, ?)
+            """, [(history_id, frame, render_time, peak_memory) for frame, render_time, peak_memory in frames])
+            cursor.executemany("""
+                INSERT INTO render_telemetry (history_id, time, cpu, rss, io_read, io_write, threads)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(history_id, sample.time, sample.cpu, sample.rss, sample.io_read, sample.io_write, sample.threads)
+                  for sample in telemetry])
+            return history_id
+
+    def get_last_render(self, unique_id: str):
+        """Последний запуск рендера проекта (с пиковыми ресурсами) или None."""
+        cursor = self._connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT * FROM render_history WHERE unique_id = ? ORDER BY started_at DESC LIMIT 1",
+                       (unique_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def get_render_telemetry(self, history_id: int) -> list:
+        """Ряд замеров запуска: (time, cpu, rss, io_read, io_write, threads)."""
+        return self._execute(
+            "SELECT time, cpu, rss, io_read, io_write, threads FROM render_telemetry WHERE history_id = ? ORDER BY time",
+            (history_id,)
+        ).fetchall()
+
+    def get_render_history(self, file_path: str = None, settings_key: str = None,
+                           engine: str = None, device: str = None, limit: int = 20) -> list:
+        conditions, params = ["success = 1", "frame_count > 0"], []
+        for column, value in (("file_path", file_path), ("settings_key", settings_key),
+                              ("engine", engine), ("device", device)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        cursor = self._connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"""
+            SELECT * FROM render_history
+            WHERE {" AND ".join(conditions)}
+            ORDER BY started_at DESC
+            LIMIT ?
+        """, (*params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_render_history_frames(self, history_id: int) -> list:
+        return self._execute(
+            "SELECT frame, render_time, peak_memory FROM render_history_frames WHERE history_id = ? ORDER BY frame",
+            (history_id,)
+        ).fetchall()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.logger_config import setup_logger
+
+logger = setup_logger('ThumbnailCache')
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ThumbnailCache:
+    """Кэш превью на диске с адресацией по содержимому и вытеснением LRU.
+
+    Ключ - хэш содержимого .blend и настроек, влияющих на превью, поэтому
+    повторный предпросмотр неизмененного проекта не запускает Blender.
+    В базе хранится только индекс: ключ, имя файла, размер и время доступа.
+    """
+
+    def __init__(self, db_manager, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_manager = db_manager
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._migrate_legacy()
+
+    def content_hash(self, file_path):
+        stat = os.stat(file_path)
+        memo_key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+        digest = self._hashes.get(memo_key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._hashes[memo_key] = digest
+        return digest
+
+    def key_for(self, project, preview_size):
+        settings = project.settings
+        preview_settings = json.dumps({
+            "render_engine": settings.render_engine,
+            "cycles_denoising": settings.cycles_denoising,
+            "cycles_device": settings.cycles_device,
+            "blender_path": settings.blender_path,
+            "preview_size": list(preview_size),
+        }, sort_keys=True)
+        content = self.content_hash(project.file_path)
+        return hashlib.sha256(f"{content}:{preview_settings}".encode("utf-8")).hexdigest()
+
+    def _path_for(self, file_name):
+        return self.cache_dir / file_name[:2] / file_name
+
+    def get(self, cache_key):
+        entry = self.db_manager.get_cache_entry(cache_key)
+        if entry is None:
+            return None
+        try:
+            data = self._path_for(entry[0]).read_bytes()
+        except OSError:
+            self.db_manager.delete_cache_entry(cache_key)
+            return None
+        self.db_manager.touch_cache_entry(cache_key, time.time())
+        return data
+
+    def get_for_project(self, unique_id):
+        cache_key = self.db_manager.get_thumbnail_key(unique_id)
+        return self.get(cache_key) if cache_key else None
+
+    def link(self, unique_id, cache_key):
+        self.db_manager.set_thumbnail_key(unique_id, cache_key)
+
+    def put(self, cache_key, data, unique_id=None):
+        file_name = f"{cache_key}.img"
+        path = self._path_for(file_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+        with self._lock, self.db_manager.transaction():
+            self.db_manager.add_cache_entry(cache_key, file_name, len(data), time.time())
+            if unique_id:
+                self.link(unique_id, cache_key)
+            self._evict()
+
+    def _evict(self):
+        excess = self.db_manager.get_cache_total_size() - self.max_bytes
+        while excess > 0:
+            entries = self.db_manager.get_cache_entries_lru(64)
+            if not entries:
+                break
+            for cache_key, file_name, size in entries:
+                try:
+                    self._path_for(file_name).unlink()
+                except FileNotFoundError:
+                    pass
+                self.db_manager.delete_cache_entry(cache_key)
+                excess -= size
+                logger.info(f"Evicted thumbnail {cache_key[:12]} ({size} bytes)")
+                if excess <= 0:
+                    break
+
+    def _migrate_legacy(self):
+        legacy = self.db_manager.get_legacy_thumbnails()
+        if not legacy:
+            return
+        with self.db_manager.transaction():
+            for unique_id, data in legacy:
+                self.put(f"legacy-{unique_id}", data, unique_id)
+        self.db_manager.vacuum()
+        logger.info(f"Moved {len(legacy)} thumbnails from the database to {self.cache_dir}")
@@ -0,0 +1,54 @@
+import threading
+
+from src.logger_config import setup_logger
+
+logger = setup_logger('Events')
+
+
+class BoundSignal:
+    """Список обработчиков одного события конкретного объекта."""
+
+    def __init__(self, name):
+        self.name = name
+        self._handlers = []
+        self._lock = threading.Lock()
+
+    def connect(self, handler):
+        with self._lock:
+            self._handlers.append(handler)
+
+    def disconnect(self, handler):
+        with self._lock:
+            self._handlers.remove(handler)
+
+    def emit(self, *args):
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            try:
+                handler(*args)
+            except Exception as e:
+                logger.exception(f"Handler of {self.name} failed: {str(e)}")
+
+
+class Signal:
+    """Событие без Qt с интерфейсом connect/emit как у pyqtSignal.
+
+    Обработчики вызываются синхронно в потоке, вызвавшем emit. Интерфейс сам
+    переносит вызовы в свой поток (см. src.ui.qt_bridge).
+    """
+
+    def __init__(self, *types):
+        self.types = types
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        bound = instance.__dict__.get(self.name)
+        if bound is None:
+            bound = instance.__dict__.setdefault(self.name, BoundSignal(f"{owner.__name__}.{self.name}"))
+        return bound
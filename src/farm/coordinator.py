@@ -0,0 +1,378 @@
+import hmac
+import itertools
+import math
+import secrets
+import socketserver
+import threading
+import time
+
+from src.events import Signal
+from src.farm.protocol import Connection, FarmError, DEFAULT_PORT, PROTOCOL_VERSION
+from src.logger_config import setup_logger
+
+logger = setup_logger('FarmCoordinator')
+
+LEASE_TIMEOUT = 30.0  # секунды без heartbeat, после которых кадры отдаются другому агенту
+HEARTBEAT_INTERVAL = 5.0
+IDLE_RETRY = 2.0
+BASE_CHUNK_FRAMES = 4
+MAX_CHUNK_FRAMES = 64
+MAX_FRAME_ATTEMPTS = 3
+RATE_SMOOTHING = 0.3  # вес последней аренды в скользящей оценке скорости агента
+
+
+class FarmJob:
+    """Проект из базы, разобранный на кадры, которые раздаются агентам."""
+
+    def __init__(self, project):
+        self.project = project
+        settings = project.settings
+        if settings.render_type == "Image":
+            self.step = 1
+            self.frames_left = [settings.frame_current]
+        else:
+            self.step = max(1, settings.frame_step)
+            self.frames_left = list(range(settings.frame_start, settings.frame_end + 1, self.step))
+        self.frame_total = len(self.frames_left)
+        self.frames_done = {}  # frame -> путь к файлу
+        self.attempts = {}
+        self.leases = set()
+        self.started = False
+        self.error = ""
+
+    @property
+    def unique_id(self):
+        return self.project.unique_id
+
+    def take_frames(self, count):
+        """Забирает до count подряд идущих кадров (с учетом шага), чтобы аренда была одним диапазоном."""
+        frames = self.frames_left[:1]
+        for frame in self.frames_left[1:count]:
+            if frame != frames[-1] + self.step:
+                break
+            frames.append(frame)
+        del self.frames_left[:len(frames)]
+        return frames
+
+    def return_frames(self, frames):
+        self.frames_left = sorted(set(self.frames_left).union(frames))
+
+    def is_finished(self):
+        return not self.frames_left and not self.leases
+
+
+class Lease:
+    def __init__(self, lease_id, job, worker, frames, timeout):
+        self.lease_id = lease_id
+        self.job = job
+        self.worker = worker
+        self.frames = frames
+        self.done = set()
+        self.started = time.monotonic()
+        self.expires = self.started + timeout
+
+    def remaining(self):
+        return [frame for frame in self.frames if frame not in self.done]
+
+
+class WorkerStats:
+    def __init__(self, name, address, threads):
+        self.name = name
+        self.address = address
+        self.threads = threads
+        self.rate = 0.0  # кадров в секунду, скользящая оценка
+        self.frames = 0
+        self.connected = True
+        self.last_seen = time.monotonic()
+
+
+class FarmCoordinator:
+    """Раздает кадры проектов из базы агентам по TCP с арендой и heartbeat.
+
+    Агент просит аренду, получает непрерывный диапазон кадров и продлевает аренду
+    heartbeat-сообщениями. Если аренда истекла или агент отключился, неотрендеренные
+    кадры возвращаются в очередь. Размер диапазона зависит от измеренной скорости агента.
+    Видеоформаты не раздаются: их собирает локальный рендер.
+    """
+    worker_joined = Signal(str)  # worker
+    worker_left = Signal(str)  # worker
+    lease_granted = Signal(str, str, object)  # worker, unique_id, frames
+    lease_expired = Signal(str, str, object)  # worker, unique_id, frames
+    frame_done = Signal(str, int, str)  # unique_id, frame, worker
+    job_finished = Signal(str, bool, str)  # unique_id, success, message
+
+    def __init__(self, db_manager, host="0.0.0.0", port=DEFAULT_PORT, token=None,
+                 lease_timeout=LEASE_TIMEOUT, base_chunk=BASE_CHUNK_FRAMES):
+        self.db_manager = db_manager
+        self.host = host
+        self.port = port
+        self.token = token or secrets.token_hex(16)
+        self.lease_timeout = lease_timeout
+        self.base_chunk = max(1, base_chunk)
+        self.workers = {}
+        self._jobs = {}  # unique_id -> FarmJob, в порядке очереди
+        self._leases = {}
+        self._lease_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._server = None
+        self._threads = []
+
+    # Сеть
+
+    def start(self):
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._serve(Connection(self.request), self.client_address)
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self._server = Server((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._reap_leases, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Farm coordinator listening on {self.host}:{self.port}")
+
+    def stop(self):
+        """Останавливает сервер и возвращает незавершенные проекты в pending."""
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            self._leases.clear()
+        for job in jobs:
+            self.db_manager.set_project_status(job.unique_id, "pending")
+        logger.info(f"Farm coordinator stopped, {len(jobs)} unfinished jobs returned to the queue")
+
+    def _serve(self, conn, address):
+        worker = None
+        try:
+            hello = conn.receive()
+            if hello.get("type") != "hello" or not hmac.compare_digest(str(hello.get("token", "")), self.token):
+                conn.send({"ok": False, "error": "authentication failed"})
+                logger.warning(f"Rejected farm worker from {address[0]}")
+                return
+            if hello.get("version") != PROTOCOL_VERSION:
+                conn.send({"ok": False, "error": f"protocol version {PROTOCOL_VERSION} required"})
+                return
+            worker = self._register_worker(hello.get("worker") or f"{address[0]}:{address[1]}", address,
+                                           hello.get("threads", 0))
+            conn.send({"ok": True, "worker": worker.name, "heartbeat": HEARTBEAT_INTERVAL,
+                       "lease_timeout": self.lease_timeout})
+            while not self._stop.is_set():
+                message = conn.receive()
+                worker.last_seen = time.monotonic()
+                conn.send(self._handle(worker, message))
+        except FarmError as e:
+            if worker:
+                logger.info(f"Farm worker {worker.name} disconnected: {str(e)}")
+        finally:
+            conn.close()
+            if worker:
+                self._unregister_worker(worker)
+
+    def _handle(self, worker, message):
+        handlers = {
+            "lease": self._handle_lease,
+            "heartbeat": self._handle_heartbeat,
+            "frame": self._handle_frame,
+            "done": self._handle_done,
+        }
+        handler = handlers.get(message.get("type"))
+        if handler is None:
+            return {"ok": False, "error": f"unknown message type: {message.get('type')}"}
+        return handler(worker, message)
+
+    def _register_worker(self, name, address, threads):
+        with self._lock:
+            base, suffix = name, 2
+            while name in self.workers and self.workers[name].connected:
+                name, suffix = f"{base}-{suffix}", suffix + 1
+            stats = self.workers.get(name) or WorkerStats(name, address, threads)
+            stats.connected, stats.address, stats.threads = True, address, threads
+            self.workers[name] = stats
+        logger.info(f"Farm worker {name} joined from {address[0]}")
+        self.worker_joined.emit(name)
+        return stats
+
+    def _unregister_worker(self, worker):
+        with self._lock:
+            worker.connected = False
+            leases = [lease for lease in self._leases.values() if lease.worker is worker]
+        for lease in leases:
+            self._release_lease(lease, "worker disconnected")
+        self.worker_left.emit(worker.name)
+
+    # Аренды
+
+    def _chunk_size(self, worker, frames_left):
+        with self._lock:
+            rates = [w.rate for w in self.workers.values() if w.connected and w.rate > 0]
+            connected = sum(1 for w in self.workers.values() if w.connected)
+        size = self.base_chunk
+        if worker.rate > 0 and rates:
+            size = round(self.base_chunk * worker.rate / (sum(rates) / len(rates)))
+        # Не отдавать одному агенту больше своей доли хвоста очереди
+        size = min(size, math.ceil(frames_left / max(1, connected)))
+        return max(1, min(MAX_CHUNK_FRAMES, size))
+
+    def _claim_jobs(self):
+        for row in self.db_manager.get_queue(status="pending", limit=8):
+            project = self.db_manager.get_project(row["unique_id"])
+            if project is None or project.settings.file_format in project.settings.file_formats_movie:
+                continue
+            if not self.db_manager.claim_project(project.unique_id):
+                continue
+            job = FarmJob(project)
+            with self._lock:
+                self._jobs[job.unique_id] = job
+            logger.info(f"Farm job {project.name}: {job.frame_total} frames")
+            return True
+        return False
+
+    def _next_job(self):
+        with self._lock:
+            return next((job for job in self._jobs.values() if job.frames_left), None)
+
+    def _handle_lease(self, worker, message):
+        job = self._next_job()
+        if job is None and self._claim_jobs():
+            job = self._next_job()
+        if job is None:
+            return {"ok": True, "lease": None, "retry": IDLE_RETRY}
+        count = self._chunk_size(worker, sum(len(j.frames_left) for j in list(self._jobs.values())))
+        with self._lock:
+            frames = job.take_frames(count)
+            if not frames:
+                return {"ok": True, "lease": None, "retry": IDLE_RETRY}
+            lease = Lease(next(self._lease_ids), job, worker, frames, self.lease_timeout)
+            self._leases[lease.lease_id] = lease
+            job.leases.add(lease.lease_id)
+            first_lease = not job.started
+            job.started = True
+        if first_lease:
+            self.db_manager.set_project_status(job.unique_id, "running")
+        self.lease_granted.emit(worker.name, job.unique_id, frames)
+        project = job.project
+        return {"ok": True, "lease": {
+            "lease_id": lease.lease_id,
+            "project": {
+                "unique_id": project.unique_id,
+                "name": project.name,
+                "file_path": project.file_path,
+                "settings": project.settings.to_dict(),
+            },
+            "frames": frames,
+            "start": frames[0],
+            "end": frames[-1],
+            "step": job.step,
+            "lease_timeout": self.lease_timeout,
+        }}
+
+    def _active_lease(self, worker, message):
+        with self._lock:
+            lease = self._leases.get(message.get("lease_id"))
+        return lease if lease is not None and lease.worker is worker else None
+
+    def _handle_heartbeat(self, worker, message):
+        lease = self._active_lease(worker, message)
+        if lease is None:
+            return {"ok": False, "error": "lease lost"}
+        lease.expires = time.monotonic() + self.lease_timeout
+        return {"ok": True}
+
+    def _handle_frame(self, worker, message):
+        lease = self._active_lease(worker, message)
+        if lease is None:
+            return {"ok": False, "error": "lease lost"}
+        frame = message.get("frame")
+        lease.expires = time.monotonic() + self.lease_timeout
+        if frame not in lease.frames:
+            return {"ok": False, "error": f"frame {frame} is not part of the lease"}
+        with self._lock:
+            lease.done.add(frame)
+            lease.job.frames_done[frame] = message.get("path", "")
+        self.frame_done.emit(lease.job.unique_id, frame, worker.name)
+        return {"ok": True}
+
+    def _handle_done(self, worker, message):
+        lease = self._active_lease(worker, message)
+        if lease is None:
+            return {"ok": False, "error": "lease lost"}
+        if message.get("success"):
+            # Blender завершился успешно: кадры без строки Saved считаются готовыми
+            for frame in lease.remaining():
+                lease.done.add(frame)
+                lease.job.frames_done.setdefault(frame, "")
+            elapsed = max(1e-3, time.monotonic() - lease.started)
+            with self._lock:
+                rate = len(lease.frames) / elapsed
+                worker.rate = rate if worker.rate == 0 else (
+                    RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * worker.rate)
+                worker.frames += len(lease.frames)
+            self._release_lease(lease)
+        else:
+            self._release_lease(lease, message.get("message") or "render failed")
+        return {"ok": True}
+
+    def _release_lease(self, lease, error=None):
+        """Закрывает аренду; при ошибке неготовые кадры возвращаются в очередь задания."""
+        job = lease.job
+        with self._lock:
+            if self._leases.pop(lease.lease_id, None) is None:
+                return
+            job.leases.discard(lease.lease_id)
+            remaining = lease.remaining()
+            if error and remaining and not job.error:
+                exhausted = []
+                for frame in remaining:
+                    job.attempts[frame] = job.attempts.get(frame, 0) + 1
+                    if job.attempts[frame] >= MAX_FRAME_ATTEMPTS:
+                        exhausted.append(frame)
+                if exhausted:
+                    job.error = f"кадр {exhausted[0]} не отрендерен за {MAX_FRAME_ATTEMPTS} попытки: {error}"
+                    job.frames_left = []
+                else:
+                    job.return_frames(remaining)
+            finished = job.is_finished() and self._jobs.pop(job.unique_id, None) is not None
+        if error and remaining:
+            logger.warning(f"Lease {lease.lease_id} of {lease.worker.name} for {job.project.name} "
+                           f"returned {len(remaining)} frames: {error}")
+            self.lease_expired.emit(lease.worker.name, job.unique_id, remaining)
+        if finished:
+            self._finish_job(job)
+
+    def _finish_job(self, job):
+        success = not job.error
+        message = job.error or f"Отрендерено кадров: {len(job.frames_done)}"
+        self.db_manager.set_project_status(job.unique_id, "done" if success else "failed")
+        logger.info(f"Farm job {job.project.name} finished: {message}")
+        self.job_finished.emit(job.unique_id, success, message)
+
+    def _reap_leases(self):
+        while not self._stop.wait(1.0):
+            now = time.monotonic()
+            with self._lock:
+                expired = [lease for lease in self._leases.values() if lease.expires < now]
+            for lease in expired:
+                self._release_lease(lease, "lease expired")
+
+    def status(self):
+        with self._lock:
+            return {
+                "jobs": {job.unique_id: {"done": len(job.frames_done), "total": job.frame_total,
+                                         "leases": len(job.leases)} for job in self._jobs.values()},
+                "workers": {w.name: {"connected": w.connected, "rate": round(w.rate, 3), "frames": w.frames}
+                            for w in self.workers.values()},
+            }
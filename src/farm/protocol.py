@@ -0,0 +1,61 @@
+import json
+import socket
+import threading
+
+DEFAULT_PORT = 7821
+CONNECT_TIMEOUT = 10.0
+PROTOCOL_VERSION = 1
+
+
+class FarmError(Exception):
+    pass
+
+
+class Connection:
+    """JSON-сообщения по TCP, по одному на строку.
+
+    request() отправляет сообщение и ждет ответа под блокировкой, поэтому
+    одно соединение можно использовать из нескольких потоков (рендер и heartbeat).
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile("r", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        try:
+            self.sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        except OSError as e:
+            raise FarmError(f"Connection lost: {str(e)}")
+
+    def receive(self):
+        try:
+            line = self.reader.readline()
+        except (OSError, ValueError) as e:
+            raise FarmError(f"Connection lost: {str(e)}")
+        if not line:
+            raise FarmError("Connection closed")
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise FarmError(f"Malformed message: {str(e)}")
+
+    def request(self, message):
+        with self._lock:
+            self.send(message)
+            return self.receive()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.reader.close()
+        self.sock.close()
+
+
+def connect(host, port, timeout=CONNECT_TIMEOUT):
+    sock = socket.create_connection((host, port), timeout=timeout)
+    sock.settimeout(None)
+    return Connection(sock)
@@ -0,0 +1,168 @@
+import os
+import socket
+import subprocess
+import threading
+from pathlib import Path
+
+from src.blender.blender_manager import BlenderManager
+from src.blender.cpu_allocator import lower_priority
+from src.events import Signal
+from src.farm.protocol import FarmError, DEFAULT_PORT, PROTOCOL_VERSION, connect
+from src.models.project import Project, Settings
+from src.logger_config import setup_logger
+
+logger = setup_logger('FarmWorker')
+
+RECONNECT_DELAY = 5.0
+
+
+def map_path(path, path_map):
+    """Заменяет префикс пути координатора на локальный (общие диски смонтированы по-разному)."""
+    for remote, local in path_map:
+        if path == remote or path.startswith(remote.rstrip("/\\") + "/") or path.startswith(remote.rstrip("/\\") + "\\"):
+            return local + path[len(remote):]
+    return path
+
+
+class FarmWorker:
+    """Агент фермы: берет у координатора аренды кадров и рендерит их локальным Blender.
+
+    Пока идет рендер, отдельный поток продлевает аренду. Если координатор ответил,
+    что аренда потеряна, процесс Blender завершается, а кадры уже отданы другому агенту.
+    """
+    lease_started = Signal(str, object)  # unique_id, frames
+    frame_rendered = Signal(str, int, str)  # unique_id, frame, path
+    lease_finished = Signal(str, bool, str)  # unique_id, success, message
+    connection_changed = Signal(bool, str)  # connected, message
+
+    def __init__(self, host, port=DEFAULT_PORT, token="", blender_path=None, blender_paths=None,
+                 name=None, threads=None, path_map=None, output_dir=None, background=True):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.name = name or socket.gethostname()
+        self.threads = threads
+        self.path_map = list(path_map or [])
+        self.output_dir = output_dir
+        self.background = background
+        self.blender_manager = BlenderManager(blender_paths=blender_paths, use_warm_workers=False, discover=False)
+        self.blender_path = blender_path or self.blender_manager.blender_executable
+        self._stop = threading.Event()
+        self._process = None
+
+    def stop(self):
+        self._stop.set()
+        self._kill_process()
+
+    def _kill_process(self):
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def run(self):
+        """Работает до stop(): при обрыве связи переподключается через RECONNECT_DELAY."""
+        while not self._stop.is_set():
+            try:
+                conn = connect(self.host, self.port)
+            except OSError as e:
+                self.connection_changed.emit(False, f"Connection failed: {str(e)}")
+                self._stop.wait(RECONNECT_DELAY)
+                continue
+            try:
+                self._session(conn)
+            except FarmError as e:
+                self.connection_changed.emit(False, str(e))
+            finally:
+                conn.close()
+            self._stop.wait(RECONNECT_DELAY)
+        self.blender_manager.shutdown()
+
+    def _session(self, conn):
+        welcome = conn.request({"type": "hello", "version": PROTOCOL_VERSION, "token": self.token,
+                                "worker": self.name, "threads": self.threads or os.cpu_count() or 1})
+        if not welcome.get("ok"):
+            # Неверный токен или версия: повторять бессмысленно
+            self._stop.set()
+            raise FarmError(welcome.get("error", "rejected by coordinator"))
+        self.name = welcome.get("worker", self.name)
+        self.connection_changed.emit(True, f"Connected to {self.host}:{self.port} as {self.name}")
+        heartbeat = welcome.get("heartbeat", 5.0)
+        while not self._stop.is_set():
+            reply = conn.request({"type": "lease"})
+            lease = reply.get("lease")
+            if lease is None:
+                self._stop.wait(reply.get("retry", heartbeat))
+                continue
+            self._render_lease(conn, lease, heartbeat)
+
+    def _lease_project(self, lease):
+        data = lease["project"]
+        settings = Settings.from_dict(data["settings"])
+        settings.blender_path = self.blender_path or settings.blender_path
+        settings.output_path = str(Path(self.output_dir or map_path(settings.output_path, self.path_map)))
+        return Project(unique_id=data["unique_id"], name=data["name"],
+                       file_path=map_path(data["file_path"], self.path_map), settings=settings)
+
+    def _render_lease(self, conn, lease, heartbeat):
+        lease_id = lease["lease_id"]
+        frames = set(lease["frames"])
+        project = self._lease_project(lease)
+        lost = threading.Event()
+        finished = threading.Event()
+        reported = set()
+        self.lease_started.emit(project.unique_id, lease["frames"])
+
+        def keep_alive():
+            while not finished.wait(heartbeat):
+                try:
+                    alive = conn.request({"type": "heartbeat", "lease_id": lease_id}).get("ok")
+                except FarmError:
+                    alive = False
+                if not alive:
+                    lost.set()
+                    self._kill_process()
+                    return
+
+        def on_progress(progress):
+            if not progress.saved_path or progress.frame not in frames or progress.frame in reported:
+                return
+            reported.add(progress.frame)
+            self.frame_rendered.emit(project.unique_id, progress.frame, progress.saved_path)
+            if not conn.request({"type": "frame", "lease_id": lease_id, "frame": progress.frame,
+                                 "path": progress.saved_path}).get("ok"):
+                lost.set()
+                self._kill_process()
+
+        def on_process(process):
+            self._process = process
+            if self.background:
+                lower_priority(process.pid)
+
+        threading.Thread(target=keep_alive, daemon=True).start()
+        success, message = False, ""
+        try:
+            if not project.settings.blender_path or not os.path.exists(project.settings.blender_path):
+                message = f"Blender не найден: {project.settings.blender_path}"
+            elif not os.path.exists(project.file_path):
+                message = f"Файл проекта не найден: {project.file_path}"
+            else:
+                command = self.blender_manager.build_render_command(
+                    project, self.threads, frame_range=(lease["start"], lease["end"]))
+                self.blender_manager.run_blender_process(command, project.unique_id, on_progress, on_process)
+                success, message = True, f"Кадры {lease['start']}-{lease['end']} отрендерены"
+        except subprocess.CalledProcessError as e:
+            message = f"Blender завершился с кодом {e.returncode}: {(e.output or '').strip()[-500:]}"
+        except OSError as e:
+            message = f"Ошибка запуска Blender: {str(e)}"
+        finally:
+            finished.set()
+            self._process = None
+
+        if lost.is_set():
+            message = "Аренда потеряна, кадры переданы другому агенту"
+            success = False
+        else:
+            conn.request({"type": "done", "lease_id": lease_id, "success": success, "message": message})
+        if not success:
+            logger.warning(f"Lease {lease_id} for {project.name} failed: {message}")
+        self.lease_finished.emit(project.unique_id, success, message)
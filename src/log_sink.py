@@ -0,0 +1,48 @@
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_CAPACITY = 20000
+
+
+@dataclass(slots=True)
+class LogRecord:
+    seq: int
+    created: float
+    level: int
+    message: str
+    job_id: Optional[str] = None
+
+
+class LogSink:
+    """Буфер сообщений лога, в который можно писать из любого потока.
+
+    Производители только добавляют записи в deque ограниченного размера
+    (append и popleft атомарны), а интерфейс забирает их пачками по таймеру.
+    При переполнении теряются самые старые записи, их число видно в dropped.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._records = deque(maxlen=capacity)
+        self._counter = itertools.count()
+        self._last_seq = -1
+        self.dropped = 0
+
+    def push(self, message, level=logging.INFO, job_id=None):
+        self._records.append(LogRecord(next(self._counter), time.time(), level, str(message), job_id))
+
+    def drain(self, max_records=None):
+        batch = []
+        while max_records is None or len(batch) < max_records:
+            try:
+                batch.append(self._records.popleft())
+            except IndexError:
+                break
+        if batch:
+            # Потоки могут добавить записи не строго в порядке номеров, поэтому оценка приблизительная
+            self.dropped += max(0, batch[0].seq - self._last_seq - 1)
+            self._last_seq = max(self._last_seq, batch[-1].seq)
+        return batch
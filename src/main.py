@@ -40,7 +40,9 @@ def main():
     window = MainWindow(db_manager)
     window.show()
 
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    db_manager.close()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,28 @@
+import hashlib
+import json
 import os
 import uuid
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict
-import psutil
 
-@dataclass
+# Общие для всех экземпляров списки форматов; не изменять на месте
+FILE_FORMATS_IMAGE = ["PNG", "JPEG", "EXR"]
+FILE_FORMATS_MOVIE = ["AVI_JPEG", "AVI_RAW", "FFMPEG"]
+# Приоритет задания в очереди; срочные задания вытесняют (приостанавливают) менее приоритетные
+PRIORITY_LOW = -1
+PRIORITY_NORMAL = 0
+PRIORITY_URGENT = 1
+
+
+@lru_cache(maxsize=None)
+def logical_cpu_count() -> int:
+    # os.cpu_count дает то же число логических ядер, что и psutil, без импорта psutil при старте
+    return os.cpu_count() or 1
+
+
+@dataclass(slots=True)
 class Settings:
     """Модель настроек рендера Blender."""
     resolution_x: int = 1920
@@ -30,10 +47,15 @@ class Settings:
     output_path: str = ""
     output_filename: str = ""  # Новое поле для имени выходного файла
     blender_path: str = ""
+    shard_workers: int = 1  # число параллельных процессов Blender для анимации
+    skip_existing: bool = False  # дорендер: пропускать кадры, уже готовые в папке вывода
+    priority: int = PRIORITY_NORMAL  # больше - раньше в очереди
 
     def __post_init__(self):
-        self.file_formats_image = self.file_formats_image or ["PNG", "JPEG", "EXR"]
-        self.file_formats_movie = self.file_formats_movie or ["AVI_JPEG", "AVI_RAW", "FFMPEG"]
+        if not self.file_formats_image or self.file_formats_image == FILE_FORMATS_IMAGE:
+            self.file_formats_image = FILE_FORMATS_IMAGE
+        if not self.file_formats_movie or self.file_formats_movie == FILE_FORMATS_MOVIE:
+            self.file_formats_movie = FILE_FORMATS_MOVIE
         if self.render_engine not in ["CYCLES", "EEVEE"]:
             raise ValueError("Only 'CYCLES' or 'EEVEE'")
         if self.render_type not in ["Image", "Animation"]:
@@ -49,8 +71,10 @@ class Settings:
             self.output_path = str(Path(self.output_path))
         if self.blender_path:
             self.blender_path = str(Path(self.blender_path))
+        if self.shard_workers < 1:
+            self.shard_workers = 1
         # Автоопределение количества ядер, если threads равно 0 или недопустимо
-        max_threads = psutil.cpu_count(logical=True) or 1
+        max_threads = logical_cpu_count()
         if self.threads <= 0 or self.threads > max_threads:
             self.threads = max_threads
         elif self.threads > max_threads:
@@ -80,28 +104,103 @@ class Settings:
             "file_formats_movie": self.file_formats_movie,
             "output_path": self.output_path,
             "output_filename": self.output_filename,  # Добавляем output_filename
-            "blender_path": self.blender_path
+            "blender_path": self.blender_path,
+            "shard_workers": self.shard_workers,
+            "skip_existing": self.skip_existing,
+            "priority": self.priority
         }
 
+    def render_samples(self) -> int:
+        return self.cycles_samples if self.render_engine == "CYCLES" else self.eevee_samples
+
+    def frame_count(self) -> int:
+        if self.render_type == "Image":
+            return 1
+        return len(range(self.frame_start, self.frame_end + 1, max(1, self.frame_step)))
+
+    def render_key(self) -> str:
+        """Ключ настроек, влияющих на время рендера одного кадра."""
+        signature = json.dumps([
+            self.render_engine, self.render_samples(), self.resolution_x, self.resolution_y,
+            self.resolution_scale, self.cycles_device, self.cycles_denoising
+        ])
+        return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
     @classmethod
     def from_dict(cls, data: Dict) -> "Settings":
         """Создание экземпляра Settings из словаря."""
         return cls(**data)
 
-@dataclass
+    @classmethod
+    def for_blend_file(cls, file_path, probed: Dict = None, default_blender_path: str = ""):
+        """Настройки нового проекта из прочитанных из .blend значений.
+
+        Возвращает (settings, сообщение для лога); при ошибке используются значения по умолчанию.
+        """
+        if not probed:
+            settings = cls(
+                output_path=str(Path(file_path).parent / "output"),
+                output_filename=Path(file_path).stem,  # Устанавливаем имя файла по умолчанию
+                blender_path=default_blender_path
+            )
+            return settings, "Не удалось загрузить настройки, используются значения по умолчанию"
+        try:
+            settings = cls(**probed)
+            message = "Настройки загружены из файла .blend"
+        except ValueError as e:
+            message = f"Некорректные настройки в файле .blend ({str(e)}), используются значения по умолчанию"
+            settings = cls(
+                output_path=probed["output_path"],
+                output_filename=probed["output_filename"],
+                blender_path=probed["blender_path"]
+            )
+        if not settings.output_filename:
+            settings.output_filename = Path(file_path).stem  # Устанавливаем имя файла по умолчанию
+        return settings, message
+
+
 class Project:
-    """Project model for Blender Render Tool."""
-    unique_id: str
-    name: str
-    file_path: str
-    settings: Settings
-    preview_path: str = ""
+    """Project model for Blender Render Tool.
 
-    def __post_init__(self):
-        self.file_path = str(Path(self.file_path))
-        if not self.name:
-            self.name = os.path.basename(self.file_path)
-        if not self.unique_id:
-            self.unique_id = str(uuid.uuid4())
-        if not isinstance(self.settings, Settings):
-            self.settings = Settings.from_dict(self.settings)
+    Настройки могут быть переданы как JSON из базы (settings_json) и
+    разбираются только при первом обращении к project.settings.
+    """
+    __slots__ = ("unique_id", "name", "file_path", "preview_path", "_settings", "_settings_json")
+
+    def __init__(self, unique_id: str, name: str, file_path: str, settings: Settings = None,
+                 preview_path: str = "", settings_json: str = None):
+        self.file_path = str(Path(file_path))
+        self.name = name or os.path.basename(self.file_path)
+        self.unique_id = unique_id or str(uuid.uuid4())
+        self.preview_path = preview_path
+        self._settings = None
+        self._settings_json = settings_json
+        if settings is not None:
+            self.settings = settings
+        elif settings_json is None:
+            raise ValueError("Project requires settings or settings_json")
+
+    @property
+    def settings(self) -> Settings:
+        if self._settings is None:
+            self._settings = Settings.from_dict(json.loads(self._settings_json))
+            self._settings_json = None
+        return self._settings
+
+    @settings.setter
+    def settings(self, value):
+        self._settings = value if isinstance(value, Settings) else Settings.from_dict(value)
+        self._settings_json = None
+
+    @property
+    def settings_loaded(self) -> bool:
+        return self._settings is not None
+
+    def settings_to_json(self) -> str:
+        """JSON настроек; для неразобранного проекта возвращается исходная строка без разбора."""
+        if self._settings is None:
+            return self._settings_json
+        return json.dumps(self._settings.to_dict())
+
+    def __repr__(self):
+        return f"Project(unique_id={self.unique_id!r}, name={self.name!r}, file_path={self.file_path!r})"
@@ -0,0 +1,89 @@
+"""Замер холодного старта интерфейса: импорт, создание окна и первая отрисовка.
+
+Запуск:
+    python -m src.startup_benchmark [--db path] [--runs 5]
+
+Каждый прогон выполняется в отдельном процессе, чтобы импорты были холодными.
+Результат печатается в stdout одной строкой JSON на прогон и итогом (медианы).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def measure_once(db_path):
+    start = time.perf_counter()
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+    from PyQt6.QtWidgets import QApplication
+    qt_imported = time.perf_counter()
+    from src.database.db_manager import DatabaseManager
+    from src.ui.main_window import MainWindow
+    modules_imported = time.perf_counter()
+
+    app = QApplication(sys.argv[:1])
+    db_manager = DatabaseManager(db_path)
+    window = MainWindow(db_manager)
+    constructed = time.perf_counter()
+    timings = {}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and "first_paint" not in timings:
+                timings["first_paint"] = time.perf_counter()
+                QTimer.singleShot(0, app.quit)
+            return False
+
+    paint_filter = FirstPaint()
+    window.installEventFilter(paint_filter)
+    window.show()
+    QTimer.singleShot(5000, app.quit)
+    app.exec()
+    window.close()
+    db_manager.close()
+    first_paint = timings.get("first_paint", time.perf_counter())
+    return {
+        "import_qt": qt_imported - start,
+        "import_app": modules_imported - qt_imported,
+        "construct_window": constructed - modules_imported,
+        "first_paint": first_paint - constructed,
+        "total": first_paint - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="база для замера; по умолчанию пустая временная")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_once(args.db)), flush=True)
+        return 0
+
+    temp_dir = None
+    db_path = args.db
+    if not db_path:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(temp_dir.name, "benchmark.db")
+    results = []
+    for run in range(args.runs):
+        output = subprocess.run([sys.executable, "-m", "src.startup_benchmark", "--child", "--db", db_path],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(json.dumps({"run": run, **{key: round(value, 4) for key, value in result.items()}}), flush=True)
+    summary = {key: round(statistics.median(result[key] for result in results), 4) for key in results[0]}
+    print(json.dumps({"median": summary}), flush=True)
+    if temp_dir:
+        temp_dir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
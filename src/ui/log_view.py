@@ -0,0 +1,83 @@
+import logging
+import time
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt
+from PyQt6.QtGui import QColor
+
+MAX_LOG_ROWS = 5000
+JobRole = Qt.ItemDataRole.UserRole + 1
+LevelRole = Qt.ItemDataRole.UserRole + 2
+
+LEVEL_COLORS = {
+    logging.WARNING: QColor("#e0b040"),
+    logging.ERROR: QColor("#e05050"),
+    logging.CRITICAL: QColor("#e05050"),
+}
+
+
+class LogModel(QAbstractListModel):
+    """Ограниченный по числу строк лог: старые строки удаляются пачкой при добавлении новых."""
+
+    def __init__(self, max_rows=MAX_LOG_ROWS, parent=None):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self.records = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{time.strftime('%H:%M:%S', time.localtime(record.created))}  {record.message}"
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return LEVEL_COLORS.get(record.level)
+        if role == JobRole:
+            return record.job_id
+        if role == LevelRole:
+            return record.level
+        return None
+
+    def append_records(self, records):
+        if not records:
+            return
+        records = records[-self.max_rows:]
+        overflow = len(self.records) + len(records) - self.max_rows
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            del self.records[:overflow]
+            self.endRemoveRows()
+        start = len(self.records)
+        self.beginInsertRows(QModelIndex(), start, start + len(records) - 1)
+        self.records.extend(records)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.records = []
+        self.endResetModel()
+
+
+class LogFilterProxy(QSortFilterProxyModel):
+    """Фильтр лога по заданию и минимальному уровню."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.job_id = None
+        self.min_level = logging.DEBUG
+
+    def set_job(self, job_id):
+        self.job_id = job_id
+        self.invalidateFilter()
+
+    def set_min_level(self, level):
+        self.min_level = level
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        record = self.sourceModel().records[source_row]
+        if record.level < self.min_level:
+            return False
+        return self.job_id is None or record.job_id == self.job_id
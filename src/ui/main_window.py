@@ -1,29 +1,32 @@
-import psutil
+import logging
+import time
+from functools import partial
+
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog,
-    QListWidget, QListWidgetItem, QLabel, QGroupBox, QSpinBox, QDoubleSpinBox,
-    QComboBox, QCheckBox, QLineEdit, QTextEdit, QScrollArea, QSizePolicy
+    QListView, QLabel, QGroupBox, QSpinBox, QDoubleSpinBox,
+    QComboBox, QCheckBox, QLineEdit, QScrollArea, QSizePolicy
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QModelIndex, QTimer
 from PyQt6.QtGui import QPixmap, QImage
-from src.models.project import Project, Settings
+from src.models.project import (Project, Settings, FILE_FORMATS_IMAGE, FILE_FORMATS_MOVIE, PRIORITY_LOW,
+                                PRIORITY_NORMAL, PRIORITY_URGENT, logical_cpu_count)
 from src.blender.blender_manager import BlenderManager
+from src.blender.job_control import RENDER_CANCELLED
+from src.blender.render_scheduler import RenderScheduler
+from src.blender.render_history import ETAEstimator, format_duration
+from src.blender.telemetry import format_bytes
+from src.database.thumbnail_cache import ThumbnailCache
+from src.ui.project_list_model import ProjectListModel, ProjectItemDelegate, ProjectRole
+from src.ui.log_view import LogModel, LogFilterProxy
+from src.ui.qt_bridge import GuiThreadBridge
+from src.ui.resource_graph import ResourceGraph
+from src.log_sink import LogSink
 from pathlib import Path
 import os
 
-
-class ProjectBlockWidget(QWidget):
-    def __init__(self, project: Project, parent=None):
-        super().__init__(parent)
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(5, 5, 5, 5)
-        name_label = QLabel(f"Name: {project.name}")
-        name_label.setStyleSheet("font-weight: bold;")
-        path_label = QLabel(f"Path: {project.file_path}")
-        path_label.setWordWrap(True)
-        layout.addWidget(name_label)
-        layout.addWidget(path_label)
-        self.setLayout(layout)
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_FLUSH_BATCH = 2000
 
 
 class MainWindow(QMainWindow):
@@ -31,13 +34,40 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.animation_group = None
         self.db_manager = db_manager
-        self.blender_manager = BlenderManager(self, self.db_manager.get_blender_paths())
-        self.projects = []
+        self.log_sink = LogSink()
+        self.log_model = LogModel(parent=self)
+        self.log_jobs = set()
+        self.thumbnail_cache = ThumbnailCache(self.db_manager, Path(self.db_manager.db_path).parent / "thumbnail_cache")
+        # События ядра приходят из рабочих потоков и переносятся в поток интерфейса
+        self.gui_bridge = GuiThreadBridge(self)
+        # Поиск Blender и определение версий запускаются в фоне после показа окна
+        self.blender_manager = BlenderManager(self, self.db_manager.get_blender_paths(), discover=False)
+        self.gui_bridge.connect(self.blender_manager.blender_discovered, self.on_blender_discovered)
+        self.gui_bridge.connect(self.blender_manager.thumbnail_ready, self.save_thumbnail)
+        self.gui_bridge.connect(self.blender_manager.settings_ready, self.on_project_settings_ready)
+        self.gui_bridge.connect(self.blender_manager.blender_info_ready, self.on_blender_info_ready)
+        self.gui_bridge.connect(self.blender_manager.preview_pass_ready, self.update_preview)
+        self.gui_bridge.connect(self.blender_manager.render_progress, self.on_render_progress)
+        self.gui_bridge.connect(self.blender_manager.render_complete, self.on_render_complete)
+        self.gui_bridge.connect(self.blender_manager.telemetry.sample_ready, self.on_resource_sample)
+        self.gui_bridge.connect(self.blender_manager.jobs.job_paused, self.on_job_paused)
+        self.render_progress = {}
+        self.resource_samples = {}  # unique_id -> последний ResourceSample
+        self.eta_estimator = ETAEstimator(self.db_manager)
+        self.job_timing = {}  # unique_id -> (время старта, оценка времени кадра)
+        self.render_scheduler = RenderScheduler(self.blender_manager, db_manager=self.db_manager)
+        self.gui_bridge.connect(self.render_scheduler.job_started, self.on_job_started)
+        self.gui_bridge.connect(self.render_scheduler.job_finished, self.on_job_finished)
+        self.gui_bridge.connect(self.render_scheduler.job_held, self.on_job_held)
+        self.gui_bridge.connect(self.render_scheduler.job_retrying, self.on_job_retrying)
+        self.gui_bridge.connect(self.render_scheduler.queue_finished, self.on_queue_finished)
+        self.project_model = ProjectListModel(self.db_manager, self)
         self.current_project = None
         self.setWindowTitle("Blender Render Tool")
         self.setMinimumSize(1600, 900)
         self.init_ui()
         self.load_projects()
+        QTimer.singleShot(0, self.blender_manager.discover_async)
 
     def init_ui(self):
         central_widget = QWidget()
@@ -47,31 +77,80 @@ class MainWindow(QMainWindow):
         left_layout = QVBoxLayout()
         button_layout = QHBoxLayout()
         add_button = QPushButton("Add Project")
+        add_folder_button = QPushButton("Add Folder")
         remove_button = QPushButton("Remove Project")
         move_up_button = QPushButton("Move Up")
         move_down_button = QPushButton("Move Down")
         render_queue_button = QPushButton("Render Queue")  # Новая кнопка
         add_button.clicked.connect(self.add_project)
+        add_folder_button.clicked.connect(self.add_projects_from_folder)
         remove_button.clicked.connect(self.remove_project)
         move_up_button.clicked.connect(self.move_up)
         move_down_button.clicked.connect(self.move_down)
         render_queue_button.clicked.connect(self.render_queue)
         button_layout.addWidget(add_button)
+        button_layout.addWidget(add_folder_button)
         button_layout.addWidget(remove_button)
         button_layout.addWidget(move_up_button)
         button_layout.addWidget(move_down_button)
         button_layout.addWidget(render_queue_button)
         left_layout.addLayout(button_layout)
 
-        self.project_list = QListWidget()
-        self.project_list.setSelectionMode(QListWidget.SelectionMode.SingleSelection)
-        self.project_list.itemClicked.connect(self.select_project)
+        concurrency_layout = QHBoxLayout()
+        concurrency_label = QLabel("Parallel Jobs:")
+        concurrency_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        self.max_concurrency = QSpinBox()
+        self.max_concurrency.setRange(1, logical_cpu_count())
+        self.max_concurrency.setValue(self.render_scheduler.max_concurrency)
+        self.max_concurrency.valueChanged.connect(self.render_scheduler.set_max_concurrency)
+
+        concurrency_layout.addWidget(concurrency_label)
+        concurrency_layout.addWidget(self.max_concurrency)
+        left_layout.addLayout(concurrency_layout)
+
+        self.project_list = QListView()
+        self.project_list.setSelectionMode(QListView.SelectionMode.SingleSelection)
+        self.project_list.setUniformItemSizes(True)
+        self.project_list.setModel(self.project_model)
+        self.project_list.setItemDelegate(ProjectItemDelegate(self.project_list))
+        self.project_list.clicked.connect(self.select_project)
         left_layout.addWidget(self.project_list)
 
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setPlaceholderText("Logs")
+        self.render_status_label = QLabel("")
+        self.render_status_label.setWordWrap(True)
+        left_layout.addWidget(self.render_status_label)
+
+        self.resource_graph = ResourceGraph()
+        left_layout.addWidget(self.resource_graph)
+
+        log_filter_layout = QHBoxLayout()
+        self.log_job_filter = QComboBox()
+        self.log_job_filter.addItem("All jobs", None)
+        self.log_job_filter.currentIndexChanged.connect(self.update_log_filter)
+        self.log_level_filter = QComboBox()
+        for name in ("DEBUG", "INFO", "WARNING", "ERROR"):
+            self.log_level_filter.addItem(name, logging.getLevelName(name))
+        self.log_level_filter.setCurrentText("INFO")
+        self.log_level_filter.currentIndexChanged.connect(self.update_log_filter)
+        log_filter_layout.addWidget(self.log_job_filter, 1)
+        log_filter_layout.addWidget(self.log_level_filter)
+        left_layout.addLayout(log_filter_layout)
+
+        self.log_proxy = LogFilterProxy(self)
+        self.log_proxy.setSourceModel(self.log_model)
+        self.log_output = QListView()
+        self.log_output.setModel(self.log_proxy)
+        self.log_output.setUniformItemSizes(True)
+        self.log_output.setWordWrap(False)
+        self.log_output.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
         left_layout.addWidget(self.log_output)
+        self.update_log_filter()
+
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start()
 
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
@@ -89,7 +168,7 @@ class MainWindow(QMainWindow):
         blender_path_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
 
         self.blender_path_combo = QComboBox()
-        self.blender_path_combo.addItems(self.db_manager.get_blender_paths().keys())
+        self.blender_path_combo.addItems(self.blender_manager.blender_paths.keys())
         self.blender_path_combo.currentTextChanged.connect(self.update_blender_version_label)
         self.blender_path_combo.setFixedWidth(400)
 
@@ -119,8 +198,15 @@ class MainWindow(QMainWindow):
         self.render_preview_button = QPushButton("Render Preview")
         self.render_preview_button.clicked.connect(self.render_preview)
 
+        self.stop_preview_button = QPushButton("Stop Preview")
+        self.stop_preview_button.clicked.connect(self.stop_preview)
+
+        preview_buttons_layout = QHBoxLayout()
+        preview_buttons_layout.addWidget(self.render_preview_button)
+        preview_buttons_layout.addWidget(self.stop_preview_button)
+
         preview_layout.addWidget(self.preview_label)
-        preview_layout.addWidget(self.render_preview_button)
+        preview_layout.addLayout(preview_buttons_layout)
 
         preview_group.setLayout(preview_layout)
         sidebar_content_layout.addWidget(preview_group)
@@ -166,12 +252,12 @@ class MainWindow(QMainWindow):
         cycles_layout.addLayout(cycles_device_layout)
 
         cycles_threads_layout = QHBoxLayout()
-        self.cycles_threads_label = QLabel("Threads (Max: %d):" % (psutil.cpu_count(logical=True) or 1))
+        self.cycles_threads_label = QLabel("Threads (Max: %d):" % logical_cpu_count())
         self.cycles_threads_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
 
         self.cycles_threads = QSpinBox()
-        self.cycles_threads.setRange(0, psutil.cpu_count(logical=True) or 1)
-        self.cycles_threads.setValue(psutil.cpu_count(logical=True) or 1)
+        self.cycles_threads.setRange(0, logical_cpu_count())
+        self.cycles_threads.setValue(logical_cpu_count())
 
         cycles_threads_layout.addWidget(self.cycles_threads_label)
         cycles_threads_layout.addWidget(self.cycles_threads)
@@ -313,11 +399,33 @@ class MainWindow(QMainWindow):
         fps_base_layout.addWidget(fps_base_label)
         fps_base_layout.addWidget(self.fps_base)
 
+        shard_workers_layout = QHBoxLayout()
+        shard_workers_label = QLabel("Parallel Workers:")
+        shard_workers_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        self.shard_workers = QSpinBox()
+        self.shard_workers.setRange(1, logical_cpu_count())
+
+        shard_workers_layout.addWidget(shard_workers_label)
+        shard_workers_layout.addWidget(self.shard_workers)
+
+        skip_existing_layout = QHBoxLayout()
+        skip_existing_label = QLabel("Skip Existing Frames:")
+        skip_existing_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        self.skip_existing = QCheckBox()
+        self.skip_existing.setToolTip("Дорендер: кадры, уже готовые в папке вывода, не рендерятся повторно")
+
+        skip_existing_layout.addWidget(skip_existing_label)
+        skip_existing_layout.addWidget(self.skip_existing)
+
         animation_layout.addLayout(self.frame_start_layout)
         animation_layout.addLayout(self.frame_end_layout)
         animation_layout.addLayout(self.frame_step_layout)
         animation_layout.addLayout(fps_value_layout)
         animation_layout.addLayout(fps_base_layout)
+        animation_layout.addLayout(shard_workers_layout)
+        animation_layout.addLayout(skip_existing_layout)
         self.animation_group.setLayout(animation_layout)
         settings_layout.addWidget(self.animation_group)
 
@@ -376,9 +484,23 @@ class MainWindow(QMainWindow):
         output_filename_layout.addWidget(output_filename_label, stretch=1)
         output_filename_layout.addWidget(self.output_filename, stretch=1)
 
+        priority_layout = QHBoxLayout()
+        priority_label = QLabel("Priority:")
+        priority_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        self.priority = QComboBox()
+        self.priority.addItem("Low", PRIORITY_LOW)
+        self.priority.addItem("Normal", PRIORITY_NORMAL)
+        self.priority.addItem("Urgent", PRIORITY_URGENT)
+        self.priority.setToolTip("Срочное задание приостанавливает менее приоритетное, если свободных слотов нет")
+
+        priority_layout.addWidget(priority_label)
+        priority_layout.addWidget(self.priority)
+
         output_layout.addLayout(file_format_layout)
         output_layout.addLayout(output_path_layout)
         output_layout.addLayout(output_filename_layout)
+        output_layout.addLayout(priority_layout)
         output_group.setLayout(output_layout)
         settings_layout.addWidget(output_group)
 
@@ -391,6 +513,18 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(render_button)
         settings_layout.addLayout(button_layout)
 
+        job_control_layout = QHBoxLayout()
+        cancel_button = QPushButton("Cancel Render")
+        cancel_button.clicked.connect(self.cancel_render)
+        pause_button = QPushButton("Pause")
+        pause_button.clicked.connect(self.pause_render)
+        resume_button = QPushButton("Resume")
+        resume_button.clicked.connect(self.resume_render)
+        job_control_layout.addWidget(cancel_button)
+        job_control_layout.addWidget(pause_button)
+        job_control_layout.addWidget(resume_button)
+        settings_layout.addLayout(job_control_layout)
+
         settings_group.setLayout(settings_layout)
         sidebar_content_layout.addWidget(settings_group)
 
@@ -404,9 +538,15 @@ class MainWindow(QMainWindow):
 
         self.update_render_type()
 
+    def closeEvent(self, event):
+        self.log_timer.stop()
+        # Незапущенные задания не должны стартовать, пока завершаются запущенные
+        self.render_scheduler.take_pending()
+        self.blender_manager.shutdown()
+        super().closeEvent(event)
+
     def save_thumbnail(self, unique_id, thumbnail_data):
         if thumbnail_data:
-            self.db_manager.save_thumbnail(unique_id, thumbnail_data)
             self.log(f"Миниатюра сохранена для проекта: {unique_id}")
             if self.current_project and self.current_project.unique_id == unique_id:
                 image = QImage.fromData(thumbnail_data)
@@ -460,25 +600,40 @@ class MainWindow(QMainWindow):
             self, "Выберите исполняемый файл Blender", "", filters
         )
         if file_path:
-            version = self.blender_manager.get_blender_version(file_path)
-            self.db_manager.add_blender_path(file_path, version)
-            self.blender_manager.blender_paths = self.db_manager.get_blender_paths()
+            self.blender_manager.register_blender_path(file_path)
             self.blender_path_combo.clear()
-            self.blender_path_combo.addItems(self.db_manager.get_blender_paths().keys())
+            self.blender_path_combo.addItems(self.blender_manager.blender_paths.keys())
             self.blender_path_combo.setCurrentText(file_path)
-            self.blender_version_label.setText(f"Версия: {version}")
-            self.log(f"Добавлен путь Blender: {file_path} (Версия: {version})")
+            self.log(f"Добавлен путь Blender: {file_path}, определение версии...")
 
     def update_blender_version_label(self):
         blender_path = self.blender_path_combo.currentText()
         if blender_path:
-            version = self.blender_manager.get_blender_version(blender_path)
+            version = self.blender_manager.describe_blender(blender_path)
             self.blender_version_label.setText(f"Версия: {version}")
             self.log(f"Выбран путь Blender: {blender_path} (Версия: {version})")
         else:
             self.blender_version_label.setText("Версия: Неизвестно")
             self.log("Путь Blender не выбран")
 
+    def default_blender_path(self):
+        return self.blender_manager.blender_executable or next(iter(self.blender_manager.blender_paths), "")
+
+    def on_blender_discovered(self, blender_path):
+        if not blender_path:
+            self.log("Исполняемый файл Blender не найден", logging.WARNING)
+            return
+        if self.blender_path_combo.findText(blender_path) < 0:
+            self.blender_path_combo.addItem(blender_path)
+        self.log(f"Найден Blender: {blender_path}")
+
+    def on_blender_info_ready(self, blender_path, info):
+        if self.blender_path_combo.findText(blender_path) < 0:
+            self.blender_path_combo.addItem(blender_path)
+        if self.blender_path_combo.currentText() == blender_path:
+            self.blender_version_label.setText(f"Версия: {self.blender_manager.describe_blender(blender_path)}")
+        self.log(f"Определена версия Blender {blender_path}: {info['version']}")
+
     def render_preview(self):
         if not self.current_project:
             self.log("Проект не выбран")
@@ -486,22 +641,23 @@ class MainWindow(QMainWindow):
         if not self.current_project.settings.blender_path:
             self.log("Путь Blender не задан для проекта")
             return
-        self.blender_manager.render_project_thumbnail(self.current_project, self.update_preview)
+        self.blender_manager.render_project_thumbnail(self.current_project, progressive=True)
         self.log(f"Рендеринг миниатюры для: {self.current_project.name}")
 
-    def update_preview(self, unique_id, thumbnail_data):
-        if thumbnail_data and self.current_project:
-            if self.current_project.unique_id == unique_id:
-                image = QImage.fromData(thumbnail_data)
-                pixmap = QPixmap.fromImage(image)
-                self.preview_label.setPixmap(pixmap.scaled(
-                    self.preview_label.size(),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                ))
-                self.log("Миниатюра обновлена и сохранена в базе данных")
-            else:
-                self.log("Рендеринг миниатюры не удался или проект изменился")
+    def stop_preview(self):
+        if self.current_project and self.blender_manager.cancel_thumbnail(self.current_project.unique_id):
+            self.log(f"Рендеринг миниатюры остановлен: {self.current_project.name}")
+
+    def update_preview(self, unique_id, thumbnail_data, index, total):
+        if thumbnail_data and self.current_project and self.current_project.unique_id == unique_id:
+            image = QImage.fromData(thumbnail_data)
+            pixmap = QPixmap.fromImage(image)
+            self.preview_label.setPixmap(pixmap.scaled(
+                self.preview_label.size(),
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+            self.log(f"Превью: проход {index + 1} из {total}")
 
     def render_project(self):
         if not self.current_project:
@@ -513,26 +669,190 @@ class MainWindow(QMainWindow):
         if not self.current_project.settings.output_path:
             self.log("Путь вывода не задан")
             return
+        project = self.current_project
+        if self.render_scheduler.has_job(project.unique_id):
+            self.log(f"Проект {project.name} уже в очереди рендера")
+            return
         self.save_settings()
-        self.blender_manager.render_project(self.current_project, self.log)
-        self.log(f"Рендеринг начат для проекта: {self.current_project.name}")
+        # Одиночный рендер идет через планировщик: лимит процессов, блок ядер, допуск по памяти и повторы
+        self.db_manager.set_project_status(project.unique_id, "pending")
+        self.render_scheduler.submit(project, partial(self.log, job_id=project.unique_id))
+        self.log(f"Проект добавлен в очередь рендера: {project.name}")
 
     def render_queue(self):
-        if not self.projects:
+        if not self.project_model.fetch_all():
             self.log("Очередь проектов пуста")
             return
+        if self.current_project:
+            self.save_settings()
         self.log("Начало рендера очереди проектов")
-        for project in self.projects:
+        queued = []
+        for project in self.project_model.projects:
             if not project.settings.blender_path:
                 self.log(f"Пропуск проекта {project.name}: путь Blender не задан")
                 continue
             if not project.settings.output_path:
                 self.log(f"Пропуск проекта {project.name}: путь вывода не задан")
                 continue
-            self.current_project = project
-            self.save_settings()
-            self.blender_manager.render_project(project, self.log)
-            self.log(f"Рендеринг начат для проекта: {project.name}")
+            if self.render_scheduler.has_job(project.unique_id):
+                self.log(f"Пропуск проекта {project.name}: уже в очереди рендера")
+                continue
+            queued.append(project)
+        # Настройки всех проектов сохраняются одной транзакцией до запуска рендера
+        with self.db_manager.transaction():
+            for project in queued:
+                self.db_manager.update_project(project)
+                self.db_manager.set_project_status(project.unique_id, "pending")
+        for project in queued:
+            self.render_scheduler.submit(project, partial(self.log, job_id=project.unique_id))
+            self.log(f"Проект добавлен в очередь рендера: {project.name}")
+        if queued:
+            eta, unknown = self.eta_estimator.estimate_queue(queued, self.render_scheduler.max_concurrency,
+                                                             self.render_scheduler.threads_per_job())
+            message = f"Ожидаемое время рендера очереди: {format_duration(eta)}"
+            if unknown:
+                message += f" (без оценки: {unknown})"
+            self.log(message)
+
+    def start_job_timing(self, project, threads):
+        try:
+            frame_time = self.eta_estimator.frame_time(project, threads)
+        except Exception as e:
+            self.log(f"Не удалось оценить время рендера: {str(e)}")
+            frame_time = None
+        self.job_timing[project.unique_id] = (time.monotonic(), frame_time)
+
+    def on_job_started(self, unique_id, threads):
+        project = self.project_model.project_by_id(unique_id)
+        name = project.name if project else unique_id
+        message = f"Рендеринг начат для проекта: {name} (потоков: {threads})"
+        if project:
+            self.start_job_timing(project, threads)
+            frame_time = self.job_timing[unique_id][1]
+            if frame_time is not None:
+                message += f", ожидаемое время: {format_duration(frame_time * project.settings.frame_count())}"
+        self.log(message)
+
+    def cancel_render(self):
+        if not self.current_project:
+            self.log("Проект не выбран")
+            return
+        unique_id = self.current_project.unique_id
+        if self.render_scheduler.cancel(unique_id):
+            self.log(f"Отмена рендеринга: {self.current_project.name}", job_id=unique_id)
+        else:
+            self.log(f"Проект {self.current_project.name} не рендерится")
+
+    def pause_render(self):
+        if self.current_project and not self.render_scheduler.pause(self.current_project.unique_id):
+            self.log(f"Проект {self.current_project.name} не рендерится или уже приостановлен")
+
+    def resume_render(self):
+        if self.current_project and not self.render_scheduler.resume(self.current_project.unique_id):
+            self.log(f"Проект {self.current_project.name} не приостановлен")
+
+    def on_job_paused(self, unique_id, paused):
+        project = self.project_model.project_by_id(unique_id)
+        name = project.name if project else unique_id
+        self.log(f"Рендеринг {'приостановлен' if paused else 'продолжен'}: {name}", job_id=unique_id)
+
+    def on_job_held(self, unique_id, estimate, available):
+        project = self.project_model.project_by_id(unique_id)
+        name = project.name if project else unique_id
+        self.log(f"Задание {name} ждет свободной памяти: нужно ~{format_bytes(estimate)}, "
+                 f"доступно {format_bytes(available)}", logging.WARNING, job_id=unique_id)
+
+    def on_job_retrying(self, unique_id, attempt, delay, message):
+        self.clear_render_status(unique_id)
+        project = self.project_model.project_by_id(unique_id)
+        name = project.name if project else unique_id
+        self.log(f"Рендеринг {name} не удался, попытка {attempt} через {format_duration(delay)}",
+                 logging.WARNING, job_id=unique_id)
+
+    def clear_render_status(self, unique_id):
+        """Убирает строку состояния завершенной попытки рендера."""
+        self.render_progress.pop(unique_id, None)
+        self.resource_samples.pop(unique_id, None)
+        self.job_timing.pop(unique_id, None)
+        self.update_render_status()
+
+    def on_render_complete(self, unique_id, success, message):
+        # Попытка закончилась: ее прогресс не должен висеть до job_finished или повтора
+        self.clear_render_status(unique_id)
+
+    def on_render_progress(self, unique_id, progress):
+        self.render_progress[unique_id] = progress
+        self.update_render_status()
+
+    def on_resource_sample(self, unique_id, sample):
+        if self.blender_manager.telemetry.telemetry(unique_id) is None:
+            return  # замер пришел после завершения задания
+        self.resource_samples[unique_id] = sample
+        self.update_render_status()
+        if self.current_project and self.current_project.unique_id == unique_id:
+            self.show_project_resources()
+
+    def show_project_resources(self):
+        """Ряд замеров текущего рендера выбранного проекта или последнего сохраненного запуска."""
+        if not self.current_project:
+            self.resource_graph.clear()
+            return
+        unique_id = self.current_project.unique_id
+        telemetry = self.blender_manager.telemetry.telemetry(unique_id)
+        if telemetry is not None:
+            self.resource_graph.set_series(telemetry.series())
+            return
+        try:
+            last = self.db_manager.get_last_render(unique_id)
+            series = self.db_manager.get_render_telemetry(last["id"]) if last else []
+        except Exception as e:
+            self.log(f"Не удалось загрузить замеры ресурсов: {str(e)}", logging.WARNING)
+            series = []
+        self.resource_graph.set_series(series)
+
+    def update_render_status(self):
+        lines = []
+        for unique_id in self.render_progress.keys() | self.resource_samples.keys():
+            progress = self.render_progress.get(unique_id)
+            sample = self.resource_samples.get(unique_id)
+            project = self.project_model.project_by_id(unique_id)
+            name = project.name if project else unique_id
+            if progress is None:
+                line = f"{name}: подготовка"
+            else:
+                line = f"{name}: кадр {progress.frame}"
+                if project and project.settings.render_type == "Animation":
+                    line += f" (готово {progress.frames_done})"
+                if progress.samples_total:
+                    line += f", сэмпл {progress.sample}/{progress.samples_total}"
+                line += f", {progress.elapsed:.1f} с, пик памяти {progress.memory_peak:.0f} MB"
+            if sample is not None:
+                telemetry = self.blender_manager.telemetry.telemetry(unique_id)
+                peak = max(telemetry.peak_rss if telemetry else 0, sample.rss)
+                line += (f", CPU {sample.cpu:.0f}%, RAM {format_bytes(sample.rss)} (пик {format_bytes(peak)}), "
+                         f"потоков {sample.threads}, I/O {format_bytes(sample.io_read)}/{format_bytes(sample.io_write)}")
+            if progress is not None and project and unique_id in self.job_timing:
+                started, frame_time = self.job_timing[unique_id]
+                remaining = self.eta_estimator.live_remaining(project, progress.frames_done,
+                                                              time.monotonic() - started, frame_time)
+                if remaining is not None:
+                    line += f", осталось ~{format_duration(remaining)}"
+            lines.append(line)
+        self.render_status_label.setText("\n".join(lines))
+
+    def on_job_finished(self, unique_id, success, message):
+        self.clear_render_status(unique_id)
+        if self.current_project and self.current_project.unique_id == unique_id:
+            self.show_project_resources()
+        project = self.project_model.project_by_id(unique_id)
+        name = project.name if project else unique_id
+        if success:
+            status = "завершен"
+        else:
+            status = "отменен" if message == RENDER_CANCELLED else "завершен с ошибкой"
+        self.log(f"Рендеринг {status}: {name}. Осталось в очереди: {self.render_scheduler.pending_count()}")
+
+    def on_queue_finished(self):
         self.log("Рендер очереди завершен")
 
     def save_settings(self):
@@ -558,90 +878,95 @@ class MainWindow(QMainWindow):
                 threads=self.cycles_threads.value(),
                 eevee_samples=self.eevee_samples.value(),
                 file_format=self.file_format.currentText(),
-                file_formats_image=["PNG", "JPEG", "EXR"],
-                file_formats_movie=["AVI_JPEG", "AVI_RAW", "FFMPEG"],
+                file_formats_image=FILE_FORMATS_IMAGE,
+                file_formats_movie=FILE_FORMATS_MOVIE,
                 output_path=self.output_path.text(),
                 output_filename=self.output_filename.text() or self.current_project.name,  # Используем имя проекта по умолчанию
-                blender_path=self.blender_path_combo.currentText()
+                blender_path=self.blender_path_combo.currentText(),
+                shard_workers=self.shard_workers.value(),
+                skip_existing=self.skip_existing.isChecked(),
+                priority=self.priority.currentData()
             )
             self.current_project.settings = settings
             self.db_manager.update_project(self.current_project)
+            self.render_scheduler.set_priority(self.current_project.unique_id, settings.priority)
             self.log(f"Настройки сохранены для проекта: {self.current_project.name}")
         except ValueError as e:
             self.log(f"Ошибка сохранения настроек: {str(e)}")
 
-    def log(self, message):
-        self.log_output.append(message)
-        self.log_output.ensureCursorVisible()
-
     def add_project(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Добавить файл Blender", "", "Blender Files (*.blend)"
         )
         if file_path:
-            settings = self.blender_manager.get_settings_from_project(file_path)
-            if not settings:
-                settings = Settings(
-                    output_path=str(Path(file_path).parent / "output"),
-                    output_filename=Path(file_path).stem,  # Устанавливаем имя файла по умолчанию
-                    blender_path=list(self.db_manager.get_blender_paths().keys())[0] if self.db_manager.get_blender_paths() else ""
-                )
-                self.log("Не удалось загрузить настройки, используются значения по умолчанию")
-            else:
-                settings = Settings(**settings)
-                if not settings.output_filename:
-                    settings.output_filename = Path(file_path).stem  # Устанавливаем имя файла по умолчанию
-                self.log("Настройки загружены из файла .blend")
-            project = Project(
-                unique_id="",
-                name="",
-                file_path=str(Path(file_path)),
-                settings=settings
-            )
-            self.projects.append(project)
-            self.db_manager.save_project(project)
-            self.update_project_list()
-            self.log(f"Добавлен проект: {project.name}")
+            self.log(f"Чтение настроек проекта: {file_path}")
+            self.blender_manager.get_settings_from_project_async(file_path)
+
+    def add_projects_from_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Выберите папку с файлами Blender")
+        if folder:
+            file_paths = sorted(str(path) for path in Path(folder).glob("*.blend"))
+            if not file_paths:
+                self.log(f"Файлы .blend не найдены в папке: {folder}")
+                return
+            self.log(f"Чтение настроек {len(file_paths)} проектов из папки: {folder}")
+            self.blender_manager.get_settings_from_projects_async(file_paths)
+
+    def on_project_settings_ready(self, file_path, settings):
+        settings, message = Settings.for_blend_file(file_path, settings,
+                                                    self.default_blender_path())
+        self.log(message)
+        project = Project(
+            unique_id="",
+            name="",
+            file_path=str(Path(file_path)),
+            settings=settings
+        )
+        self.db_manager.save_project(project)
+        self.project_model.append_project(project)
+        self.log(f"Добавлен проект: {project.name}")
 
     def remove_project(self):
-        selected_row = self.project_list.currentRow()
+        selected_row = self.project_list.currentIndex().row()
         if selected_row >= 0:
-            project = self.projects.pop(selected_row)
-            self.db_manager.delete_project(project.unique_id)
-            self.db_manager.delete_thumbnail(project.unique_id)
-            self.update_project_list()
+            project = self.project_model.project_at(selected_row)
+            with self.db_manager.transaction():
+                self.db_manager.delete_project(project.unique_id)
+                self.db_manager.delete_thumbnail(project.unique_id)
+            self.project_model.remove_row(selected_row)
             if self.current_project == project:
                 self.current_project = None
                 self.sidebar.setVisible(False)
             self.log(f"Удален проект: {project.name}")
 
     def move_up(self):
-        selected_row = self.project_list.currentRow()
+        selected_row = self.project_list.currentIndex().row()
         if selected_row > 0:
-            self.projects[selected_row], self.projects[selected_row - 1] = (
-                self.projects[selected_row - 1], self.projects[selected_row]
-            )
-            self.update_project_list()
-            self.project_list.setCurrentRow(selected_row - 1)
+            self.move_project(selected_row, selected_row - 1)
             self.log("Проект перемещен вверх")
 
     def move_down(self):
-        selected_row = self.project_list.currentRow()
-        if selected_row < len(self.projects) - 1 and selected_row >= 0:
-            self.projects[selected_row], self.projects[selected_row + 1] = (
-                self.projects[selected_row + 1], self.projects[selected_row]
-            )
-            self.update_project_list()
-            self.project_list.setCurrentRow(selected_row + 1)
+        selected_row = self.project_list.currentIndex().row()
+        if selected_row >= 0 and self.project_model.canFetchMore() \
+                and selected_row == self.project_model.rowCount() - 1:
+            self.project_model.fetchMore()
+        if 0 <= selected_row < self.project_model.rowCount() - 1:
+            self.move_project(selected_row, selected_row + 1)
             self.log("Проект перемещен вниз")
 
-    def select_project(self, item: QListWidgetItem):
-        project_id = item.data(Qt.ItemDataRole.UserRole)
-        self.current_project = next((p for p in self.projects if p.unique_id == project_id), None)
+    def move_project(self, row, target_row):
+        project = self.project_model.project_at(row)
+        neighbour = self.project_model.project_at(target_row)
+        self.db_manager.swap_positions(project.unique_id, neighbour.unique_id)
+        self.project_model.swap_rows(row, target_row)
+        self.project_list.setCurrentIndex(self.project_model.index(target_row))
+
+    def select_project(self, index: QModelIndex):
+        self.current_project = index.data(ProjectRole)
         if self.current_project:
             self.sidebar.setVisible(True)
             self.update_settings_ui()
-            thumbnail = self.db_manager.get_thumbnail(self.current_project.unique_id)
+            thumbnail = self.thumbnail_cache.get_for_project(self.current_project.unique_id)
             if thumbnail:
                 image = QImage.fromData(thumbnail)
                 pixmap = QPixmap.fromImage(image)
@@ -649,9 +974,10 @@ class MainWindow(QMainWindow):
                     self.preview_label.size(), Qt.AspectRatioMode.KeepAspectRatio,
                     Qt.TransformationMode.SmoothTransformation
                 ))
-                self.log("Загружена существующая миниатюра из базы данных")
+                self.log("Загружена существующая миниатюра из кэша")
             else:
                 self.preview_label.setText("Превью недоступно")
+            self.show_project_resources()
             self.log(f"Выбран проект: {self.current_project.name}")
 
     def update_settings_ui(self):
@@ -669,6 +995,8 @@ class MainWindow(QMainWindow):
         self.frame_current.setValue(settings.frame_current)
         self.fps_value.setValue(settings.fps)
         self.fps_base.setValue(settings.fps_base)
+        self.shard_workers.setValue(settings.shard_workers)
+        self.skip_existing.setChecked(settings.skip_existing)
         self.cycles_samples.setValue(settings.cycles_samples)
         self.cycles_denoising.setChecked(settings.cycles_denoising)
         self.cycles_device.setCurrentText(settings.cycles_device)
@@ -678,9 +1006,10 @@ class MainWindow(QMainWindow):
         self.output_path.setText(settings.output_path)
         self.output_filename.setText(settings.output_filename)
         self.blender_path_combo.setCurrentText(settings.blender_path)
+        self.priority.setCurrentIndex(self.priority.findData(max(PRIORITY_LOW, min(PRIORITY_URGENT, settings.priority))))
         blender_path = settings.blender_path
         if blender_path:
-            version = self.blender_manager.get_blender_version(blender_path)
+            version = self.blender_manager.describe_blender(blender_path)
             self.blender_version_label.setText(f"Version: {version}")
         else:
             self.blender_version_label.setText("Version: unknown")
@@ -688,20 +1017,28 @@ class MainWindow(QMainWindow):
         self.update_cycles_device()
         self.update_render_type()
 
-    def update_project_list(self):
-        self.project_list.clear()
-        for project in self.projects:
-            item = QListWidgetItem()
-            item.setData(Qt.ItemDataRole.UserRole, project.unique_id)
-            block_widget = ProjectBlockWidget(project)
-            item.setSizeHint(block_widget.sizeHint())
-            self.project_list.addItem(item)
-            self.project_list.setItemWidget(item, block_widget)
-
     def load_projects(self):
-        self.projects = self.db_manager.load_projects()
-        self.update_project_list()
+        self.project_model.reload()
+
+    def log(self, message, level=logging.INFO, job_id=None):
+        """Потокобезопасно: сообщение попадает в буфер и выводится по таймеру."""
+        self.log_sink.push(message, level, job_id)
 
-    def log(self, message):
-        self.log_output.append(message)
-        self.log_output.ensureCursorVisible()
+    def flush_log(self):
+        records = self.log_sink.drain(LOG_FLUSH_BATCH)
+        if not records:
+            return
+        scrollbar = self.log_output.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        for record in records:
+            if record.job_id and record.job_id not in self.log_jobs:
+                self.log_jobs.add(record.job_id)
+                project = self.project_model.project_by_id(record.job_id)
+                self.log_job_filter.addItem(project.name if project else record.job_id, record.job_id)
+        self.log_model.append_records(records)
+        if at_bottom:
+            self.log_output.scrollToBottom()
+
+    def update_log_filter(self):
+        self.log_proxy.set_job(self.log_job_filter.currentData())
+        self.log_proxy.set_min_level(self.log_level_filter.currentData())
@@ -0,0 +1,171 @@
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSize, Qt
+from PyQt6.QtGui import QFont, QFontMetrics, QPalette
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from src.logger_config import setup_logger
+
+logger = setup_logger('ProjectListModel')
+
+FETCH_PAGE_SIZE = 200
+ProjectRole = Qt.ItemDataRole.UserRole + 1
+PathRole = Qt.ItemDataRole.UserRole + 2
+
+
+class ProjectListModel(QAbstractListModel):
+    """Модель очереди проектов поверх DatabaseManager.
+
+    Строки подгружаются из базы страницами по мере прокрутки (canFetchMore/fetchMore),
+    изменения сообщаются представлению точечно: вставка, перемещение и удаление строк.
+    """
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.projects = []
+        self._by_id = {}
+        self._total = 0
+
+    def reload(self):
+        self.beginResetModel()
+        self.projects = []
+        self._by_id = {}
+        self._total = self.db_manager.count_projects()
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.projects)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.projects) < self._total
+
+    def fetchMore(self, parent=QModelIndex(), limit=FETCH_PAGE_SIZE):
+        if parent.isValid():
+            return
+        page = self.db_manager.load_projects(limit=limit, offset=len(self.projects))
+        page = [project for project in page if project.unique_id not in self._by_id]
+        if not page:
+            self._total = len(self.projects)
+            return
+        start = len(self.projects)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self.projects.extend(page)
+        for project in page:
+            self._by_id[project.unique_id] = project
+        self.endInsertRows()
+
+    def fetch_all(self):
+        while self.canFetchMore():
+            self.fetchMore(limit=self._total - len(self.projects))
+        return self.projects
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.projects):
+            return None
+        project = self.projects[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return project.name
+        if role == Qt.ItemDataRole.UserRole:
+            return project.unique_id
+        if role == ProjectRole:
+            return project
+        if role in (PathRole, Qt.ItemDataRole.ToolTipRole):
+            return project.file_path
+        return None
+
+    def project_at(self, row):
+        return self.projects[row] if 0 <= row < len(self.projects) else None
+
+    def project_by_id(self, unique_id):
+        return self._by_id.get(unique_id)
+
+    def row_of(self, unique_id):
+        project = self._by_id.get(unique_id)
+        return self.projects.index(project) if project is not None else -1
+
+    def append_project(self, project):
+        """Добавляет уже сохраненный в базе проект в конец очереди."""
+        self._total += 1
+        if len(self.projects) < self._total - 1:
+            # Конец очереди еще не подгружен: проект появится при прокрутке
+            return
+        row = len(self.projects)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.projects.append(project)
+        self._by_id[project.unique_id] = project
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        project = self.project_at(row)
+        if project is None:
+            return None
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.projects[row]
+        del self._by_id[project.unique_id]
+        self._total -= 1
+        self.endRemoveRows()
+        return project
+
+    def swap_rows(self, row, other):
+        """Меняет соседние строки местами; перерисовываются только они."""
+        low, high = sorted((row, other))
+        if low < 0 or high >= len(self.projects) or high - low != 1:
+            return False
+        self.beginMoveRows(QModelIndex(), high, high, QModelIndex(), low)
+        self.projects[low], self.projects[high] = self.projects[high], self.projects[low]
+        self.endMoveRows()
+        return True
+
+    def refresh_project(self, unique_id):
+        row = self.row_of(unique_id)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class ProjectItemDelegate(QStyledItemDelegate):
+    """Рисует имя и путь проекта в две строки без создания виджетов на каждую строку."""
+
+    MARGIN = 5
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._size_hint = None
+
+    def _fonts(self, option):
+        name_font = QFont(option.font)
+        name_font.setBold(True)
+        return name_font, option.font
+
+    def paint(self, painter, option, index):
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        option.text = ""
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+
+        name_font, path_font = self._fonts(option)
+        rect = option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        selected = option.state & QStyle.StateFlag.State_Selected
+        color_role = QPalette.ColorRole.HighlightedText if selected else QPalette.ColorRole.Text
+        painter.save()
+        painter.setPen(option.palette.color(color_role))
+        name_metrics = QFontMetrics(name_font)
+        painter.setFont(name_font)
+        name = name_metrics.elidedText(f"Name: {index.data(Qt.ItemDataRole.DisplayRole)}",
+                                       Qt.TextElideMode.ElideRight, rect.width())
+        painter.drawText(rect.left(), rect.top() + name_metrics.ascent(), name)
+        path_metrics = QFontMetrics(path_font)
+        painter.setFont(path_font)
+        path = path_metrics.elidedText(f"Path: {index.data(PathRole)}", Qt.TextElideMode.ElideMiddle, rect.width())
+        painter.drawText(rect.left(), rect.top() + name_metrics.height() + path_metrics.ascent(), path)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        # Высота строки одинакова для всех проектов, считаем ее один раз
+        if self._size_hint is None:
+            name_font, path_font = self._fonts(option)
+            height = QFontMetrics(name_font).height() + QFontMetrics(path_font).height() + 2 * self.MARGIN
+            self._size_hint = QSize(0, height)
+        return self._size_hint
@@ -0,0 +1,25 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class GuiThreadBridge(QObject):
+    """Переносит вызовы обработчиков событий ядра из рабочих потоков в поток интерфейса.
+
+    Сигнал испускается в потоке ядра и доставляется получателю, живущему в
+    потоке интерфейса, через очередь событий Qt.
+    """
+    invoke = pyqtSignal(object, tuple)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.invoke.connect(self._call)
+
+    def _call(self, handler, args):
+        handler(*args)
+
+    def wrap(self, handler):
+        def queued(*args):
+            self.invoke.emit(handler, args)
+        return queued
+
+    def connect(self, signal, handler):
+        signal.connect(self.wrap(handler))
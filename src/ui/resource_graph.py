@@ -0,0 +1,58 @@
+from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QWidget
+
+from src.blender.telemetry import format_bytes
+
+CPU_COLOR = QColor("#50a0e0")
+RSS_COLOR = QColor("#e0a040")
+GRID_COLOR = QColor("#404040")
+TEXT_COLOR = QColor("#c0c0c0")
+
+
+class ResourceGraph(QWidget):
+    """График загрузки CPU и памяти процессов Blender одного задания.
+
+    Принимает ряд ResourceSample или строки render_telemetry (time, cpu, rss, ...);
+    CPU масштабируется по максимуму ряда (не меньше 100%), память - по пику RSS.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.points = []  # (time, cpu, rss)
+        self.setMinimumHeight(90)
+
+    def set_series(self, samples):
+        self.points = [(sample[0], sample[1], sample[2]) if isinstance(sample, (tuple, list))
+                       else (sample.time, sample.cpu, sample.rss) for sample in samples]
+        self.update()
+
+    def clear(self):
+        self.set_series([])
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = self.rect().adjusted(4, 16, -4, -4)
+        painter.setPen(QPen(GRID_COLOR))
+        painter.drawRect(rect)
+        if not self.points:
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Нет данных о ресурсах")
+            return
+        duration = max(self.points[-1][0], 1e-6)
+        cpu_scale = max(100.0, max(cpu for _, cpu, _ in self.points))
+        rss_scale = max(1, max(rss for _, _, rss in self.points))
+        for column, scale, color in ((1, cpu_scale, CPU_COLOR), (2, rss_scale, RSS_COLOR)):
+            polygon = QPolygonF([
+                QPointF(rect.left() + rect.width() * point[0] / duration,
+                        rect.bottom() - rect.height() * point[column] / scale)
+                for point in self.points
+            ])
+            painter.setPen(QPen(color, 1.5))
+            painter.drawPolyline(polygon)
+        _, cpu, rss = self.points[-1]
+        painter.setPen(CPU_COLOR)
+        painter.drawText(4, 12, f"CPU {cpu:.0f}% (шкала {cpu_scale:.0f}%)")
+        painter.setPen(RSS_COLOR)
+        painter.drawText(self.width() // 2, 12, f"RAM {format_bytes(rss)} (пик {format_bytes(rss_scale)})")
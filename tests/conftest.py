@@ -0,0 +1,60 @@
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+STUB_DIR = Path(__file__).resolve().parent / "stub_blender"
+
+FAKE_BLENDER = """#!{python}
+# Поддельный Blender: выполняет скрипт из --python с заглушкой bpy
+import runpy
+import sys
+
+args = sys.argv[1:]
+if "--python" not in args:
+    print("Blender 4.2.0")
+    sys.exit(0)
+script = args[args.index("--python") + 1]
+sys.path.insert(0, {stub!r})
+sys.argv = [script] + (args[args.index("--"):] if "--" in args else [])
+runpy.run_path(script, run_name="__main__")
+"""
+
+
+@pytest.fixture
+def fake_blender(tmp_path):
+    """Путь к исполняемому файлу, который ведет себя как Blender с заглушкой bpy."""
+    path = tmp_path / "blender"
+    path.write_text(FAKE_BLENDER.format(python=sys.executable, stub=str(STUB_DIR)))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.fixture
+def fast_frames(monkeypatch):
+    monkeypatch.setenv("FAKE_FRAME_TIME", os.environ.get("FAKE_FRAME_TIME", "0.05"))
+
+
+@pytest.fixture
+def make_project(tmp_path, fake_blender):
+    """Фабрика проектов с пустым .blend и выводом во временную папку."""
+    from src.models.project import Project, Settings
+
+    def make(name="scene", **settings):
+        blend = tmp_path / f"{name}.blend"
+        blend.write_bytes(b"BLENDER-v300")
+        settings.setdefault("render_engine", "EEVEE")
+        settings.setdefault("eevee_samples", 1)
+        settings.setdefault("threads", 1)
+        return Project(None, name, str(blend), Settings(
+            output_path=str(tmp_path / "output" / name), output_filename=name,
+            blender_path=fake_blender, **settings
+        ))
+
+    return make
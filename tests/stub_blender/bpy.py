@@ -0,0 +1,73 @@
+"""Заглушка модуля bpy для тестов: рендер пишет пустые PNG и печатает строки прогресса Blender.
+
+FAKE_FRAME_TIME - секунды на кадр; FAKE_FAIL_FRAME - на этом кадре процесс выходит с кодом 3;
+FAKE_HANG_FRAME - на этом кадре процесс зависает (один раз, если задан файл-отметка FAKE_HANG_MARK).
+"""
+import os
+import time
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40 + b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+
+class Obj:
+    """Любой атрибут - вложенный Obj, любой вызов ничего не делает."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = Obj()
+        object.__setattr__(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        return None
+
+
+context = Obj()
+data = Obj()
+
+
+class _Render:
+    def render(self, write_still=False, animation=False):
+        scene = context.scene
+        delay = float(os.environ.get("FAKE_FRAME_TIME", "0.3"))
+        fail_frame = int(os.environ.get("FAKE_FAIL_FRAME", "-1"))
+        hang_frame = int(os.environ.get("FAKE_HANG_FRAME", "-1"))
+        if write_still:
+            frames = [scene.frame_current]
+        else:
+            frames = list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+        for frame in frames:
+            path = str(scene.render.filepath) + (f"{frame:04d}.png" if animation else "")
+            if animation and getattr(scene.render, "use_overwrite", True) is False and os.path.exists(path):
+                print(f"skipping existing frame \"{path}\"", flush=True)
+                continue
+            if animation and getattr(scene.render, "use_placeholder", False) is True:
+                open(path, "wb").close()
+            print(f"Fra:{frame} Mem:10.00M (Peak 12.00M) | Time:00:00.10 | Sample 1/1", flush=True)
+            time.sleep(delay)
+            if frame == hang_frame:
+                mark = os.environ.get("FAKE_HANG_MARK")
+                if not mark or not os.path.exists(mark):
+                    if mark:
+                        open(mark, "w").close()
+                    time.sleep(3600)
+            if frame == fail_frame:
+                raise SystemExit(3)
+            with open(path, "wb") as f:
+                f.write(PNG)
+            print(f"Saved: '{path}'", flush=True)
+
+
+ops = Obj()
+object.__setattr__(ops, "render", _Render())
+
+
+class _Engine:
+    enum_items = []
+
+
+class types:
+    class RenderSettings:
+        class bl_rna:
+            properties = {"engine": _Engine()}
@@ -0,0 +1,106 @@
+import logging
+import struct
+import threading
+
+import pytest
+
+from src.blender import blend_reader
+from src.blender.blend_reader import BlendFile, BlendFileError, read_scene_settings
+from src.blender.blender_manager import BlenderManager
+from src.models.project import logical_cpu_count
+
+
+def _strings(marker, strings):
+    data = marker + struct.pack("<i", len(strings)) + b"".join(s.encode() + b"\0" for s in strings)
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _sdna():
+    """SDNA с двумя структурами: Scene { RenderData r; } и RenderData { int xsch; }."""
+    types = ["char", "int", "Scene", "RenderData"]
+    lengths = [1, 4, 4, 4]
+    data = b"SDNA" + _strings(b"NAME", ["r", "xsch"]) + _strings(b"TYPE", types)
+    tlen = b"TLEN" + struct.pack(f"<{len(lengths)}h", *lengths)
+    data += tlen + b"\0" * (-len(tlen) % 4)
+    data += b"STRC" + struct.pack("<i", 2)
+    data += struct.pack("<hh", 2, 1) + struct.pack("<hh", 3, 0)  # Scene: RenderData r
+    data += struct.pack("<hh", 3, 1) + struct.pack("<hh", 1, 1)  # RenderData: int xsch
+    return data
+
+
+def _block(code, payload, size=None, old_ptr=0, sdna_index=0):
+    return struct.pack("<4siQii", code, len(payload) if size is None else size, old_ptr, sdna_index, 1) + payload
+
+
+def write_blend(path, scene_payload, scene_size=None):
+    dna = _sdna()
+    data = b"BLENDER-v300" + _block(b"DNA1", dna) + _block(b"SC\0\0", scene_payload, scene_size, old_ptr=1)
+    path.write_bytes(data)
+    return path
+
+
+def test_reads_minimal_file_with_defaults_for_missing_fields(tmp_path):
+    path = write_blend(tmp_path / "ok.blend", struct.pack("<i", 640))
+    settings = read_scene_settings(path)
+    assert settings["resolution_x"] == 640
+    # Полей нет в SDNA: значения по умолчанию вместо None
+    assert settings["resolution_y"] == 1080
+    assert settings["frame_end"] == 250
+    assert settings["threads"] == 0
+
+
+def test_truncated_block_raises_blend_file_error(tmp_path):
+    path = write_blend(tmp_path / "truncated.blend", b"\x01\x02", scene_size=4)
+    with pytest.raises(BlendFileError):
+        read_scene_settings(path)
+
+
+def test_corrupt_sdna_index_raises_blend_file_error(tmp_path):
+    path = tmp_path / "bad_index.blend"
+    dna = _sdna()
+    path.write_bytes(b"BLENDER-v300" + _block(b"DNA1", dna) + _block(b"SC\0\0", b"\0" * 4, sdna_index=99))
+    with BlendFile(path) as blend, pytest.raises(BlendFileError):
+        blend.get(blend.find_block(b"SC\0\0"), "r.xsch")
+
+
+def test_truncated_header_raises_blend_file_error(tmp_path):
+    path = tmp_path / "header.blend"
+    path.write_bytes(b"BLENDER-v300" + _block(b"DNA1", _sdna())[:30])
+    with pytest.raises(BlendFileError):
+        BlendFile(path)
+
+
+def test_settings_default_threads_when_field_missing(tmp_path):
+    path = write_blend(tmp_path / "ok.blend", struct.pack("<i", 640))
+    manager = BlenderManager(use_warm_workers=False, discover=False)
+    settings = manager.get_settings_from_project(str(path))
+    assert settings["threads"] == logical_cpu_count()
+    assert settings["resolution_x"] == 640
+
+
+def test_corrupt_file_does_not_abort_folder_import(tmp_path, monkeypatch, caplog):
+    good = write_blend(tmp_path / "good.blend", struct.pack("<i", 640))
+    corrupt = write_blend(tmp_path / "corrupt.blend", b"\x01\x02", scene_size=4)
+    original = blend_reader.read_scene_settings
+
+    def read(file_path):
+        if file_path == str(corrupt.resolve()):
+            raise RuntimeError("unexpected reader failure")
+        return original(file_path)
+
+    monkeypatch.setattr(blend_reader, "read_scene_settings", read)
+    manager = BlenderManager(use_warm_workers=False, discover=False)
+    results = {}
+    done = threading.Event()
+
+    def on_ready(file_path, settings):
+        results[file_path] = settings
+        if len(results) == 2:
+            done.set()
+
+    manager.settings_ready.connect(on_ready)
+    with caplog.at_level(logging.ERROR):
+        manager.get_settings_from_projects_async([str(corrupt), str(good)])
+        assert done.wait(10)
+    assert results[str(corrupt)] is None
+    assert results[str(good)]["resolution_x"] == 640
@@ -0,0 +1,18 @@
+from src.database.db_manager import DatabaseManager
+
+
+def test_swap_positions_persists_queue_order(tmp_path, make_project):
+    db_path = str(tmp_path / "queue.db")
+    db_manager = DatabaseManager(db_path)
+    projects = [make_project(name) for name in ("a", "b", "c")]
+    for project in projects:
+        db_manager.save_project(project)
+    db_manager.swap_positions(projects[1].unique_id, projects[2].unique_id)
+    db_manager.close()
+
+    reopened = DatabaseManager(db_path)
+    try:
+        assert [project.name for project in reopened.load_projects()] == ["a", "c", "b"]
+        assert [project.name for project in reopened.load_projects(limit=1, offset=1)] == ["c"]
+    finally:
+        reopened.close()
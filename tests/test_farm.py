@@ -0,0 +1,150 @@
+import stat
+import sys
+import threading
+
+import pytest
+
+from src.database.db_manager import DatabaseManager
+from src.farm import coordinator as coordinator_module
+from src.farm.coordinator import FarmCoordinator
+from src.farm.worker import FarmWorker
+
+BASE_CHUNK = 4
+
+
+def write_executable(path, source):
+    path.write_text(f"#!{sys.executable}\n{source}")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def slowed_blender(tmp_path, fake_blender, name, frame_time):
+    """Поддельный Blender с собственным временем кадра: агенты фермы работают с разной скоростью."""
+    return write_executable(tmp_path / name, (
+        "import os, sys\n"
+        f"os.environ['FAKE_FRAME_TIME'] = {str(frame_time)!r}\n"
+        f"os.execv({fake_blender!r}, [{fake_blender!r}] + sys.argv[1:])\n"
+    ))
+
+
+@pytest.fixture
+def farm(tmp_path, monkeypatch):
+    monkeypatch.setattr(coordinator_module, "HEARTBEAT_INTERVAL", 0.2)
+    monkeypatch.setattr(coordinator_module, "IDLE_RETRY", 0.1)
+    db_manager = DatabaseManager(str(tmp_path / "farm.db"))
+    started = []
+
+    def start(lease_timeout=30.0):
+        coordinator = FarmCoordinator(db_manager, host="127.0.0.1", port=0, token="secret",
+                                      lease_timeout=lease_timeout, base_chunk=BASE_CHUNK)
+        coordinator.start()
+        started.append(coordinator)
+        return coordinator
+
+    def add_worker(coordinator, name, blender_path):
+        worker = FarmWorker("127.0.0.1", coordinator.port, token="secret", blender_path=blender_path,
+                            name=name, threads=1, background=False)
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+        started.append((worker, thread))
+        return worker
+
+    yield db_manager, start, add_worker
+    for item in reversed(started):
+        if isinstance(item, tuple):
+            worker, thread = item
+            worker.stop()
+            thread.join(10)
+        else:
+            item.stop()
+    db_manager.close()
+
+
+def track(coordinator):
+    """Сигналы координатора: аренды, возвращенные кадры, готовые кадры и завершение задания."""
+    events = {"leases": [], "expired": [], "frames": [], "finished": threading.Event(), "result": []}
+    coordinator.lease_granted.connect(lambda worker, unique_id, frames: events["leases"].append((worker, frames)))
+    coordinator.lease_expired.connect(lambda worker, unique_id, frames: events["expired"].append((worker, frames)))
+    coordinator.frame_done.connect(lambda unique_id, frame, worker: events["frames"].append((frame, worker)))
+
+    def on_finished(unique_id, success, message):
+        events["result"].append((success, message))
+        events["finished"].set()
+
+    coordinator.job_finished.connect(on_finished)
+    return events
+
+
+def queue_animation(db_manager, make_project, frames):
+    project = make_project("shot", render_type="Animation", frame_start=1, frame_end=frames)
+    db_manager.save_project(project)
+    db_manager.set_project_status(project.unique_id, "pending")
+    return project
+
+
+def test_expired_lease_is_rendered_by_another_worker(farm, make_project, fake_blender, tmp_path, fast_frames):
+    db_manager, start, add_worker = farm
+    project = queue_animation(db_manager, make_project, 8)
+    coordinator = start(lease_timeout=1.0)
+    events = track(coordinator)
+
+    class FrozenWorker(FarmWorker):
+        """Машина агента зависла: Blender не выводит кадров, heartbeat не уходит."""
+
+        def _render_lease(self, conn, lease, heartbeat):
+            super()._render_lease(conn, lease, 3600)
+
+    hung_blender = write_executable(tmp_path / "hung_blender", "import time\ntime.sleep(3600)\n")
+    frozen = FrozenWorker("127.0.0.1", coordinator.port, token="secret", blender_path=hung_blender,
+                          name="frozen", threads=1, background=False)
+    frozen_thread = threading.Thread(target=frozen.run, daemon=True)
+    frozen_thread.start()
+    try:
+        for _ in range(200):
+            if events["leases"]:
+                break
+            threading.Event().wait(0.05)
+        assert events["leases"][0] == ("frozen", [1, 2, 3, 4])
+        add_worker(coordinator, "healthy", fake_blender)
+        assert events["finished"].wait(30)
+    finally:
+        frozen.stop()
+        frozen_thread.join(10)
+
+    assert events["result"][0][0], events["result"]
+    assert ("frozen", [1, 2, 3, 4]) in events["expired"]
+    # Кадры истекшей аренды отрендерил другой агент, каждый кадр - один раз
+    assert sorted(frame for frame, worker in events["frames"]) == list(range(1, 9))
+    assert {worker for frame, worker in events["frames"]} == {"healthy"}
+    assert db_manager.get_project_status(project.unique_id) == "done"
+    output = tmp_path / "output" / "shot"
+    assert all((output / f"shot{frame:04d}.png").exists() for frame in range(1, 9))
+
+
+def test_chunk_size_follows_worker_throughput(farm, make_project, fake_blender, tmp_path):
+    db_manager, start, add_worker = farm
+    project = queue_animation(db_manager, make_project, 120)
+    coordinator = start()
+    events = track(coordinator)
+    add_worker(coordinator, "slow", slowed_blender(tmp_path, fake_blender, "slow_blender", 0.2))
+    # Быстрый агент подключается, когда скорость медленного уже замерена: иначе он успел бы
+    # разобрать всю очередь кусками базового размера, пока медленный рендерит первую аренду
+    for _ in range(200):
+        if coordinator.status()["workers"].get("slow", {}).get("rate", 0) > 0:
+            break
+        threading.Event().wait(0.05)
+    add_worker(coordinator, "fast", slowed_blender(tmp_path, fake_blender, "fast_blender", 0.01))
+    assert events["finished"].wait(60)
+
+    assert events["result"][0][0], events["result"]
+    assert sorted(frame for frame, worker in events["frames"]) == list(range(1, 121))
+    workers = coordinator.status()["workers"]
+    assert workers["fast"]["rate"] > workers["slow"]["rate"] > 0
+    # Первая аренда - базового размера; после замера скорости быстрый агент берет больше, медленный - меньше
+    fast = [len(frames) for worker, frames in events["leases"] if worker == "fast"]
+    slow = [len(frames) for worker, frames in events["leases"] if worker == "slow"]
+    assert fast[0] == BASE_CHUNK
+    assert max(fast[1:]) > BASE_CHUNK
+    assert min(slow[1:]) < BASE_CHUNK
+    assert workers["fast"]["frames"] > workers["slow"]["frames"]
+    assert db_manager.get_project_status(project.unique_id) == "done"
@@ -0,0 +1,58 @@
+import threading
+
+from src.blender.blender_manager import BlenderManager
+from src.blender.frame_sharding import ShardedRender
+from src.blender.job_control import JobCancelled, RENDER_CANCELLED
+from src.blender.render_scheduler import RenderScheduler
+
+ASSEMBLE = ["assemble"]
+
+
+def make_movie(make_project):
+    return make_project("movie", render_type="Animation", frame_start=1, frame_end=4,
+                        file_format="FFMPEG", shard_workers=2)
+
+
+def make_manager(monkeypatch, on_assemble):
+    manager = BlenderManager(use_warm_workers=False, discover=False)
+    manager.admission.enabled = False
+    run_blender_process = manager.run_blender_process
+
+    def run(command, unique_id, *args, **kwargs):
+        if command is ASSEMBLE:
+            return on_assemble(manager, unique_id)
+        return run_blender_process(command, unique_id, *args, **kwargs)
+
+    monkeypatch.setattr(manager, "build_assemble_command", lambda project, chunk_dir: ASSEMBLE)
+    monkeypatch.setattr(manager, "run_blender_process", run)
+    return manager
+
+
+def test_cancel_during_movie_assembly_cancels_job(make_project, monkeypatch, fast_frames):
+    def cancel(manager, unique_id):
+        manager.jobs.cancel(unique_id)
+        raise JobCancelled(unique_id)
+
+    manager = make_manager(monkeypatch, cancel)
+    scheduler = RenderScheduler(manager, max_concurrency=1)
+    project = make_movie(make_project)
+    finished, retrying = [], []
+    done = threading.Event()
+    scheduler.job_finished.connect(lambda unique_id, success, message: (finished.append((success, message)),
+                                                                        done.set()))
+    scheduler.job_retrying.connect(lambda *args: (retrying.append(args), done.set()))
+    scheduler.submit(project, lambda *args, **kwargs: None)
+    assert done.wait(30)
+    assert retrying == []
+    assert finished == [(False, RENDER_CANCELLED)]
+
+
+def test_assembly_os_error_is_a_failure(make_project, monkeypatch, fast_frames):
+    def fail(manager, unique_id):
+        raise OSError("no space left on device")
+
+    manager = make_manager(monkeypatch, fail)
+    project = make_movie(make_project)
+    success, message = ShardedRender(manager, project, lambda *args, **kwargs: None, 2, 2).run()
+    assert not success
+    assert "no space left on device" in message
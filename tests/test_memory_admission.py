@@ -0,0 +1,88 @@
+import threading
+
+from src.blender import memory_admission
+from src.blender.blender_manager import BlenderManager
+from src.blender.job_control import RENDER_CANCELLED
+from src.blender.memory_admission import GB, MemoryEstimate
+from src.blender.render_scheduler import RenderScheduler
+
+
+def test_cancel_while_held_for_memory_does_not_render(make_project, monkeypatch):
+    monkeypatch.setattr(memory_admission, "system_memory", lambda: (GB // 2, 64 * GB))
+    manager = BlenderManager(use_warm_workers=False, discover=False)
+    monkeypatch.setattr(manager.admission, "estimate", lambda project: MemoryEstimate(GB, "scene"))
+    launched = []
+    monkeypatch.setattr(manager, "run_render", lambda *args, **kwargs: launched.append(args))
+    scheduler = RenderScheduler(manager, max_concurrency=1)
+    project = make_project()
+    held, finished = threading.Event(), threading.Event()
+    results = []
+    scheduler.job_held.connect(lambda unique_id, estimate, available: held.set())
+    scheduler.job_finished.connect(lambda unique_id, success, message: (results.append((success, message)),
+                                                                        finished.set()))
+    scheduler.submit(project, lambda *args, **kwargs: None)
+    assert held.wait(10)
+    assert scheduler.cancel(project.unique_id)
+    assert finished.wait(10)
+    assert results == [(False, RENDER_CANCELLED)]
+    assert launched == []
+    assert manager.admission.admitted_count() == 0
+
+
+def test_scene_probe_does_not_block_queue(make_project, monkeypatch, fast_frames):
+    manager = BlenderManager(use_warm_workers=False, discover=False)
+    slow, fast = make_project("slow"), make_project("fast")
+    probing, probed = threading.Event(), threading.Event()
+
+    def estimate(project):
+        if project is slow:
+            # Проба сцены нового файла занимает время
+            probing.set()
+            probed.wait(30)
+        return None
+
+    monkeypatch.setattr(manager.admission, "estimate", estimate)
+    scheduler = RenderScheduler(manager, max_concurrency=1)
+    finished = []
+    all_done = threading.Event()
+
+    def on_finished(unique_id, success, message):
+        finished.append(unique_id)
+        if len(finished) == 2:
+            all_done.set()
+
+    scheduler.job_finished.connect(on_finished)
+    scheduler.submit(slow, lambda *args, **kwargs: None)
+    assert probing.wait(10)
+    scheduler.submit(fast, lambda *args, **kwargs: None)
+    for _ in range(500):
+        if finished:
+            break
+        threading.Event().wait(0.02)
+    assert finished == [fast.unique_id]
+    probed.set()
+    assert all_done.wait(30)
+    assert finished == [fast.unique_id, slow.unique_id]
+
+
+def test_job_cancelled_before_start_releases_admission(make_project, monkeypatch):
+    manager = BlenderManager(use_warm_workers=False, discover=False)
+    monkeypatch.setattr(manager.admission, "estimate", lambda project: MemoryEstimate(GB, "scene"))
+    monkeypatch.setattr(memory_admission, "system_memory", lambda: (32 * GB, 64 * GB))
+    open_handle = manager.jobs.open
+
+    def open_cancelled(unique_id):
+        # Отмена приходит между допуском в _dispatch и запуском рендера
+        handle = open_handle(unique_id)
+        handle.cancel()
+        return handle
+
+    monkeypatch.setattr(manager.jobs, "open", open_cancelled)
+    scheduler = RenderScheduler(manager, max_concurrency=1)
+    finished = threading.Event()
+    results = []
+    scheduler.job_finished.connect(lambda unique_id, success, message: (results.append(message), finished.set()))
+    scheduler.submit(make_project(), lambda *args, **kwargs: None)
+    assert finished.wait(10)
+    assert results == [RENDER_CANCELLED]
+    assert manager.admission.admitted_count() == 0
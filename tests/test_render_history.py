@@ -0,0 +1,31 @@
+import threading
+import time
+
+from src.blender.render_history import RenderRecorder
+from src.blender.render_progress import RenderProgress
+
+FRAME_TIME = 0.2
+
+
+def test_parallel_chunks_record_their_own_frame_times(make_project):
+    recorder = RenderRecorder(make_project(), threads=2, blender_version="4.2.0")
+
+    def render_chunk(frames, delay):
+        time.sleep(delay)  # куски сдвинуты, их строки Saved идут вперемешку
+        for frame in frames:
+            time.sleep(FRAME_TIME)
+            recorder.on_progress(RenderProgress(frame=frame, saved_path=f"{frame:04d}.png"))
+
+    chunks = [threading.Thread(target=render_chunk, args=(range(1, 4), 0)),
+              threading.Thread(target=render_chunk, args=(range(4, 7), FRAME_TIME / 2))]
+    for chunk in chunks:
+        chunk.start()
+    for chunk in chunks:
+        chunk.join()
+
+    _, frames = recorder.record(True)
+    times = {frame: render_time for frame, render_time, _ in frames}
+    assert sorted(times) == [1, 2, 3, 4, 5, 6]
+    # Первый кадр второго куска включает его задержку старта, остальные - только рендер
+    for frame in (1, 2, 3, 5, 6):
+        assert FRAME_TIME * 0.8 < times[frame] < FRAME_TIME * 1.4
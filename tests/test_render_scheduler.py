@@ -0,0 +1,152 @@
+import threading
+import time
+
+from src.blender.blender_manager import BlenderManager
+from src.blender.render_scheduler import RenderScheduler
+
+
+def make_manager(**kwargs):
+    manager = BlenderManager(discover=False, **kwargs)
+    manager.admission.enabled = False
+    return manager
+
+
+def run_queue(scheduler, jobs, timeout=30):
+    """Ставит проекты в очередь и ждет job_finished каждого; возвращает {unique_id: (success, message)}."""
+    results = {}
+    done = threading.Event()
+
+    def on_finished(unique_id, success, message):
+        results[unique_id] = (success, message)
+        if len(results) == len(jobs):
+            done.set()
+
+    scheduler.job_finished.connect(on_finished)
+    for project in jobs:
+        scheduler.submit(project, lambda *args, **kwargs: None)
+    assert done.wait(timeout), f"finished only {results}"
+    return results
+
+
+def test_warm_worker_render_reports_process(make_project, fast_frames):
+    manager = make_manager(use_warm_workers=True)
+    scheduler = RenderScheduler(manager, max_concurrency=1)
+    project = make_project()
+    started = []
+    manager.process_started.connect(lambda unique_id, process: started.append((unique_id, process.pid)))
+    try:
+        results = run_queue(scheduler, [project])
+        workers = [worker.process.pid for group in manager.worker_pool._workers.values() for worker in group]
+    finally:
+        manager.shutdown()
+    assert results[project.unique_id][0], results
+    # Прогретый процесс получает телеметрию и закрепление за ядрами, как отдельный процесс рендера
+    assert started == [(project.unique_id, workers[0])]
+
+
+def test_preview_preempts_render_without_blocking_on_workers(make_project, monkeypatch):
+    # Рендеры идут дольше превью; процессы пула наследуют окружение при запуске
+    monkeypatch.setenv("FAKE_FRAME_TIME", "6")
+    manager = make_manager(use_warm_workers=True)
+    scheduler = RenderScheduler(manager, max_concurrency=2)
+    renders = [make_project("first"), make_project("second")]
+    started, paused = threading.Event(), []
+    running = []
+
+    def on_started(unique_id, threads):
+        running.append(unique_id)
+        if len(running) == 2:
+            started.set()
+
+    scheduler.job_started.connect(on_started)
+    manager.jobs.job_paused.connect(lambda unique_id, value: paused.append((unique_id, value)))
+    results = {}
+    done = threading.Event()
+
+    def on_finished(unique_id, success, message):
+        results[unique_id] = success
+        if len(results) == 2:
+            done.set()
+
+    scheduler.job_finished.connect(on_finished)
+    preview = make_project("preview")
+    thumbnails = []
+    preview_done = threading.Event()
+    try:
+        for project in renders:
+            scheduler.submit(project, lambda *args, **kwargs: None)
+        assert started.wait(10)
+        # Оба процесса worker_pool заняты рендерами
+        workers = manager.worker_pool._workers.get(renders[0].settings.blender_path, [])
+        for _ in range(100):
+            if len(workers) == 2 and all(worker.is_alive() for worker in workers):
+                break
+            threading.Event().wait(0.05)
+        monkeypatch.setenv("FAKE_FRAME_TIME", "0.05")
+        manager.render_project_thumbnail(preview, lambda unique_id, data: (thumbnails.append(data),
+                                                                          preview_done.set()))
+        assert preview_done.wait(4), "preview waited for a render worker"
+        assert done.wait(30)
+    finally:
+        manager.shutdown()
+    assert thumbnails and thumbnails[0]
+    assert all(results[project.unique_id] for project in renders), results
+    # Превью приостановило один рендер и вернуло его после себя
+    assert len(paused) == 2 and paused[0][1] is True and paused[1] == (paused[0][0], False)
+
+
+def test_job_paused_for_preview_keeps_its_slot(make_project, monkeypatch):
+    monkeypatch.setenv("FAKE_FRAME_TIME", "0.2")
+    manager = make_manager(use_warm_workers=False)
+    scheduler = RenderScheduler(manager, max_concurrency=1)
+    first = make_project("first", render_type="Animation", frame_start=1, frame_end=4)
+    second = make_project("second", render_type="Animation", frame_start=1, frame_end=2)
+    running, peak = set(), []
+    lock = threading.Lock()
+    launched = threading.Event()
+    done = threading.Event()
+
+    def on_started(unique_id, threads):
+        with lock:
+            running.add(unique_id)
+            peak.append(len(running))
+
+    def on_finished(unique_id, success, message):
+        with lock:
+            running.discard(unique_id)
+        if unique_id == second.unique_id:
+            done.set()
+
+    scheduler.job_started.connect(on_started)
+    scheduler.job_finished.connect(on_finished)
+    manager.process_started.connect(lambda unique_id, process: launched.set())
+    try:
+        scheduler.submit(first, lambda *args, **kwargs: None)
+        assert launched.wait(10)
+        manager.preview_started.emit("preview-project", "preview")
+        assert manager.jobs.is_paused(first.unique_id)
+        scheduler.submit(second, lambda *args, **kwargs: None)
+        threading.Event().wait(0.5)
+        # Приостановленное ради превью задание держит слот: второе не запускается
+        assert scheduler.running_count() <= scheduler.max_concurrency
+        assert second.unique_id not in running
+        manager.preview_finished.emit("preview-project", "preview")
+        assert done.wait(30)
+    finally:
+        manager.shutdown()
+    assert max(peak) <= scheduler.max_concurrency
+
+
+def test_still_renders_beyond_pool_size_run_concurrently(make_project, monkeypatch):
+    monkeypatch.setenv("FAKE_FRAME_TIME", "1.5")
+    manager = make_manager(use_warm_workers=True)
+    scheduler = RenderScheduler(manager, max_concurrency=manager.worker_pool.max_workers + 1)
+    projects = [make_project(f"still{index}") for index in range(scheduler.max_concurrency)]
+    started = time.monotonic()
+    try:
+        results = run_queue(scheduler, projects)
+    finally:
+        manager.shutdown()
+    assert all(success for success, message in results.values()), results
+    # Лишний рендер не ждет освобождения прогретого процесса, а идет отдельным процессом
+    assert time.monotonic() - started < 2.8
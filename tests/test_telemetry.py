@@ -0,0 +1,59 @@
+import contextlib
+import threading
+from types import SimpleNamespace
+
+from src.blender import telemetry
+from src.blender.telemetry import ResourceSampler
+
+
+class FakeProcess:
+    """Теплый процесс Blender: счетчики ввода-вывода растут от задания к заданию."""
+    counters = {"read": 0, "write": 0, "rss": 0}
+
+    def __init__(self, pid):
+        self.pid = pid
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def cpu_percent(self, interval):
+        return 100.0
+
+    def memory_info(self):
+        return SimpleNamespace(rss=self.counters["rss"])
+
+    def num_threads(self):
+        return 4
+
+    def io_counters(self):
+        return SimpleNamespace(read_bytes=self.counters["read"], write_bytes=self.counters["write"])
+
+
+class FakePsutil:
+    Error = OSError
+    Process = FakeProcess
+
+
+def run_job(sampler, job_id, read, write, rss):
+    sampled = threading.Event()
+    on_sample = lambda owner, sample: owner == job_id and sample.rss == rss and sampled.set()  # noqa: E731
+    sampler.sample_ready.connect(on_sample)
+    sampler.start_job(job_id)
+    sampler.track(job_id, SimpleNamespace(pid=42))
+    FakeProcess.counters.update(read=FakeProcess.counters["read"] + read,
+                                write=FakeProcess.counters["write"] + write, rss=rss)
+    assert sampled.wait(5)
+    sampler.sample_ready.disconnect(on_sample)
+    return sampler.finish_job(job_id)
+
+
+def test_warm_worker_io_and_peak_are_counted_per_job(monkeypatch):
+    monkeypatch.setattr(telemetry, "load_psutil", lambda: FakePsutil)
+    FakeProcess.counters.update(read=10_000, write=20_000, rss=0)
+    sampler = ResourceSampler(interval=0.05)
+
+    first = run_job(sampler, "first", read=500, write=600, rss=900)
+    second = run_job(sampler, "second", read=100, write=0, rss=300)
+
+    assert (first.io_read, first.io_write, first.peak_rss) == (500, 600, 900)
+    assert (second.io_read, second.io_write, second.peak_rss) == (100, 0, 300)
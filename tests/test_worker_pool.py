@@ -0,0 +1,70 @@
+import json
+import threading
+
+import pytest
+
+from src.blender.worker_pool import BlenderWorker, WorkerError, WorkerPool
+
+
+def test_cancel_in_same_packet_as_job_is_seen(fake_blender, tmp_path):
+    blend = tmp_path / "scene.blend"
+    blend.write_bytes(b"BLENDER")
+    worker = BlenderWorker(fake_blender)
+    worker.start()
+    try:
+        job = {
+            "type": "thumbnail", "job_id": "preview", "file_path": str(blend),
+            "render_engine": "EEVEE", "cycles_denoising": 0, "cycles_device": "CPU", "threads": 1,
+            "output_path": str(tmp_path / "preview.bmp"), "resolution_x": 64, "resolution_y": 36,
+            "progressive": True
+        }
+        cancel = {"type": "cancel", "job_id": "preview"}
+        # Отмена приходит вместе с заданием и оказывается в буфере чтения, а не в сокете
+        worker.conn.sendall((json.dumps(job) + "\n" + json.dumps(cancel) + "\n").encode("utf-8"))
+        reply = json.loads(worker.reader.readline())
+        while "event" in reply:
+            reply = json.loads(worker.reader.readline())
+        assert reply["ok"]
+        assert reply["cancelled"]
+        assert reply["paths"] == []
+    finally:
+        worker.stop()
+
+
+def test_cancelled_job_is_not_retried(fake_blender):
+    pool = WorkerPool(max_workers=1)
+    cancelled = threading.Event()
+    acquired = []
+
+    def on_acquire(worker):
+        acquired.append(worker.process.pid)
+        # Отмена задания завершает процесс, как JobHandle.cancel
+        cancelled.set()
+        worker.process.kill()
+        worker.process.wait()
+
+    try:
+        with pytest.raises(WorkerError):
+            pool.submit(fake_blender, {"type": "probe", "file_path": "missing.blend"},
+                        on_acquire=on_acquire, cancelled=cancelled.is_set)
+    finally:
+        pool.shutdown()
+    assert len(acquired) == 1
+
+
+def test_crashed_job_is_retried_on_new_worker(fake_blender):
+    pool = WorkerPool(max_workers=1)
+    acquired = []
+
+    def on_acquire(worker):
+        acquired.append(worker.process.pid)
+        if len(acquired) == 1:
+            worker.process.kill()
+            worker.process.wait()
+
+    try:
+        reply = pool.submit(fake_blender, {"type": "quit_unknown"}, on_acquire=on_acquire, cancelled=lambda: False)
+    finally:
+        pool.shutdown()
+    assert len(acquired) == 2
+    assert reply["ok"] is False